@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    # Registering signals
+    def ready(self):
+        import accounts.signals  # noqa
+        import accounts.checks  # noqa
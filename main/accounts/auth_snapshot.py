@@ -0,0 +1,177 @@
+# accounts/auth_snapshot.py
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.utils import timezone
+from billing.models import Subscription
+from .enums import UserType
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+SNAPSHOT_VERSION = 1
+ALL_OWNERS = '*'
+
+
+def snapshot_path():
+    return str(getattr(
+        settings, 'AUTH_SNAPSHOT_PATH',
+        os.path.join(settings.BASE_DIR, 'tmp', 'auth-snapshot.json')
+    ))
+
+
+def _allowed_owners(user):
+    """Hotspot owners whose hotspots this user may join (see HotspotAuthViewSet)"""
+    if user['is_superuser'] or user['user_type'] == UserType.ADMIN:
+        return ALL_OWNERS
+    if user['user_type'] == UserType.RESELLER:
+        return [user['id']]
+    return [user['parent_reseller_id']] if user['parent_reseller_id'] else []
+
+
+def _collect(now, user_ids=None):
+    """Eligible users as {username: entry}, optionally limited to user_ids"""
+    users = User.objects.filter(is_active=True)
+    subscriptions = Subscription.objects.filter(is_active=True, end_date__gte=now)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+        subscriptions = subscriptions.filter(user_id__in=user_ids)
+    active_until = dict(
+        subscriptions.values('user_id').annotate(active_until=Max('end_date')).values_list('user_id', 'active_until')
+    )
+
+    entries = {}
+    for user in users.values('id', 'username', 'password', 'user_type', 'is_superuser', 'credit', 'parent_reseller_id'):
+        credit_positive = user['user_type'] == UserType.CUSTOMER and user['credit'] > 0
+        if user['id'] not in active_until and not credit_positive:
+            continue
+        entries[user['username']] = {
+            'id': user['id'],
+            'password': user['password'],
+            # Credit-funded access has no fixed end
+            'expires': None if credit_positive else int(active_until[user['id']].timestamp()),
+            'owners': _allowed_owners(user),
+        }
+    return entries
+
+
+def build_snapshot(path=None, full=False):
+    """
+    Write the authorization snapshot and return a summary.
+
+    Without full, the previous snapshot is updated in place: only users
+    changed since its watermark (User.updated_at or one of their
+    Subscription.updated_at) are recomputed, deleted users are pruned and
+    lapsed entries dropped. The file is replaced atomically with rename.
+    """
+    path = path or snapshot_path()
+    now = timezone.now()
+    previous = None if full else read_snapshot(path)
+
+    if previous is None:
+        entries = _collect(now)
+        mode = 'full'
+        recomputed = len(entries)
+    else:
+        watermark = datetime.fromisoformat(previous['watermark'])
+        changed_ids = set(User.objects.filter(updated_at__gte=watermark).values_list('id', flat=True))
+        changed_ids |= set(Subscription.objects.filter(updated_at__gte=watermark).values_list('user_id', flat=True))
+        existing_ids = set(User.objects.values_list('id', flat=True))
+
+        entries = {
+            username: entry for username, entry in previous['users'].items()
+            if entry['id'] in existing_ids and entry['id'] not in changed_ids
+            and (entry['expires'] is None or entry['expires'] >= now.timestamp())
+        }
+        if changed_ids:
+            entries.update(_collect(now, changed_ids))
+        mode = 'incremental'
+        recomputed = len(changed_ids)
+
+    # Rows saved just before now may commit after this read; overlap the next run
+    overlap = getattr(settings, 'AUTH_SNAPSHOT_OVERLAP', 60)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'generated_at': now.isoformat(),
+        'watermark': (now - timezone.timedelta(seconds=overlap)).isoformat(),
+        'users': entries,
+    }
+    _write_atomic(path, snapshot)
+    logger.info(f"Auth snapshot written ({mode}): {len(entries)} users, {recomputed} recomputed")
+    return {'mode': mode, 'users': len(entries), 'recomputed': recomputed, 'path': path}
+
+
+def _write_atomic(path, snapshot):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.auth-snapshot-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path=None):
+    """Parsed snapshot, or None when missing, unreadable or from another version"""
+    try:
+        with open(path or snapshot_path(), encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+
+class SnapshotReader:
+    """ORM-free lookups against the snapshot file, re-read whenever it is replaced"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._users = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        path = self.path or snapshot_path()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._users, self._signature = {}, None
+            return
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            snapshot = read_snapshot(path)
+            self._users = snapshot['users'] if snapshot else {}
+            self._signature = signature
+
+    def lookup(self, username, now=None):
+        """Entry for a currently eligible user, or None"""
+        with self._lock:
+            self._refresh()
+            entry = self._users.get(username)
+        if entry is None:
+            return None
+        if entry['expires'] is not None and entry['expires'] < (now or timezone.now()).timestamp():
+            return None
+        return entry
+
+    @staticmethod
+    def owner_allowed(entry, owner_id):
+        return entry['owners'] == ALL_OWNERS or owner_id in entry['owners']
+
+
+snapshot_reader = SnapshotReader()
@@ -0,0 +1,23 @@
+# accounts/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from .password_verifier import check_user_password, hash_dummy_password
+
+
+class VerifierModelBackend(ModelBackend):
+    """ModelBackend with the password check on the configured verifier"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            hash_dummy_password(password)
+            return None
+        if check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,24 @@
+# accounts/checks.py
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Cached eligibility is invalidated by signals in whichever process saved the
+    change; with a per-process cache the other processes keep serving it.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES or not getattr(settings, 'ELIGIBILITY_CACHE_TTL', 300):
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is local to each process.",
+        hint="Configure a shared cache (Redis or Memcached) in CACHES, or set ELIGIBILITY_CACHE_TTL = 0; "
+             "otherwise a cancelled subscription keeps authenticating for up to the TTL.",
+        id='accounts.W001',
+    )]
@@ -0,0 +1,79 @@
+# accounts/credential_cache.py
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+KEY_SALT = 'accounts.credential_cache'
+
+
+class VerifiedCredentialCache:
+    """
+    In-memory LRU of recently verified credentials.
+
+    Entries are keyed by username and hold an HMAC (keyed with SECRET_KEY) of
+    the stored password hash plus the raw password, never the password itself.
+    Because the stored hash is part of the HMAC, a password change anywhere
+    invalidates the entry even without the post_save eviction. Disabled
+    unless CREDENTIAL_CACHE_TTL is set to a positive number of seconds.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CREDENTIAL_CACHE_TTL', 0)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'CREDENTIAL_CACHE_MAX_SIZE', 10000)
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _digest(self, user, password):
+        return salted_hmac(KEY_SALT, f"{user.password}\0{password}", algorithm='sha256').hexdigest()
+
+    def verify(self, user, password):
+        """True if this exact password was verified for user within the TTL"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._entries.get(user.username)
+            if entry is None:
+                return False
+            digest, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user.username]
+                return False
+            self._entries.move_to_end(user.username)
+        return constant_time_compare(digest, self._digest(user, password))
+
+    def remember(self, user, password):
+        """Record a successful full password check"""
+        if not self.enabled:
+            return
+        entry = (self._digest(user, password), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[user.username] = entry
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+credential_cache = VerifiedCredentialCache()
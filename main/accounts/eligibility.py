@@ -0,0 +1,81 @@
+# accounts/eligibility.py
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .enums import UserType
+
+CACHE_KEY_PREFIX = 'eligibility'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _cache_key(user_id):
+    return f"{CACHE_KEY_PREFIX}:{user_id}"
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def compute_eligibility(user):
+    """
+    Read eligibility straight from the database.
+
+    Returns (active_until, credit_positive) where active_until is the latest
+    end date of the user's active subscriptions (None if there are none).
+    """
+    active_until = user.subscriptions.filter(is_active=True).aggregate(
+        active_until=Max('end_date')
+    )['active_until']
+    credit_positive = user.user_type == UserType.CUSTOMER and user.credit > 0
+    return active_until, credit_positive
+
+
+def get_eligibility(user):
+    """Cached (active_until, credit_positive) for a user"""
+    key = _cache_key(user.pk)
+    entry = cache.get(key)
+    if entry is not None:
+        _count('hits')
+        return entry
+
+    _count('misses')
+    entry = compute_eligibility(user)
+    cache.set(key, entry, getattr(settings, 'ELIGIBILITY_CACHE_TTL', 300))
+    return entry
+
+
+def is_eligible(user, now=None):
+    """True if the user has a running subscription or pay-as-you-go credit"""
+    active_until, credit_positive = get_eligibility(user)
+    if credit_positive:
+        return True
+    return active_until is not None and active_until >= (now or timezone.now())
+
+
+def invalidate_eligibility(user_id):
+    """Drop the cached entry now and again once the surrounding transaction commits"""
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    _count('invalidations')
+
+
+def eligibility_cache_stats():
+    """Hit/miss counters for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def reset_eligibility_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,17 @@
+# accounts/management/commands/export_auth_snapshot.py
+from django.core.management.base import BaseCommand
+from accounts.auth_snapshot import build_snapshot
+
+class Command(BaseCommand):
+    help = 'Export eligible users to the authorization snapshot used when the database is slow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Snapshot file (default: AUTH_SNAPSHOT_PATH)')
+        parser.add_argument('--full', action='store_true', help='Rebuild from scratch instead of applying changes')
+
+    def handle(self, *args, **options):
+        result = build_snapshot(path=options['path'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['users']} users to {result['path']} "
+            f"({result['mode']}, {result['recomputed']} recomputed)"
+        ))
@@ -40,6 +40,7 @@ class User(AbstractUser):
     address = models.TextField(blank=True)
     is_verified = models.BooleanField(default=False)
     stripe_customer_id = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = "User"
@@ -55,24 +56,19 @@ class User(AbstractUser):
         1. Active subscription record
         2. Subscription end date
         3. Account credit (for pay-as-you-go)
+
+        Served from the eligibility cache (accounts/eligibility.py), which is
+        invalidated whenever the user or one of their subscriptions is saved.
         """
-        # Check for active time-based subscription
-        active_subscription = self.subscriptions.filter(
-            is_active=True,
-            end_date__gte=timezone.now()
-        ).exists()
-        
-        if active_subscription:
-            return True
-            
-        # For customers, check if they have positive credit (pay-as-you-go)
-        if self.user_type == UserType.CUSTOMER and self.credit > 0:
-            return True
-            
-        return False
+        from .eligibility import is_eligible
+        return is_eligible(self)
 
     def get_active_subscription(self):
         """Get the user's current active subscription if it exists"""
+        from .eligibility import get_eligibility
+        active_until, _ = get_eligibility(self)
+        if active_until is None or active_until < timezone.now():
+            return None
         return self.subscriptions.filter(
             is_active=True,
             end_date__gte=timezone.now()
@@ -0,0 +1,232 @@
+# accounts/password_verifier.py
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(settings_module):
+    """Runs once in every pool process so the configured hashers are available"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+def _check_in_worker(password, encoded, submitted_at):
+    started_at = time.time()
+    return check_password(password, encoded), started_at - submitted_at
+
+
+class SyncPasswordVerifier:
+    """Checks passwords on the calling thread"""
+
+    name = 'sync'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'verified': 0, 'fallbacks': 0}
+
+    def verify(self, password, encoded):
+        with self._lock:
+            self._stats['verified'] += 1
+        return check_password(password, encoded)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = self.name
+        return stats
+
+    def warm_up(self, wait=False):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class ProcessPoolPasswordVerifier(SyncPasswordVerifier):
+    """
+    Checks passwords on a warm pool of worker processes.
+
+    Password hashing is CPU bound and holds the GIL, so on the request thread
+    one hash stalls every other request in the process. Sending the work to
+    a pool lets throughput scale with cores. Every web, Celery and RADIUS
+    process starts its own pool, so it is small (PASSWORD_VERIFIER_WORKERS).
+    The pool boots on a background thread ('spawn', because callers are
+    multi-threaded); until it is up, and if it cannot start or breaks,
+    verification runs on the calling thread.
+    """
+
+    name = 'process'
+
+    def __init__(self, max_workers=None):
+        super().__init__()
+        self.max_workers = max_workers or getattr(settings, 'PASSWORD_VERIFIER_WORKERS', 2) or 1
+        self._stats.update({
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        })
+        self._pool = None
+        self._starting = False
+        self._broken = False
+
+    def _start_pool(self):
+        """Boot every worker; holds no lock meanwhile, so logins go on in-process"""
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'main.settings'),)
+            )
+            list(pool.map(_warm_up, range(self.max_workers)))
+        except (OSError, BrokenProcessPool) as e:
+            logger.error(f"Password verification pool unavailable, checking in-process: {e}")
+            with self._lock:
+                self._broken, self._starting = True, False
+            return
+        with self._lock:
+            self._pool, self._starting = pool, False
+        logger.info(f"Password verification pool started with {self.max_workers} workers")
+
+    def warm_up(self, wait=False):
+        """Start the pool unless it runs or is starting; in the background unless wait"""
+        with self._lock:
+            if self._pool is not None or self._starting or self._broken:
+                return
+            self._starting = True
+        if wait:
+            self._start_pool()
+        else:
+            threading.Thread(target=self._start_pool, name='password-pool-start', daemon=True).start()
+
+    def verify(self, password, encoded):
+        self.warm_up()
+        with self._lock:
+            pool = self._pool
+            if pool is None:
+                self._stats['fallbacks'] += 1
+            else:
+                self._stats['queue_depth'] += 1
+                self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._stats['queue_depth'])
+        if pool is None:
+            return super().verify(password, encoded)
+
+        try:
+            valid, waited = pool.submit(_check_in_worker, password, encoded, time.time()).result()
+        except BrokenProcessPool:
+            logger.error("Password verification pool broke, checking in-process")
+            with self._lock:
+                self._stats['queue_depth'] -= 1
+                self._stats['fallbacks'] += 1
+                self._broken = True
+                self._pool = None
+            return super().verify(password, encoded)
+
+        with self._lock:
+            self._stats['queue_depth'] -= 1
+            self._stats['verified'] += 1
+            self._stats['wait_time_total'] += max(waited, 0.0)
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        return valid
+
+    def stats(self):
+        stats = super().stats()
+        stats['workers'] = self.max_workers
+        stats['wait_time_avg'] = round(stats['wait_time_total'] / stats['verified'], 6) if stats['verified'] else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+_dummy = []
+_dummy_lock = threading.Lock()
+
+
+def _dummy_hash():
+    # RADIUS worker threads race here on the first unknown usernames
+    with _dummy_lock:
+        if not _dummy:
+            _dummy.append(make_password(get_random_string(12)))
+        return _dummy[0]
+
+
+def get_password_verifier():
+    """The process-wide verifier named by PASSWORD_VERIFIER_BACKEND"""
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            backend = getattr(settings, 'PASSWORD_VERIFIER_BACKEND', 'accounts.password_verifier.SyncPasswordVerifier')
+            _verifier = import_string(backend)()
+        return _verifier
+
+
+def reset_password_verifier():
+    global _verifier
+    with _verifier_lock:
+        verifier, _verifier = _verifier, None
+    if verifier is not None:
+        verifier.shutdown()
+
+
+def verify_user_credentials(username, password, request=None):
+    """
+    Return the active user for these credentials, or None.
+
+    Goes through authenticate(), so AUTHENTICATION_BACKENDS and the
+    user_login_failed signal apply; accounts.backends.VerifierModelBackend
+    runs the hash on the configured verifier.
+    """
+    return authenticate(request, username=username, password=password)
+
+
+def hash_dummy_password(password, verifier=None):
+    """Hash anyway so unknown usernames take as long as wrong passwords"""
+    (verifier or get_password_verifier()).verify(password, _dummy_hash())
+
+
+def check_user_password(user, password, verifier=None):
+    """
+    Check password against an already loaded user on the configured verifier.
+
+    False for inactive users; a stale hash is upgraded on success.
+    """
+    verifier = verifier or get_password_verifier()
+    if not user.has_usable_password() or not verifier.verify(password, user.password):
+        return False
+    if not user.is_active:
+        return False
+    upgrade_password_hash(user, password)
+    return True
+
+
+def upgrade_password_hash(user, password):
+    """Re-hash a verified password whose stored hash uses stale settings"""
+    preferred = get_hasher('default')
+    if identify_hasher(user.password).algorithm != preferred.algorithm or preferred.must_update(user.password):
+        # Upgrade the stored hash just like check_password's setter would
+        user.set_password(password)
+        # updated_at too: the incremental auth snapshot picks users up by it
+        user.save(update_fields=['password', 'updated_at'])
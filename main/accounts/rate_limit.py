@@ -0,0 +1,256 @@
+# accounts/rate_limit.py
+import os
+import re
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('username', 'mac', 'hotspot')
+
+DEFAULT_LIMITS = {
+    # scope: (burst capacity, tokens refilled per second)
+    'username': (20, 0.5),
+    'mac': (20, 0.5),
+    'hotspot': (500, 100),
+}
+
+SLOT = struct.Struct('<Qdd')  # key hash, tokens, last refill (unix time)
+PROBES = 8
+
+
+def normalize_mac(value):
+    if not isinstance(value, str):
+        return None
+    digits = re.sub(r'[^0-9a-f]', '', value.lower())
+    return digits or None
+
+
+def _refill(tokens, last, now, capacity, rate):
+    return min(capacity, tokens + max(now - last, 0.0) * rate)
+
+
+class SharedMemoryBuckets:
+    """
+    Token buckets in a memory-mapped file shared by every worker process.
+
+    The file is a fixed open-addressing table, so memory stays bounded no
+    matter how many usernames an attacker tries: when a probe window is
+    full the least recently refilled bucket is recycled. An flock on the
+    file serialises updates across processes; a check is a handful of
+    struct reads and writes.
+    """
+
+    # A check never leaves the host, so it may run on an event loop
+    blocking = False
+
+    def __init__(self, path=None, slots=None):
+        self.path = str(path or getattr(settings, 'LOGIN_RATE_LIMIT_SHM_PATH', None) or self._default_path())
+        self.slots = slots or getattr(settings, 'LOGIN_RATE_LIMIT_SLOTS', 65536)
+        size = self.slots * SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            with self._locked():
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_lock = threading.Lock()
+
+    @staticmethod
+    def _default_path():
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return os.path.join(directory, 'wifi-login-buckets')
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _hash(self, key):
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        return value or 1
+
+    def _find_slot(self, key_hash):
+        """Offset of the slot for key_hash, claiming an empty or stale one if needed"""
+        start = key_hash % self.slots
+        victim, victim_last = None, None
+        for i in range(PROBES):
+            offset = ((start + i) % self.slots) * SLOT.size
+            stored, _, last = SLOT.unpack_from(self._map, offset)
+            if stored == key_hash:
+                return offset, True
+            if stored == 0:
+                return offset, False
+            if victim is None or last < victim_last:
+                victim, victim_last = offset, last
+        return victim, False
+
+    def consume(self, requests, now):
+        """
+        requests: [(key, capacity, rate)]; returns a list of allowed flags.
+
+        A token is taken from every bucket only when all of them have one,
+        so a refused attempt leaves the other buckets untouched.
+        """
+        slots = []
+        with self._thread_lock, self._locked():
+            for key, capacity, rate in requests:
+                key_hash = self._hash(key)
+                offset, found = self._find_slot(key_hash)
+                if found:
+                    _, tokens, last = SLOT.unpack_from(self._map, offset)
+                    tokens = _refill(tokens, last, now, capacity, rate)
+                else:
+                    tokens = float(capacity)
+                # Claim the slot now so a later key of this attempt cannot pick it too
+                SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+                slots.append((offset, key_hash, tokens))
+            results = [tokens >= 1 for _, _, tokens in slots]
+            if all(results):
+                for offset, key_hash, tokens in slots:
+                    SLOT.pack_into(self._map, offset, key_hash, tokens - 1, now)
+        return results
+
+    def clear(self):
+        with self._thread_lock, self._locked():
+            self._map[:] = bytes(len(self._map))
+
+
+REDIS_SCRIPT = """
+local now = tonumber(ARGV[#ARGV])
+local tokens = {}
+local results = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 't', 'ts')
+    local current = tonumber(bucket[1]) or capacity
+    local last = tonumber(bucket[2]) or now
+    tokens[i] = math.min(capacity, current + math.max(now - last, 0) * rate)
+    results[i] = 0
+    if tokens[i] >= 1 then
+        results[i] = 1
+    else
+        allowed = 0
+    end
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    redis.call('HSET', key, 't', tokens[i] - allowed, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return results
+"""
+
+
+class RedisBuckets:
+    """Token buckets in Redis, updated atomically by one Lua script per check"""
+
+    # Every check is a network round-trip
+    blocking = True
+
+    def __init__(self, url=None, prefix='login-rl'):
+        import redis
+        self.client = redis.Redis.from_url(url or settings.LOGIN_RATE_LIMIT_REDIS_URL)
+        self.prefix = prefix
+        self._script = self.client.register_script(REDIS_SCRIPT)
+
+    def consume(self, requests, now):
+        keys = [f"{self.prefix}:{key}" for key, _, _ in requests]
+        args = [value for _, capacity, rate in requests for value in (capacity, rate)] + [now]
+        return [bool(allowed) for allowed in self._script(keys=keys, args=args)]
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+class LoginRateLimiter:
+    """
+    Per-username, per-MAC and per-hotspot token buckets checked before any
+    password hashing or database work.
+
+    An attempt is refused when any bucket it names is empty and otherwise
+    takes a token from each, so refusals do not drain the other buckets.
+    Both login paths name the hotspot by SSID. Buckets live in Redis when
+    LOGIN_RATE_LIMIT_REDIS_URL is set and in shared memory otherwise.
+    """
+
+    def __init__(self, backend=None, limits=None):
+        self.backend = backend
+        configured = getattr(settings, 'LOGIN_RATE_LIMITS', {})
+        self.limits = {**DEFAULT_LIMITS, **configured, **(limits or {})}
+        self._stats_lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0}
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'LOGIN_RATE_LIMIT_ENABLED', True)
+
+    @property
+    def blocking(self):
+        """Whether check waits on the network and has to be kept off an event loop"""
+        return self.enabled and getattr(self._get_backend(), 'blocking', True)
+
+    def _get_backend(self):
+        if self.backend is None:
+            if getattr(settings, 'LOGIN_RATE_LIMIT_REDIS_URL', None):
+                self.backend = RedisBuckets()
+            else:
+                self.backend = SharedMemoryBuckets()
+        return self.backend
+
+    def check(self, username=None, mac=None, hotspot=None, now=None):
+        """Consume one attempt; returns None if allowed, else the exhausted scope"""
+        if not self.enabled:
+            return None
+        values = {'username': username, 'mac': normalize_mac(mac), 'hotspot': hotspot}
+        scopes = [scope for scope in SCOPES if values[scope] not in (None, '')]
+        if not scopes:
+            return None
+
+        requests = [(f"{scope}:{values[scope]}", *self.limits[scope]) for scope in scopes]
+        allowed = self._get_backend().consume(requests, now or time.time())
+        limited = next((scope for scope, ok in zip(scopes, allowed) if not ok), None)
+        with self._stats_lock:
+            self._stats['limited' if limited else 'allowed'] += 1
+        if limited:
+            logger.debug(f"Login rate limit hit for {limited} '{values[limited]}'")
+        return limited
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset(self):
+        if self.backend is not None:
+            self.backend.clear()
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_login_rate_limiter():
+    """The process-wide limiter configured from settings"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = LoginRateLimiter()
+        return _limiter
@@ -0,0 +1,18 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .credential_cache import credential_cache
+from .eligibility import invalidate_eligibility
+
+User = get_user_model()
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_eligibility(sender, instance, **kwargs):
+    """Credit, user type and activation changes affect eligibility"""
+    invalidate_eligibility(instance.pk)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_verified_credentials(sender, instance, **kwargs):
+    """Password changes and deactivation must force a full password check"""
+    credential_cache.invalidate(instance.username)
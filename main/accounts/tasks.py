@@ -0,0 +1,8 @@
+# accounts/tasks.py
+from celery import shared_task
+from .auth_snapshot import build_snapshot
+
+@shared_task(name='accounts.export_auth_snapshot', ignore_result=True)
+def export_auth_snapshot(full=False):
+    """Periodic refresh of the authorization snapshot (CELERY_BEAT_SCHEDULE)"""
+    return build_snapshot(full=full)
@@ -0,0 +1,110 @@
+# accounts/tests/test_auth_snapshot.py
+import os
+import json
+import pytest
+from django.utils import timezone
+from pyrad.packet import AccessAccept, AccessReject
+from accounts.auth_snapshot import ALL_OWNERS, SnapshotReader, build_snapshot, read_snapshot
+from accounts.enums import UserType
+from accounts.models import User
+from billing.models import Plan, Subscription
+from hotspots.radius.auth import snapshot_authenticate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def snapshot_file(settings, tmp_path):
+    settings.AUTH_SNAPSHOT_PATH = str(tmp_path / 'auth-snapshot.json')
+    return settings.AUTH_SNAPSHOT_PATH
+
+
+@pytest.fixture
+def plan():
+    return Plan.objects.create(name='Snapshot Plan', price=5, duration_days=30)
+
+
+@pytest.fixture
+def reseller():
+    return User.objects.create_user(username='snap_reseller', password='resellerpass', user_type=UserType.RESELLER)
+
+
+def subscribe(user, plan, days=30):
+    return Subscription.objects.create(
+        user=user, plan=plan, end_date=timezone.now() + timezone.timedelta(days=days), is_active=True
+    )
+
+
+def test_full_snapshot_contains_only_eligible_users(snapshot_file, plan, reseller):
+    subscriber = User.objects.create_user(
+        username='snap_sub', password='subpass123', user_type=UserType.CUSTOMER, parent_reseller=reseller
+    )
+    subscribe(subscriber, plan)
+    User.objects.create_user(username='snap_credit', password='creditpass', user_type=UserType.CUSTOMER, credit=5)
+    User.objects.create_user(username='snap_none', password='nonepass12', user_type=UserType.CUSTOMER)
+    inactive = User.objects.create_user(username='snap_off', password='offpass123', user_type=UserType.CUSTOMER)
+    subscribe(inactive, plan)
+    inactive.is_active = False
+    inactive.save()
+    admin = User.objects.create_user(username='snap_admin', password='adminpass1', user_type=UserType.ADMIN)
+    subscribe(admin, plan)
+
+    result = build_snapshot()
+
+    users = read_snapshot(snapshot_file)['users']
+    assert result['mode'] == 'full'
+    assert set(users) == {'snap_sub', 'snap_credit', 'snap_admin'}
+    assert users['snap_sub']['owners'] == [reseller.id]
+    assert users['snap_sub']['expires'] > timezone.now().timestamp()
+    assert users['snap_credit']['expires'] is None
+    assert users['snap_admin']['owners'] == ALL_OWNERS
+    assert users['snap_sub']['password'] == subscriber.password
+    assert os.listdir(os.path.dirname(snapshot_file)) == ['auth-snapshot.json']
+
+
+def test_incremental_snapshot_applies_changes(snapshot_file, plan, reseller):
+    kept = User.objects.create_user(username='snap_kept', password='keptpass12', user_type=UserType.CUSTOMER)
+    subscribe(kept, plan)
+    lapsing = User.objects.create_user(username='snap_lapse', password='lapsepass1', user_type=UserType.CUSTOMER)
+    subscription = subscribe(lapsing, plan)
+    deleted = User.objects.create_user(username='snap_gone', password='gonepass12', user_type=UserType.CUSTOMER)
+    subscribe(deleted, plan)
+    build_snapshot()
+
+    # Move the watermark past the setup so only the changes below are picked up
+    snapshot = read_snapshot(snapshot_file)
+    snapshot['watermark'] = timezone.now().isoformat()
+    with open(snapshot_file, 'w') as f:
+        json.dump(snapshot, f)
+
+    subscription.cancel()
+    deleted.delete()
+    added = User.objects.create_user(username='snap_new', password='newpass123', user_type=UserType.CUSTOMER)
+    subscribe(added, plan)
+
+    result = build_snapshot()
+
+    assert result['mode'] == 'incremental'
+    assert result['recomputed'] == 2
+    assert set(read_snapshot(snapshot_file)['users']) == {'snap_kept', 'snap_new'}
+
+
+def test_reader_picks_up_replaced_snapshot_and_checks_expiry(snapshot_file, plan):
+    user = User.objects.create_user(username='snap_read', password='readpass12', user_type=UserType.CUSTOMER)
+    reader = SnapshotReader()
+    assert reader.lookup('snap_read') is None
+
+    subscribe(user, plan, days=1)
+    build_snapshot(full=True)
+    assert reader.lookup('snap_read')['id'] == user.id
+    assert reader.lookup('snap_read', now=timezone.now() + timezone.timedelta(days=2)) is None
+
+
+def test_snapshot_authenticate_checks_password(snapshot_file, plan):
+    user = User.objects.create_user(username='snap_auth', password='authpass12', user_type=UserType.CUSTOMER)
+    subscribe(user, plan)
+    build_snapshot(full=True)
+
+    assert snapshot_authenticate('snap_auth', 'authpass12') == AccessAccept
+    assert snapshot_authenticate('snap_auth', 'wrongpass1') == AccessReject
+    assert snapshot_authenticate('unknown', 'authpass12') == AccessReject
@@ -0,0 +1,70 @@
+# accounts/tests/test_credential_cache.py
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from pyrad.packet import AccessAccept, AccessReject
+from accounts.credential_cache import credential_cache
+from accounts.enums import UserType
+from accounts.models import User
+from hotspots.radius.auth import radius_authenticate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def enable_cache(settings):
+    settings.CREDENTIAL_CACHE_TTL = 60
+    settings.CREDENTIAL_CACHE_MAX_SIZE = 2
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(
+        username='reauth', password='devicepass1', user_type=UserType.CUSTOMER, credit=10
+    )
+
+
+def count_hashes():
+    return patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify)
+
+
+def test_reauthentication_skips_hasher(enable_cache, customer):
+    with count_hashes() as verify:
+        assert radius_authenticate('reauth', 'devicepass1') == AccessAccept
+        assert radius_authenticate('reauth', 'devicepass1') == AccessAccept
+    assert verify.call_count == 1
+
+
+def test_cache_miss_loads_the_user_once(enable_cache, customer, django_assert_num_queries):
+    with patch.object(User, 'has_active_subscription', return_value=True), django_assert_num_queries(1):
+        assert radius_authenticate('reauth', 'devicepass1') == AccessAccept
+
+
+def test_wrong_password_still_rejected(enable_cache, customer):
+    assert radius_authenticate('reauth', 'devicepass1') == AccessAccept
+    assert radius_authenticate('reauth', 'wrongpass') == AccessReject
+
+
+def test_password_change_invalidates_entry(enable_cache, customer):
+    assert radius_authenticate('reauth', 'devicepass1') == AccessAccept
+    customer.set_password('newpass123')
+    customer.save()
+    assert radius_authenticate('reauth', 'devicepass1') == AccessReject
+    assert radius_authenticate('reauth', 'newpass123') == AccessAccept
+
+
+def test_cache_disabled_by_default(customer):
+    with count_hashes() as verify:
+        radius_authenticate('reauth', 'devicepass1')
+        radius_authenticate('reauth', 'devicepass1')
+    assert verify.call_count == 2
+    assert len(credential_cache) == 0
+
+
+def test_lru_evicts_oldest_entry(enable_cache):
+    for name in ['first', 'second', 'third']:
+        user = User.objects.create_user(username=name, password='pass12345', credit=5)
+        credential_cache.remember(user, 'pass12345')
+    assert len(credential_cache) == 2
+    assert not credential_cache.verify(User.objects.get(username='first'), 'pass12345')
+    assert credential_cache.verify(User.objects.get(username='third'), 'pass12345')
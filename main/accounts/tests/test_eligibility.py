@@ -0,0 +1,81 @@
+# accounts/tests/test_eligibility.py
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.checks import shared_cache_check
+from accounts.eligibility import eligibility_cache_stats, reset_eligibility_stats
+from accounts.enums import UserType
+from accounts.models import User
+from billing.models import Plan, Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def customer():
+    reset_eligibility_stats()
+    return User.objects.create_user(username='eligible', password='pass12345', user_type=UserType.CUSTOMER)
+
+
+@pytest.fixture
+def plan():
+    return Plan.objects.create(name='Monthly', price=10, duration_days=30)
+
+
+def test_repeat_checks_make_no_queries(customer, plan):
+    Subscription.objects.create(user=customer, plan=plan, end_date=timezone.now() + timezone.timedelta(days=5))
+    assert customer.has_active_subscription()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert customer.has_active_subscription()
+    assert len(queries) == 0
+
+    stats = eligibility_cache_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_new_subscription_invalidates_cache(customer, plan):
+    assert not customer.has_active_subscription()
+    Subscription.objects.create(user=customer, plan=plan, end_date=timezone.now() + timezone.timedelta(days=5))
+    assert customer.has_active_subscription()
+
+
+def test_cancelled_subscription_invalidates_cache(customer, plan):
+    subscription = Subscription.objects.create(
+        user=customer, plan=plan, end_date=timezone.now() + timezone.timedelta(days=5)
+    )
+    assert customer.get_active_subscription() == subscription
+    subscription.is_active = False
+    subscription.save()
+    assert not customer.has_active_subscription()
+    assert customer.get_active_subscription() is None
+
+
+def test_credit_change_invalidates_cache(customer):
+    assert not customer.has_active_subscription()
+    customer.credit = 25
+    customer.save()
+    assert customer.has_active_subscription()
+
+
+def test_expiry_is_checked_against_cached_end_date(customer, plan):
+    Subscription.objects.create(user=customer, plan=plan, end_date=timezone.now() + timezone.timedelta(hours=1))
+    assert customer.has_active_subscription()
+    later = timezone.now() + timezone.timedelta(hours=2)
+    from accounts.eligibility import is_eligible
+    assert not is_eligible(customer, now=later)
+
+
+def test_process_local_cache_fails_the_shared_cache_check(settings):
+    assert [warning.id for warning in shared_cache_check(None)] == ['accounts.W001']
+
+    settings.ELIGIBILITY_CACHE_TTL = 0
+    assert shared_cache_check(None) == []
+
+    settings.ELIGIBILITY_CACHE_TTL = 300
+    redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+    with override_settings(CACHES=redis):
+        assert shared_cache_check(None) == []
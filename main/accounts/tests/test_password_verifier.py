@@ -0,0 +1,146 @@
+# accounts/tests/test_password_verifier.py
+import threading
+from datetime import timedelta
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.signals import user_login_failed
+from concurrent.futures.process import BrokenProcessPool
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from accounts.enums import UserType
+from accounts.models import User
+from accounts import password_verifier
+from accounts.password_verifier import (
+    ProcessPoolPasswordVerifier, SyncPasswordVerifier, check_user_password, get_password_verifier,
+    verify_user_credentials,
+)
+
+
+@pytest.fixture(scope='module')
+def pool_verifier():
+    verifier = ProcessPoolPasswordVerifier(max_workers=2)
+    verifier.warm_up(wait=True)
+    yield verifier
+    verifier.shutdown()
+
+
+def test_process_pool_checks_passwords(pool_verifier):
+    encoded = make_password('poolpass1')
+    assert pool_verifier.verify('poolpass1', encoded)
+    assert not pool_verifier.verify('wrongpass', encoded)
+
+    stats = pool_verifier.stats()
+    assert stats['backend'] == 'process'
+    assert stats['workers'] == 2
+    assert stats['verified'] == 2
+    assert stats['queue_depth'] == 0
+    assert stats['max_queue_depth'] >= 1
+    assert stats['fallbacks'] == 0
+
+
+def test_broken_pool_falls_back_to_sync():
+    verifier = ProcessPoolPasswordVerifier(max_workers=1)
+    with patch('accounts.password_verifier.ProcessPoolExecutor', side_effect=OSError('no processes')):
+        verifier.warm_up(wait=True)
+        assert verifier.verify('syncpass1', make_password('syncpass1'))
+    assert verifier.stats()['fallbacks'] == 1
+    assert verifier.stats()['queue_depth'] == 0
+
+
+def test_logins_do_not_wait_for_the_pool_to_boot():
+    verifier = ProcessPoolPasswordVerifier(max_workers=1)
+    booting = threading.Event()
+    with patch.object(verifier, '_start_pool', side_effect=lambda: booting.wait(5)) as start:
+        # The pool is still starting: both answered in-process right away
+        assert verifier.verify('syncpass1', make_password('syncpass1'))
+        assert verifier.verify('syncpass1', make_password('syncpass1'))
+        booting.set()
+    start.assert_called_once()
+    assert verifier.stats()['fallbacks'] == 2
+
+
+def test_pool_is_small_by_default(settings):
+    settings.PASSWORD_VERIFIER_WORKERS = 2
+    assert ProcessPoolPasswordVerifier().max_workers == 2
+
+
+def test_pool_breaking_mid_request_falls_back_to_sync(pool_verifier):
+    verifier = ProcessPoolPasswordVerifier(max_workers=1)
+    verifier._pool = pool_verifier._pool
+    with patch.object(verifier._pool, 'submit', side_effect=BrokenProcessPool()):
+        assert verifier.verify('syncpass1', make_password('syncpass1'))
+    assert verifier.stats()['fallbacks'] == 1
+    assert verifier._pool is None
+
+
+@pytest.mark.django_db
+def test_verify_user_credentials(pool_verifier, settings):
+    settings.PASSWORD_VERIFIER_BACKEND = 'accounts.password_verifier.SyncPasswordVerifier'
+    user = User.objects.create_user(username='verified', password='rightpass1', user_type=UserType.CUSTOMER)
+    assert isinstance(get_password_verifier(), SyncPasswordVerifier)
+
+    assert verify_user_credentials('verified', 'rightpass1') == user
+    assert verify_user_credentials('verified', 'wrongpass1') is None
+    assert verify_user_credentials('missing', 'rightpass1') is None
+
+    user.is_active = False
+    user.save()
+    assert verify_user_credentials('verified', 'rightpass1') is None
+
+
+@pytest.mark.django_db
+def test_failed_logins_are_signalled():
+    User.objects.create_user(username='signalled', password='rightpass1', user_type=UserType.CUSTOMER)
+    failed = []
+
+    def receiver(sender, credentials, **kwargs):
+        failed.append(credentials['username'])
+
+    user_login_failed.connect(receiver)
+    try:
+        assert verify_user_credentials('signalled', 'rightpass1') is not None
+        assert verify_user_credentials('signalled', 'wrongpass1') is None
+        assert verify_user_credentials('nobody', 'wrongpass1') is None
+    finally:
+        user_login_failed.disconnect(receiver)
+    assert failed == ['signalled', 'nobody']
+
+
+def test_dummy_hash_is_made_once_across_threads():
+    barrier = threading.Barrier(8)
+    calls = []
+
+    def slow_make_password(password):
+        calls.append(password)
+        threading.Event().wait(0.05)
+        return make_password(password)
+
+    with patch.object(password_verifier, '_dummy', []), \
+            patch('accounts.password_verifier.make_password', side_effect=slow_make_password):
+        hashes = []
+
+        def first_unknown_user():
+            barrier.wait()
+            hashes.append(password_verifier._dummy_hash())
+
+        threads = [threading.Thread(target=first_unknown_user) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(calls) == 1 and len(set(hashes)) == 1
+
+
+@pytest.mark.django_db
+def test_hash_upgrade_marks_the_user_changed():
+    user = User.objects.create_user(username='stale', password='stalepass1', user_type=UserType.CUSTOMER)
+    long_ago = timezone.now() - timedelta(days=1)
+    User.objects.filter(id=user.id).update(
+        password=make_password('stalepass1', hasher='pbkdf2_sha1'), updated_at=long_ago
+    )
+    user.refresh_from_db()
+
+    assert check_user_password(user, 'stalepass1', verifier=SyncPasswordVerifier())
+    user.refresh_from_db()
+    assert user.password.startswith('pbkdf2_sha256$')
+    assert user.updated_at > long_ago
@@ -0,0 +1,80 @@
+# accounts/tests/test_rate_limit.py
+import pytest
+from unittest.mock import patch
+from rest_framework.test import APIClient
+from accounts.enums import UserType
+from accounts.models import User
+from accounts.rate_limit import LoginRateLimiter, SharedMemoryBuckets
+from hotspots.authorization import authorize
+
+
+@pytest.fixture
+def buckets(tmp_path):
+    return SharedMemoryBuckets(path=tmp_path / 'buckets', slots=64)
+
+
+def make_limiter(buckets, **limits):
+    return LoginRateLimiter(backend=buckets, limits=limits)
+
+
+def test_bucket_allows_burst_then_refills(buckets):
+    limiter = make_limiter(buckets, username=(3, 1))
+    assert [limiter.check(username='alice', now=100.0) for _ in range(4)] == [None, None, None, 'username']
+    assert limiter.check(username='alice', now=100.5) == 'username'
+    assert limiter.check(username='alice', now=101.5) is None
+    assert limiter.stats() == {'allowed': 4, 'limited': 2}
+
+
+def test_scopes_are_independent_and_macs_normalised(buckets):
+    limiter = make_limiter(buckets, username=(100, 1), mac=(2, 1))
+    assert limiter.check(username='a', mac='AA:BB:CC:DD:EE:FF', now=1.0) is None
+    assert limiter.check(username='b', mac='aa-bb-cc-dd-ee-ff', now=1.0) is None
+    # Same device under a third username is still throttled
+    assert limiter.check(username='c', mac='aabb.ccdd.eeff', now=1.0) == 'mac'
+    assert limiter.check(username='c', mac='11:22:33:44:55:66', now=1.0) is None
+
+
+def test_refused_attempts_do_not_drain_other_buckets(buckets):
+    limiter = make_limiter(buckets, username=(1, 0.001), hotspot=(2, 0.001))
+    assert limiter.check(username='spray', hotspot='CafeNet', now=1.0) is None
+    # The username is empty; the hotspot keeps its last token for someone else
+    assert [limiter.check(username='spray', hotspot='CafeNet', now=1.0) for _ in range(5)] == ['username'] * 5
+    assert limiter.check(username='regular', hotspot='CafeNet', now=1.0) is None
+
+
+def test_buckets_are_shared_between_processes(tmp_path):
+    # Two mappings of one file behave like two worker processes
+    first = make_limiter(SharedMemoryBuckets(path=tmp_path / 'shared', slots=64), username=(2, 0.01))
+    second = make_limiter(SharedMemoryBuckets(path=tmp_path / 'shared', slots=64), username=(2, 0.01))
+    assert first.check(username='bob', now=10.0) is None
+    assert second.check(username='bob', now=10.0) is None
+    assert first.check(username='bob', now=10.0) == 'username'
+
+
+def test_table_stays_bounded_under_username_spray(buckets):
+    limiter = make_limiter(buckets, username=(1, 0.01))
+    for i in range(1000):
+        assert limiter.check(username=f"spray{i}", now=float(i)) is None
+    assert len(buckets._map) == 64 * 24
+
+
+def test_disabled_limiter_allows_everything(buckets, settings):
+    settings.LOGIN_RATE_LIMIT_ENABLED = False
+    limiter = make_limiter(buckets, username=(1, 0.01))
+    assert all(limiter.check(username='x', now=1.0) is None for _ in range(5))
+
+
+@pytest.mark.django_db
+def test_authenticate_endpoint_throttles_before_hashing(reset_login_rate_limiter):
+    reset_login_rate_limiter.limits['username'] = (2, 0.001)
+    user = User.objects.create_user(username='throttled', password='pass12345', user_type=UserType.ADMIN)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    payload = {'username': 'throttled', 'password': 'wrong', 'hotspot_ssid': 'Nowhere'}
+
+    with patch('hotspots.views.authorize', wraps=authorize) as check:
+        statuses = [client.post('/api/hotspot-auth/authenticate/', payload, format='json').status_code
+                    for _ in range(3)]
+
+    assert statuses == [404, 404, 429]
+    assert check.call_count == 2
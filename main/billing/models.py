@@ -49,6 +49,7 @@ class Subscription(models.Model):
     end_date = models.DateTimeField()
     is_active = models.BooleanField(default=True)
     auto_renew = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = "Subscription"
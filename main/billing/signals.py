@@ -1,10 +1,22 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
+from django.contrib.auth import get_user_model
+from accounts.eligibility import invalidate_eligibility
 from .models import Subscription
 
 @receiver(pre_save, sender=Subscription)
 def check_subscription_expiry(sender, instance, **kwargs):
     """Automatically deactivate expired subscriptions"""
     if instance.end_date < timezone.now():
-        instance.is_active = False
\ No newline at end of file
+        instance.is_active = False
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_subscription_eligibility(sender, instance, **kwargs):
+    """Keep the owner's cached eligibility in sync with their subscriptions"""
+    invalidate_eligibility(instance.user_id)
+
+@receiver(post_delete, sender=Subscription)
+def touch_subscription_owner(sender, instance, **kwargs):
+    """A deleted subscription leaves no updated_at behind; mark its user as changed for the auth snapshot"""
+    get_user_model().objects.filter(pk=instance.user_id).update(updated_at=timezone.now())
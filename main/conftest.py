@@ -0,0 +1,67 @@
+# conftest.py
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from accounts.credential_cache import credential_cache
+from accounts.password_verifier import reset_password_verifier
+from accounts.rate_limit import SharedMemoryBuckets, get_login_rate_limiter
+from hotspots.systemd import reset_systemd_manager
+
+
+@pytest.fixture(scope='session', autouse=True)
+def locmem_cache():
+    """Tests run without Redis; one LocMem store is shared by the test and its server threads"""
+    # Session wide, so setUpTestData and other class-level setup see it too
+    with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached auth state must not leak between tests that reuse primary keys"""
+    cache.clear()
+    credential_cache.clear()
+    yield
+    cache.clear()
+    credential_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def sync_password_verifier(settings):
+    """Hash on the test thread; the process pool is covered by its own tests"""
+    settings.PASSWORD_VERIFIER_BACKEND = 'accounts.password_verifier.SyncPasswordVerifier'
+    reset_password_verifier()
+    yield
+    reset_password_verifier()
+
+
+@pytest.fixture(autouse=True)
+def subprocess_systemd_manager(settings):
+    """Never reach the host's system bus; tests mock subprocess.run or use FakeSystemdBus"""
+    settings.SYSTEMD_MANAGER_BACKEND = 'hotspots.systemd.SubprocessSystemdManager'
+    reset_systemd_manager()
+    yield
+    reset_systemd_manager()
+
+
+@pytest.fixture(autouse=True)
+def rendered_config_dirs(settings, tmp_path):
+    """Rendered env files and units go to the test's own directory, not /etc"""
+    settings.HOTSPOT_CONFIG_DIR = str(tmp_path / 'hostapd-prod')
+    settings.SYSTEMD_UNIT_DIR = str(tmp_path / 'systemd')
+
+
+@pytest.fixture(scope='session')
+def rate_limit_buckets(tmp_path_factory):
+    return SharedMemoryBuckets(path=tmp_path_factory.mktemp('rate-limit') / 'buckets', slots=4096)
+
+
+@pytest.fixture(autouse=True)
+def reset_login_rate_limiter(rate_limit_buckets):
+    """Keep tests off the machine-wide bucket file and start every test with full buckets"""
+    limiter = get_login_rate_limiter()
+    limiter.backend = rate_limit_buckets
+    limiter.reset()
+    limits = dict(limiter.limits)
+    yield limiter
+    limiter.limits = limits
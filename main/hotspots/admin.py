@@ -1,6 +1,6 @@
 # hotspots/admin.py
 from django.contrib import admin
-from .models import Hotspot, HotspotLocation, Session
+from .models import Hotspot, HotspotLocation, NasClient, Session, SubnetAllocation
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -51,6 +51,27 @@ class SessionAdmin(admin.ModelAdmin):
             return qs.filter(hotspot__owner=request.user)
         return qs.none()
 
+class NasClientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'network', 'hotspot', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'network', 'hotspot__ssid')
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser or request.user.user_type == 1:
+            return qs
+        elif request.user.user_type == 2:
+            return qs.filter(hotspot__owner=request.user)
+        return qs.none()
+
+class SubnetAllocationAdmin(admin.ModelAdmin):
+    list_display = ('network', 'pool', 'hotspot', 'updated_at')
+    list_filter = ('pool', 'prefixlen')
+    search_fields = ('network', 'hotspot__ssid')
+    readonly_fields = ('pool', 'prefixlen', 'index', 'network')
+
 admin.site.register(HotspotLocation, HotspotLocationAdmin)
 admin.site.register(Hotspot, HotspotAdmin)
-admin.site.register(Session, SessionAdmin)
\ No newline at end of file
+admin.site.register(Session, SessionAdmin)
+admin.site.register(NasClient, NasClientAdmin)
+admin.site.register(SubnetAllocation, SubnetAllocationAdmin)
\ No newline at end of file
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class HotspotsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hotspots'
+
+    # Registering signals
+    def ready(self):
+        import hotspots.signals  # noqa
+        import hotspots.checks  # noqa
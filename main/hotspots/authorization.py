@@ -0,0 +1,231 @@
+# hotspots/authorization.py
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.db.models import Subquery
+from accounts.credential_cache import credential_cache
+from accounts.enums import UserType
+from accounts.password_verifier import (
+    check_user_password, get_password_verifier, hash_dummy_password, upgrade_password_hash
+)
+from .models import Hotspot
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+GRANTED = 'granted'
+UNKNOWN_HOTSPOT = 'unknown_hotspot'
+INVALID_CREDENTIALS = 'invalid_credentials'
+FORBIDDEN = 'forbidden'
+
+HotspotRef = namedtuple('HotspotRef', ['id', 'owner_id', 'is_active'])
+Authorization = namedtuple('Authorization', ['status', 'user', 'hotspot'])
+
+
+def _cache_key(ssid):
+    return f"hotspot_ssid:{ssid}"
+
+
+def _cache_ttl():
+    return getattr(settings, 'HOTSPOT_SSID_CACHE_TTL', 300)
+
+
+def _active_hotspot(ssid):
+    return Hotspot.objects.filter(ssid=ssid, is_active=True)
+
+
+def resolve_hotspot(ssid, cached_only=False):
+    """
+    HotspotRef of the active hotspot broadcasting ssid, or None.
+
+    Entries are evicted by the Hotspot signals of whichever process saves the
+    change, so the cache has to be shared between processes (hotspots.W001).
+    """
+    ref = cache.get(_cache_key(ssid))
+    if ref is None:
+        if cached_only:
+            return None
+        row = _active_hotspot(ssid).values_list('id', 'owner_id', 'is_active').first()
+        if row is None:
+            return None
+        ref = HotspotRef(*row)
+        cache.set(_cache_key(ssid), ref, _cache_ttl())
+    return HotspotRef(*ref)
+
+
+def invalidate_hotspot(ssid):
+    cache.delete(_cache_key(ssid))
+
+
+def owner_allowed(user, owner_id):
+    """
+    Whether user may join hotspots owned by owner_id.
+
+    Admins join everything, resellers their own hotspots and customers those
+    of their parent reseller. Works on ids only, so no related rows load.
+    """
+    if user.is_superuser or user.user_type == UserType.ADMIN:
+        return True
+    if user.user_type == UserType.RESELLER:
+        return owner_id == user.id
+    if user.user_type == UserType.CUSTOMER:
+        return user.parent_reseller_id is not None and owner_id == user.parent_reseller_id
+    return False
+
+
+def _load_user(username, ssid, with_hotspot):
+    """The user row, with the hotspot's id and owner joined in when with_hotspot"""
+    users = User._default_manager.filter(**{User.USERNAME_FIELD: username})
+    if with_hotspot:
+        hotspot = _active_hotspot(ssid)
+        users = users.annotate(
+            joined_hotspot_id=Subquery(hotspot.values('id')[:1]),
+            joined_owner_id=Subquery(hotspot.values('owner_id')[:1]),
+        )
+    return users.first()
+
+
+def _login_failed(username):
+    """What authenticate() signals on bad credentials, so lockout and audit receivers still see these"""
+    user_login_failed.send(sender=__name__, credentials={'username': username}, request=None)
+
+
+def _check_password(user, password):
+    if credential_cache.enabled and user.is_active and credential_cache.verify(user, password):
+        return True
+    if check_user_password(user, password):
+        credential_cache.remember(user, password)
+        return True
+    return False
+
+
+def authorize(username, password, ssid):
+    """
+    Decide whether username/password may join the hotspot broadcasting ssid.
+
+    Costs one query: the user row, with the hotspot joined in when the
+    SSID cache misses. Only an unknown username on an uncached SSID needs a
+    second query, to tell a missing hotspot from bad credentials.
+    """
+    hotspot = cache.get(_cache_key(ssid))
+    user = _load_user(username, ssid, with_hotspot=hotspot is None)
+
+    if hotspot is None:
+        if user is None:
+            hotspot = resolve_hotspot(ssid)
+        elif user.joined_hotspot_id is not None:
+            hotspot = HotspotRef(user.joined_hotspot_id, user.joined_owner_id, True)
+            cache.set(_cache_key(ssid), hotspot, _cache_ttl())
+    else:
+        hotspot = HotspotRef(*hotspot)
+
+    if hotspot is None:
+        return Authorization(UNKNOWN_HOTSPOT, user, None)
+    if user is None:
+        hash_dummy_password(password)
+        _login_failed(username)
+        return Authorization(INVALID_CREDENTIALS, None, hotspot)
+    if not _check_password(user, password):
+        _login_failed(username)
+        return Authorization(INVALID_CREDENTIALS, None, hotspot)
+    if not owner_allowed(user, hotspot.owner_id):
+        logger.info(f"User {username} refused on hotspot {ssid} (owner {hotspot.owner_id})")
+        return Authorization(FORBIDDEN, user, hotspot)
+    return Authorization(GRANTED, user, hotspot)
+
+
+def _resolve_hotspots(ssids):
+    """{ssid: HotspotRef} for the active ones, from the cache plus at most one query"""
+    keys = {_cache_key(ssid): ssid for ssid in ssids}
+    found = {keys[key]: HotspotRef(*ref) for key, ref in cache.get_many(keys).items()}
+    missing = set(ssids) - set(found)
+    if missing:
+        fetched = {
+            ssid: HotspotRef(hotspot_id, owner_id, is_active)
+            for ssid, hotspot_id, owner_id, is_active in Hotspot.objects.filter(
+                ssid__in=missing, is_active=True
+            ).values_list('ssid', 'id', 'owner_id', 'is_active')
+        }
+        cache.set_many({_cache_key(ssid): ref for ssid, ref in fetched.items()}, _cache_ttl())
+        found.update(fetched)
+    return found
+
+
+def authorize_many(items, max_workers=None):
+    """
+    authorize() for a batch of (username, password, ssid) tuples.
+
+    Repeated tuples are decided once, users and hotspots are loaded with one
+    query each and the distinct password checks run concurrently on the
+    password verifier. Returns the decisions in input order; ValueError if
+    an item is not three strings.
+    """
+    items = [tuple(item) for item in items]
+    # Anything unhashable would otherwise surface as a TypeError from dict.fromkeys
+    for item in items:
+        if len(item) != 3 or not all(isinstance(value, str) for value in item):
+            raise ValueError(f"Login attempts must be (username, password, ssid) strings, got {item!r}")
+    unique = list(dict.fromkeys(items))
+    if not unique:
+        return []
+
+    hotspots = _resolve_hotspots({ssid for _, _, ssid in unique})
+    usernames = {username for username, _, ssid in unique if ssid in hotspots}
+    users = {
+        getattr(user, User.USERNAME_FIELD): user
+        for user in User._default_manager.filter(**{f"{User.USERNAME_FIELD}__in": usernames})
+    }
+
+    # Each distinct (username, password) is hashed once, unknown users against the dummy hash
+    credentials = list(dict.fromkeys(
+        (username, password) for username, password, ssid in unique if ssid in hotspots
+    ))
+    valid = {}
+    pending = []
+    for username, password in credentials:
+        user = users.get(username)
+        if user is not None and user.is_active and credential_cache.enabled \
+                and credential_cache.verify(user, password):
+            valid[(username, password)] = True
+        else:
+            pending.append((username, password))
+
+    verifier = get_password_verifier()
+
+    def check(credential):
+        username, password = credential
+        user = users.get(username)
+        if user is None or not user.has_usable_password():
+            hash_dummy_password(password, verifier)
+            return False
+        return verifier.verify(password, user.password) and user.is_active
+
+    workers = max_workers or getattr(settings, 'HOTSPOT_AUTH_BATCH_WORKERS', 8)
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            valid.update(zip(pending, pool.map(check, pending)))
+    for (username, password) in pending:
+        if valid[(username, password)]:
+            upgrade_password_hash(users[username], password)
+            credential_cache.remember(users[username], password)
+
+    decisions = {}
+    for username, password, ssid in unique:
+        hotspot = hotspots.get(ssid)
+        user = users.get(username)
+        if hotspot is None:
+            decision = Authorization(UNKNOWN_HOTSPOT, user, None)
+        elif not valid[(username, password)]:
+            _login_failed(username)
+            decision = Authorization(INVALID_CREDENTIALS, None, hotspot)
+        elif not owner_allowed(user, hotspot.owner_id):
+            decision = Authorization(FORBIDDEN, user, hotspot)
+        else:
+            decision = Authorization(GRANTED, user, hotspot)
+        decisions[(username, password, ssid)] = decision
+    return [decisions[item] for item in items]
@@ -0,0 +1,18 @@
+# hotspots/checks.py
+from django.conf import settings
+from django.core.checks import Warning, register
+from accounts.checks import PROCESS_LOCAL_CACHES
+
+
+@register()
+def shared_ssid_cache_check(app_configs, **kwargs):
+    """Renamed or deleted hotspots are evicted from the SSID cache only in the saving process"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES or not getattr(settings, 'HOTSPOT_SSID_CACHE_TTL', 300):
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is local to each process.",
+        hint="Configure a shared cache (Redis or Memcached) in CACHES, or set HOTSPOT_SSID_CACHE_TTL = 0; "
+             "otherwise a renamed or deleted hotspot keeps authorizing logins for up to the TTL.",
+        id='hotspots.W001',
+    )]
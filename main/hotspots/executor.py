@@ -0,0 +1,238 @@
+# hotspots/executor.py
+import os
+import time
+import signal
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from django.conf import settings
+from django.db import close_old_connections
+from .fleet import collect_fleet_status
+from .models import Hotspot
+from .operations import acquire_lease, radio_lease, release_lease
+from .radios import apply_radio, serves_as_bss
+from .services import HotspotControlService
+from .systemd import unit_name
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('start', 'stop', 'restart')
+LEASE_OWNER = 'fleet'
+
+OperationResult = namedtuple('OperationResult', [
+    'action', 'hotspot_id', 'success', 'returncode', 'stdout', 'stderr', 'duration', 'timed_out', 'cancelled',
+])
+
+# One unit of work: a systemctl call on a hotspot's unit, or re-applying a multi-BSS radio
+# for all of its hotspots in the batch. pairs are the (action, hotspot_id) it answers for.
+Step = namedtuple('Step', ['kind', 'action', 'unit', 'interface', 'pairs'])
+
+
+def systemctl_command(action, unit):
+    return ['sudo', 'systemctl', action, unit]
+
+
+def _result(action, hotspot_id, success, stderr='', **fields):
+    values = dict(returncode=None, stdout='', duration=0.0, timed_out=False, cancelled=False)
+    values.update(fields)
+    return OperationResult(action, hotspot_id, success, stderr=stderr, **values)
+
+
+class FleetExecutor:
+    """
+    Start, stop or restart many hotspots at once on asyncio subprocesses.
+
+    At most max_concurrency (HOTSPOT_FLEET_CONCURRENCY) commands run at a
+    time on this host, and one at a time per wireless interface. Each
+    command is killed after timeout (HOTSPOT_FLEET_COMMAND_TIMEOUT)
+    seconds. Setting cancel stops queued commands from starting and kills
+    the running ones. Results are yielded as commands finish.
+
+    Hotspots are leased like Celery control tasks and the reconciler lease
+    them (OperationLease rows), so a batch skips hotspots any process on the
+    same database is operating on, and they wait for the batch.
+    """
+
+    def __init__(self, max_concurrency=None, timeout=None, cancel=None):
+        self.max_concurrency = max_concurrency or getattr(settings, 'HOTSPOT_FLEET_CONCURRENCY', 8)
+        self.timeout = timeout or getattr(settings, 'HOTSPOT_FLEET_COMMAND_TIMEOUT', 60)
+        self.cancel = cancel or threading.Event()
+
+    def prepare(self, operations):
+        """
+        Database work for a batch, done before the event loop starts.
+
+        The last action given for a hotspot wins. Leases are taken,
+        desired_state recorded and config rendered; multi-BSS hotspots are
+        grouped into one step per radio. Returns (steps, results, leased):
+        results holds the operations that already failed, leased the
+        hotspots whose lease the batch now holds.
+        """
+        wanted = {}
+        for action, hotspot_id in operations:
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown action {action!r}")
+            wanted.pop(hotspot_id, None)
+            wanted[hotspot_id] = action
+
+        hotspots = Hotspot.objects.in_bulk(list(wanted))
+        steps, results, leased, radios = [], [], [], {}
+        for hotspot_id, action in wanted.items():
+            hotspot = hotspots.get(hotspot_id)
+            if hotspot is None:
+                results.append(_result(action, hotspot_id, False, f"Hotspot {hotspot_id} not found"))
+                continue
+            if not acquire_lease(hotspot_id, LEASE_OWNER):
+                results.append(_result(action, hotspot_id, False, 'another operation is in progress'))
+                continue
+            leased.append(hotspot)
+
+            desired = Hotspot.DesiredState.STOPPED if action == 'stop' else Hotspot.DesiredState.RUNNING
+            if not hotspot.set_desired_state(desired):
+                results.append(_result(action, hotspot_id, False, f"A running hotspot already uses SSID {hotspot.ssid}"))
+                continue
+
+            if serves_as_bss(hotspot):
+                radios.setdefault(hotspot.interface, []).append((action, hotspot_id))
+                continue
+            command = action
+            if action != 'stop':
+                try:
+                    plan = HotspotControlService.prepare_config(hotspot)
+                except Exception as e:
+                    results.append(_result(action, hotspot_id, False, f"Config generation failed: {e}"))
+                    continue
+                # A running unit only picks up new files when restarted; restart starts a stopped one
+                if plan.action != 'none':
+                    command = 'restart'
+            steps.append(Step('systemctl', command, unit_name(hotspot_id), hotspot.interface, [(action, hotspot_id)]))
+
+        for interface, pairs in radios.items():
+            steps.append(Step('radio', 'apply', None, interface, pairs))
+        return steps, results, leased
+
+    async def _wait(self, awaitable):
+        """Await with the timeout, ending early when cancel is set; (done, value)"""
+        task = asyncio.ensure_future(awaitable)
+        deadline = time.monotonic() + self.timeout
+        while not task.done():
+            if self.cancel.is_set() or time.monotonic() >= deadline:
+                task.cancel()
+                return False, None
+            await asyncio.wait({task}, timeout=min(0.1, max(deadline - time.monotonic(), 0)))
+        return True, task.result()
+
+    @staticmethod
+    async def _terminate(process, grace=5):
+        """
+        End the command's whole process group, so no child keeps its pipes open.
+
+        SIGTERM first: sudo relays it to the root-owned systemctl, which the
+        Django user could not signal itself.
+        """
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+            try:
+                await asyncio.wait_for(process.wait(), grace)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    async def _systemctl(self, step):
+        process = await asyncio.create_subprocess_exec(
+            *systemctl_command(step.action, step.unit),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True,
+        )
+        try:
+            done, output = await self._wait(process.communicate())
+        finally:
+            if process.returncode is None:
+                await self._terminate(process)
+        if not done:
+            return {'success': False, 'returncode': process.returncode, 'stdout': '',
+                    'stderr': 'cancelled' if self.cancel.is_set() else f"timed out after {self.timeout}s",
+                    'timed_out': not self.cancel.is_set(), 'cancelled': self.cancel.is_set()}
+        stdout, stderr = (part.decode(errors='replace') for part in output)
+        return {'success': process.returncode == 0, 'returncode': process.returncode,
+                'stdout': stdout, 'stderr': stderr}
+
+    async def _radio(self, step):
+        def apply():
+            try:
+                with radio_lease(step.interface) as acquired:
+                    if not acquired:
+                        return {'success': False, 'stderr': f'another operation is in progress on {step.interface}'}
+                    return apply_radio(step.interface)
+            finally:
+                close_old_connections()
+        # A thread cannot be killed: on timeout the reload still finishes in the background
+        done, result = await self._wait(asyncio.to_thread(apply))
+        if not done:
+            return {'success': False, 'stderr': f"{step.interface} still reloading after {self.timeout}s",
+                    'timed_out': not self.cancel.is_set(), 'cancelled': self.cancel.is_set()}
+        return {'success': result['success'], 'stdout': result.get('stdout', ''), 'stderr': result.get('stderr', '')}
+
+    async def _run(self, step, slots, interface_locks):
+        # Waiting for the interface holds no slot, so other radios keep going meanwhile
+        lock = interface_locks.setdefault(step.interface, asyncio.Lock()) if step.interface else None
+        if lock:
+            await lock.acquire()
+        try:
+            async with slots:
+                started = time.monotonic()
+                if self.cancel.is_set():
+                    outcome = {'success': False, 'stderr': 'cancelled', 'cancelled': True}
+                elif step.kind == 'radio':
+                    outcome = await self._radio(step)
+                else:
+                    outcome = await self._systemctl(step)
+                duration = round(time.monotonic() - started, 3)
+        finally:
+            if lock:
+                lock.release()
+        return [_result(action, hotspot_id, duration=duration, **outcome) for action, hotspot_id in step.pairs]
+
+    async def stream(self, steps):
+        """Yield OperationResults of steps as they finish"""
+        slots = asyncio.Semaphore(self.max_concurrency)
+        interface_locks = {}
+        tasks = [asyncio.create_task(self._run(step, slots, interface_locks)) for step in steps]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for result in await finished:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run(self, operations, on_result=None):
+        """
+        Carry out (action, hotspot_id) operations and return their OperationResults.
+
+        on_result is called with each result as soon as it is known.
+        Afterwards the hotspots are observed once and their is_active flags
+        corrected.
+        """
+        on_result = on_result or (lambda result: None)
+        steps, results, leased = self.prepare(operations)
+        for result in results:
+            on_result(result)
+        logger.info(f"Running {len(steps)} fleet steps, {self.max_concurrency} at a time")
+
+        async def consume():
+            async for result in self.stream(steps):
+                results.append(result)
+                on_result(result)
+        try:
+            asyncio.run(consume())
+        finally:
+            for hotspot in leased:
+                release_lease(hotspot.id, LEASE_OWNER)
+        if leased:
+            collect_fleet_status(leased, reconcile=True)
+        return results
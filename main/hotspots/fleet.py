@@ -0,0 +1,92 @@
+# hotspots/fleet.py
+import os
+import logging
+from django.utils import timezone
+from .authorization import invalidate_hotspot
+from .interfaces import interface_serving
+from .models import Hotspot
+from .processes import process_snapshot
+from .radios import serves_as_bss, serving_ssids, unit_for
+from .systemd import get_systemd_manager
+
+logger = logging.getLogger(__name__)
+
+SYSFS_NET_ROOT = '/sys/class/net'
+
+
+def interface_states(interfaces, sysfs_root=None):
+    """operstate of each interface read from sysfs; 'missing' when it does not exist"""
+    sysfs_root = sysfs_root or SYSFS_NET_ROOT
+    states = {}
+    for name in set(interfaces):
+        try:
+            with open(os.path.join(sysfs_root, name, 'operstate')) as f:
+                states[name] = f.read().strip()
+        except OSError:
+            states[name] = 'missing'
+    return states
+
+
+def collect_fleet_status(hotspots, sysfs_root=None, reconcile=True):
+    """
+    Status of many hotspots from one systemd query, one process scan and one sysfs pass.
+
+    A hotspot counts as running when its unit is active, or when its hostapd
+    and dnsmasq run and its interface is up (same rule as
+    HotspotControlService.is_hotspot_running). A hotspot served as one BSS
+    of a shared radio hostapd runs when the radio unit is active and
+    beacons its SSID; each active radio is asked once. With reconcile, drifted
+    Hotspot.is_active flags are corrected in one bulk_update.
+    """
+    hotspots = list(hotspots)
+    units = get_systemd_manager().active_states({unit_for(hotspot) for hotspot in hotspots})
+    radios = {
+        hotspot.interface for hotspot in hotspots
+        if serves_as_bss(hotspot) and units[unit_for(hotspot)] == 'active'
+    }
+    radio_ssids = {interface: serving_ssids(interface) for interface in radios}
+    interfaces = interface_states(
+        (hotspot.interface for hotspot in hotspots if hotspot.interface), sysfs_root
+    )
+    process_snapshot.invalidate()
+    daemons = process_snapshot.running_hotspots()
+
+    now = timezone.now()
+    statuses = []
+    drifted = []
+    for hotspot in hotspots:
+        unit_state = units[unit_for(hotspot)]
+        running_daemons = daemons.get(hotspot.id, set())
+        interface_state = interfaces.get(hotspot.interface) if hotspot.interface else None
+        interface_up = interface_serving(interface_state)
+        if serves_as_bss(hotspot):
+            is_running = hotspot.ssid in radio_ssids.get(hotspot.interface, ())
+        else:
+            is_running = unit_state == 'active' or (
+                {'hostapd', 'dnsmasq'} <= running_daemons and interface_up
+            )
+        if reconcile and hotspot.is_active != is_running:
+            hotspot.is_active = is_running
+            hotspot.updated_at = now
+            drifted.append(hotspot)
+        statuses.append({
+            'id': hotspot.id,
+            'ssid': hotspot.ssid,
+            'is_running': is_running,
+            'unit_state': unit_state,
+            'hostapd_running': 'hostapd' in running_daemons,
+            'dnsmasq_running': 'dnsmasq' in running_daemons,
+            'interface': hotspot.interface or None,
+            'interface_state': interface_state,
+        })
+
+    if drifted:
+        Hotspot.objects.bulk_update(drifted, ['is_active', 'updated_at'])
+        # bulk_update skips signals, so drop the SSID cache entries here
+        for hotspot in drifted:
+            invalidate_hotspot(hotspot.ssid)
+        logger.info(f"Reconciled is_active for {len(drifted)} hotspots")
+
+    for hotspot, status in zip(hotspots, statuses):
+        status['is_active'] = hotspot.is_active
+    return statuses
@@ -0,0 +1,246 @@
+# hotspots/hostapd.py
+import os
+import re
+import socket
+import logging
+import tempfile
+import threading
+import itertools
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# hostapd_cli uses 4096; STATUS on a busy multi-BSS radio can be longer
+REPLY_SIZE = 16384
+BSS_KEY = re.compile(r'^(\w+)\[(\d+)\]$')
+# STATUS and STA fields that are counts or numbers; everything else (ssid, bssid, ...) stays text
+NUMERIC_KEYS = frozenset({
+    'num_sta', 'max_num_sta', 'channel', 'freq', 'secondary_channel', 'ieee80211n', 'ieee80211ac',
+    'ieee80211ax', 'beacon_int', 'dtim_period', 'max_txpower', 'cac_time_seconds', 'cac_time_left_seconds',
+    'rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes', 'inactive_msec', 'connected_time', 'aid',
+    'listen_interval', 'signal',
+})
+
+_local_names = itertools.count()
+
+
+class HostapdControlError(Exception):
+    pass
+
+
+def control_socket_path(interface):
+    return os.path.join(getattr(settings, 'HOSTAPD_CTRL_DIR', '/var/run/hostapd'), interface)
+
+
+def script_config_path(hotspot_id):
+    """hostapd.conf the start script writes for a standalone hotspot"""
+    return os.path.join(
+        getattr(settings, 'HOSTAPD_SCRIPT_CONFIG_DIR', '/etc/hostapd-prod'), f'hotspot_{hotspot_id}.hostapd.conf'
+    )
+
+
+def channel_frequency(channel):
+    """Centre frequency in MHz of a 2.4 or 5 GHz channel number"""
+    if channel == 14:
+        return 2484
+    return 2407 + 5 * channel if channel < 14 else 5000 + 5 * channel
+
+
+def _parse_pairs(lines):
+    values = {}
+    for line in lines:
+        if '=' in line:
+            key, value = line.split('=', 1)
+            match = BSS_KEY.match(key)
+            numeric = (match.group(1) if match else key) in NUMERIC_KEYS
+            values[key] = int(value) if numeric and value.lstrip('-').isdigit() else value
+    return values
+
+
+class HostapdControl:
+    """
+    Client for one hostapd control socket (the interface hostapd_cli talks to).
+
+    The datagram socket is bound once and kept open, so every command is a
+    single send/recv instead of a hostapd_cli process. Requests on one
+    client are serialised; a broken socket is reopened once per request.
+    """
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout or getattr(settings, 'HOSTAPD_CTRL_TIMEOUT', 2)
+        self._sock = None
+        self._local = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        local = os.path.join(tempfile.gettempdir(), f"wifi-ctrl-{os.getpid()}-{next(_local_names)}")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(local):
+                os.unlink(local)
+            sock.bind(local)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            if os.path.exists(local):
+                os.unlink(local)
+            raise
+        self._sock, self._local = sock, local
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self._local and os.path.exists(self._local):
+            os.unlink(self._local)
+        self._local = None
+
+    def _exchange(self, command):
+        if self._sock is None:
+            self._connect()
+        self._sock.send(command.encode())
+        while True:
+            reply = self._sock.recv(REPLY_SIZE).decode(errors='replace')
+            # Unsolicited "<level>EVENT" messages only arrive after ATTACH; skip them anyway
+            if not reply.startswith('<'):
+                return reply
+
+    def request(self, command):
+        """Send one command and return hostapd's reply text"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    return self._exchange(command)
+                except socket.timeout as e:
+                    # A late reply would be taken as the answer to the next command
+                    self._disconnect()
+                    raise HostapdControlError(f"{command} timed out on {self.path}") from e
+                except OSError as e:
+                    self._disconnect()
+                    if attempt:
+                        raise HostapdControlError(f"{command} failed on {self.path}: {e}") from e
+
+    def ping(self):
+        try:
+            return self.request('PING').strip() == 'PONG'
+        except HostapdControlError:
+            return False
+
+    def reload(self):
+        """Re-apply the running configuration (after SET) without restarting the process"""
+        return self.request('RELOAD').strip() == 'OK'
+
+    def _expect_ok(self, command):
+        reply = self.request(command).strip()
+        if reply != 'OK':
+            # Name the command but not its value, which may be a passphrase
+            name = ' '.join(command.split(' ')[:2])
+            raise HostapdControlError(f"{name} refused by {self.path}: {reply}")
+
+    def set(self, name, value):
+        """Change one setting of the running hostapd; some only take effect after reload()"""
+        self._expect_ok(f'SET {name} {value}')
+
+    def chan_switch(self, channel, beacon_count=5):
+        """Move the BSS to channel with a channel switch announcement; stations follow"""
+        self._expect_ok(f'CHAN_SWITCH {beacon_count} {channel_frequency(channel)}')
+
+    def status(self):
+        """STATUS as a dict; per-BSS keys like num_sta[0] are kept as they are"""
+        return _parse_pairs(self.request('STATUS').splitlines())
+
+    def bss_status(self):
+        """Per-BSS entries from STATUS: [{'ifname', 'ssid', 'num_sta', ...}]"""
+        bsses = {}
+        for key, value in self.status().items():
+            match = BSS_KEY.match(key)
+            if match:
+                name = 'ifname' if match.group(1) == 'bss' else match.group(1)
+                bsses.setdefault(int(match.group(2)), {})[name] = value
+        return [bsses[index] for index in sorted(bsses)]
+
+    def station_count(self, ssid=None):
+        """Associated stations, of one BSS when ssid is given; one round-trip"""
+        return sum(
+            bss.get('num_sta', 0) for bss in self.bss_status()
+            if ssid is None or bss.get('ssid') == ssid
+        )
+
+    def _parse_station(self, reply):
+        lines = reply.splitlines()
+        if not lines or lines[0].strip() in ('', 'FAIL'):
+            return None
+        return {'address': lines[0].strip(), **_parse_pairs(lines[1:])}
+
+    def station(self, address):
+        """Counters of one station (rx/tx bytes and packets, connected_time, ...)"""
+        return self._parse_station(self.request(f'STA {address}'))
+
+    def stations(self):
+        """Every associated station with its counters, walked with STA-FIRST/STA-NEXT"""
+        found = []
+        station = self._parse_station(self.request('STA-FIRST'))
+        while station is not None:
+            found.append(station)
+            station = self._parse_station(self.request(f"STA-NEXT {station['address']}"))
+        return found
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+_controls = {}
+_controls_lock = threading.Lock()
+
+
+def control_at(path):
+    """The shared client for the control socket at path; its socket stays open between calls"""
+    with _controls_lock:
+        control = _controls.get(path)
+        if control is None:
+            control = _controls[path] = HostapdControl(path)
+        return control
+
+
+def control_for(interface):
+    return control_at(control_socket_path(interface))
+
+
+def find_interface(hotspot_id, ssid):
+    """
+    Interface a hotspot's hostapd runs on when the row does not name one.
+
+    The start script detects the interface itself, so it is read back from
+    the hostapd.conf the script wrote, else from whichever control socket
+    beacons ssid. None when neither knows it.
+    """
+    try:
+        with open(script_config_path(hotspot_id)) as f:
+            for line in f:
+                if line.startswith('interface='):
+                    return line.split('=', 1)[1].strip() or None
+    except OSError:
+        pass
+
+    try:
+        names = sorted(os.listdir(getattr(settings, 'HOSTAPD_CTRL_DIR', '/var/run/hostapd')))
+    except OSError:
+        return None
+    for name in names:
+        try:
+            if any(bss.get('ssid') == ssid for bss in control_for(name).bss_status()):
+                return name
+        except HostapdControlError:
+            continue
+    return None
+
+
+def close_controls():
+    with _controls_lock:
+        controls = list(_controls.values())
+        _controls.clear()
+    for control in controls:
+        control.close()
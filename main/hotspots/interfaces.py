@@ -0,0 +1,169 @@
+# hotspots/interfaces.py
+import os
+import logging
+import threading
+import subprocess
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+SYSFS_ROOT = '/sys'
+IFF_UP = 0x1
+# Drivers that do not report carrier leave a working AP interface 'unknown'
+SERVING_OPERSTATES = frozenset({'up', 'unknown'})
+
+WirelessInterface = namedtuple('WirelessInterface', ['name', 'phy', 'operstate', 'is_up', 'rfkill_blocked', 'ap_capable'])
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def interface_serving(operstate):
+    """
+    Whether a hotspot's interface in operstate can be serving clients.
+
+    None means the hotspot names no interface, so there is nothing to
+    check. The one rule for the per-hotspot and the fleet status.
+    """
+    return operstate is None or operstate in SERVING_OPERSTATES
+
+
+def parse_interface_modes(output):
+    """The 'Supported interface modes' listed by `iw phy <phy> info`"""
+    modes = set()
+    listing = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('Supported interface modes'):
+            listing = True
+        elif listing and stripped.startswith('* '):
+            modes.add(stripped[2:].strip())
+        elif listing:
+            break
+    return modes
+
+
+def probe_interface_modes(phy):
+    """Ask nl80211 (through iw) what a phy supports; None when it cannot be asked"""
+    try:
+        result = subprocess.run(['iw', 'phy', phy, 'info'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"iw phy {phy} info failed: {e}")
+        return None
+    if result.returncode != 0:
+        logger.warning(f"iw phy {phy} info failed: {result.stderr.strip()}")
+        return None
+    return parse_interface_modes(result.stdout)
+
+
+class InterfaceInventory:
+    """
+    Wireless interfaces of this host, read from sysfs.
+
+    Which interfaces exist and the phy behind each is rescanned only when
+    the entries of /sys/class/net change, i.e. when an interface appears or
+    disappears (the events udev reacts to); otherwise a lookup costs one
+    listdir. A phy's supported modes come from one `iw phy` call per phy,
+    cached until the phy is replaced (a new index or MAC address).
+    operstate, admin state and rfkill are read fresh from sysfs each time,
+    since they change without hotplug.
+    """
+
+    def __init__(self, sysfs_root=None, probe=None):
+        self.sysfs_root = sysfs_root or SYSFS_ROOT
+        self._probe = probe or probe_interface_modes
+        self._lock = threading.Lock()
+        self._names = None
+        self._phys = {}
+        self._modes = {}
+        self.scans = 0
+        self.probes = 0
+
+    def _net(self, *parts):
+        return os.path.join(self.sysfs_root, 'class', 'net', *parts)
+
+    def _phy(self, *parts):
+        return os.path.join(self.sysfs_root, 'class', 'ieee80211', *parts)
+
+    def _wireless(self):
+        """{interface: phy}, rebuilt when the set of network interfaces changed"""
+        try:
+            names = frozenset(os.listdir(self._net()))
+        except OSError:
+            names = frozenset()
+        with self._lock:
+            if names != self._names:
+                phys = {}
+                for name in names:
+                    phy = _read(self._net(name, 'phy80211', 'name'))
+                    # Drivers without cfg80211 only have a wireless directory, and no phy to ask
+                    if phy or os.path.isdir(self._net(name, 'wireless')):
+                        phys[name] = phy
+                self._names, self._phys = names, phys
+                self.scans += 1
+                logger.debug(f"Wireless interfaces: {phys}")
+            return self._phys
+
+    def invalidate(self):
+        with self._lock:
+            self._names = None
+
+    def interfaces(self):
+        """Names of the wireless interfaces, sorted"""
+        return sorted(self._wireless())
+
+    def phy_of(self, interface):
+        return self._wireless().get(interface)
+
+    def supported_modes(self, phy):
+        """Interface modes the phy supports, e.g. {'managed', 'AP', 'monitor'}"""
+        key = (phy, _read(self._phy(phy, 'index')), _read(self._phy(phy, 'macaddress')))
+        with self._lock:
+            if key in self._modes:
+                return self._modes[key]
+        modes = self._probe(phy)
+        self.probes += 1
+        if modes is not None:
+            with self._lock:
+                self._modes[key] = modes
+        return modes or set()
+
+    def ap_capable(self, interface):
+        phy = self.phy_of(interface)
+        return bool(phy) and 'AP' in self.supported_modes(phy)
+
+    def operstate(self, interface):
+        """operstate ('up', 'down', 'dormant', ...) or 'missing'"""
+        return _read(self._net(interface, 'operstate')) or 'missing'
+
+    def is_up(self, interface):
+        """Administratively up (IFF_UP), whether or not it has a link"""
+        flags = _read(self._net(interface, 'flags'))
+        return bool(flags) and bool(int(flags, 16) & IFF_UP)
+
+    def rfkill_blocked(self, interface):
+        """Soft or hard rfkill block on the interface's phy"""
+        phy = self.phy_of(interface)
+        if not phy:
+            return False
+        try:
+            switches = [entry for entry in os.listdir(self._phy(phy)) if entry.startswith('rfkill')]
+        except OSError:
+            return False
+        return any(
+            _read(self._phy(phy, switch, state)) == '1' for switch in switches for state in ('soft', 'hard')
+        )
+
+    def describe(self, interface):
+        return WirelessInterface(
+            interface, self.phy_of(interface), self.operstate(interface), self.is_up(interface),
+            self.rfkill_blocked(interface), self.ap_capable(interface),
+        )
+
+
+inventory = InterfaceInventory()
@@ -1,6 +1,7 @@
 # management/commands/generate_hotspot_env.py
 from django.core.management.base import BaseCommand
 from hotspots.models import Hotspot
+from hotspots.subnets import hotspot_network
 import os
 
 class Command(BaseCommand):
@@ -15,6 +16,7 @@ class Command(BaseCommand):
             os.makedirs('/tmp/hostapd-prod', exist_ok=True)
             
             hotspot = Hotspot.objects.get(pk=options['hotspot_id'])
+            network = hotspot_network(hotspot)
             
             config = f"""# Hostapd production environment config for hotspot {hotspot.id}
 ENABLE_LOG="1"
@@ -22,13 +24,13 @@ LOG_FILE="/var/log/prod_ap_{hotspot.id}.log"
 INTERFACE="wlo1"
 SSID="{hotspot.ssid or "TestNet"}"
 PASSPHRASE="{hotspot.password or "1234567890"}"
-AP_IP="192.168.{hotspot.id}.1"
-NETMASK="255.255.255.0"
+AP_IP="{network['address']}"
+NETMASK="{network['netmask']}"
 CHANNEL={hotspot.channel or 6}
 
 # DHCP config
-DHCP_RANGE_START="192.168.{hotspot.id}.10"
-DHCP_RANGE_END="192.168.{hotspot.id}.100"
+DHCP_RANGE_START="{network['dhcp_start']}"
+DHCP_RANGE_END="{network['dhcp_end']}"
 DHCP_LEASE_TIME="12h"
 INTERNET_IFACE="eth0"
 """
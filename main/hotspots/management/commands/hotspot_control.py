@@ -1,8 +1,12 @@
 # hotspots/management/commands/hotspotctl.py
 import os
+import json
 import subprocess
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from hotspots.fleet import collect_fleet_status
 from hotspots.models import Hotspot
+from hotspots.services import HotspotControlService
+from hotspots.subnets import hotspot_network
 
 class Command(BaseCommand):
     help = 'Control hotspot operations'
@@ -10,11 +14,18 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('action', choices=['start', 'stop', 'restart', 'status'])
         parser.add_argument('hotspot_id', type=int, nargs='?')
+        parser.add_argument('--all', action='store_true', help='Every hotspot')
+        parser.add_argument('--ids', type=int, nargs='+', help='These hotspots')
+        parser.add_argument('--concurrency', type=int, help='Commands in flight at once (HOTSPOT_FLEET_CONCURRENCY)')
+        parser.add_argument('--timeout', type=float, help='Seconds per command (HOTSPOT_FLEET_COMMAND_TIMEOUT)')
 
     def handle(self, *args, **options):
         action = options['action']
         hotspot_id = options['hotspot_id']
 
+        if options['all'] or options['ids']:
+            return self.handle_fleet(action, options)
+
         if action in ['start', 'restart'] and not hotspot_id:
             self.stderr.write("Error: hotspot_id is required for start/restart actions")
             return
@@ -40,23 +51,52 @@ class Command(BaseCommand):
         except Hotspot.DoesNotExist:
             self.stderr.write(f"Error: Hotspot with ID {hotspot_id} does not exist")
 
+    def handle_fleet(self, action, options):
+        """Run action on many hotspots at once, printing one JSON line per result as it finishes"""
+        hotspots = Hotspot.objects.order_by('id')
+        if not options['all']:
+            hotspots = hotspots.filter(id__in=options['ids'])
+
+        if action == 'status':
+            for status in collect_fleet_status(hotspots):
+                self.stdout.write(json.dumps(status, default=str))
+            return
+
+        operations = [(action, hotspot.id) for hotspot in hotspots]
+        if options['ids']:
+            # Unknown ids are reported rather than dropped
+            known = {hotspot_id for _, hotspot_id in operations}
+            operations += [(action, hotspot_id) for hotspot_id in options['ids'] if hotspot_id not in known]
+
+        results = HotspotControlService().execute_fleet_commands(
+            operations,
+            max_concurrency=options['concurrency'],
+            timeout=options['timeout'],
+            on_result=lambda result: self.stdout.write(json.dumps(result._asdict())),
+        )
+        failed = [result for result in results if not result.success]
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(results)} operations failed")
+        self.stdout.write(self.style.SUCCESS(f"{action} succeeded for {len(results)} hotspots"))
+
     def generate_env_file(self, hotspot):
         config_dir = '/tmp/hostapd-prod'
         os.makedirs(config_dir, exist_ok=True)
         
+        network = hotspot_network(hotspot)
         config = f"""# Hostapd production environment config
 ENABLE_LOG="1"
 LOG_FILE="/var/log/prod_ap_{hotspot.id}.log"
 INTERFACE="wlo1"
 SSID="{hotspot.ssid}"
 PASSPHRASE="{hotspot.password}"
-AP_IP="192.168.{hotspot.id}.1"
-NETMASK="255.255.255.0"
+AP_IP="{network['address']}"
+NETMASK="{network['netmask']}"
 CHANNEL={hotspot.channel or 6}
 
 # DHCP config
-DHCP_RANGE_START="192.168.{hotspot.id}.10"
-DHCP_RANGE_END="192.168.{hotspot.id}.100"
+DHCP_RANGE_START="{network['dhcp_start']}"
+DHCP_RANGE_END="{network['dhcp_end']}"
 DHCP_LEASE_TIME="12h"
 INTERNET_IFACE="eth0"
 """
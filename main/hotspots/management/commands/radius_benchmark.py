@@ -0,0 +1,266 @@
+# hotspots/management/commands/radius_benchmark.py
+import json
+import math
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pyrad.client import Client, Timeout
+from pyrad.dictionary import Dictionary
+from pyrad.packet import AccessAccept, AccessRequest
+from accounts.enums import UserType
+from billing.models import Plan, Subscription
+from hotspots.models import Hotspot, HotspotLocation
+from hotspots.radius.server import DICTIONARY_PATH, RadiusServer
+
+User = get_user_model()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'max': round(values[-1], 3) if values else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Seed RADIUS users and measure Access-Request throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users to seed with an active subscription')
+        parser.add_argument('--requests', type=int, default=1000, help='Total Access-Requests to send')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+        parser.add_argument('--rate', type=float, default=0, help='Target requests per second (0 = as fast as possible)')
+        parser.add_argument('--bad-password-ratio', type=float, default=0.0,
+                            help='Fraction of requests sent with a wrong password')
+        parser.add_argument('--accounting', action='store_true',
+                            help='Send Accounting Start/Stop for every accepted login')
+        parser.add_argument('--server', default='127.0.0.1', help='RADIUS server address')
+        parser.add_argument('--auth-port', type=int, help='Authentication port (default: RADIUS_AUTH_PORT)')
+        parser.add_argument('--acct-port', type=int, help='Accounting port (default: RADIUS_ACCT_PORT)')
+        parser.add_argument('--secret', help='Shared secret (default: RADIUS_CLIENTS entry for 127.0.0.1)')
+        parser.add_argument('--timeout', type=float, default=5, help='Seconds to wait for each reply')
+        parser.add_argument('--prefix', default='bench_user_', help='Username prefix for seeded users')
+        parser.add_argument('--password', default='bench-password', help='Password for seeded users')
+        parser.add_argument('--embedded', action='store_true',
+                            help='Run a RadiusServer in this process on ephemeral ports')
+        parser.add_argument('--rate-limit', action='store_true',
+                            help='Keep the login rate limiter on in the embedded server')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        usernames = self.seed_users(options['users'], options['prefix'], options['password'])
+        if options['accounting']:
+            # Accounting is attributed through NAS-Identifier hotspot_<id>; without a hotspot every record is dropped
+            options['nas_identifier'] = f"hotspot_{self.seed_hotspot().id}"
+        secret = (options['secret'] or getattr(settings, 'RADIUS_CLIENTS', {}).get('127.0.0.1', 'testing123'))
+
+        if options['embedded']:
+            # Every request comes from 127.0.0.1 for a handful of users, so the login
+            # rate limiter would answer most of them; it is off unless asked for
+            with EmbeddedServer(rate_limit=options['rate_limit']) as server:
+                options['server'] = '127.0.0.1'
+                options['auth_port'] = server.auth_address[1]
+                options['acct_port'] = server.acct_address[1]
+                report = self.run_load(usernames, secret.encode(), options)
+                report['server_stats'] = dict(server.server.stats)
+            # Throttled replies are Access-Rejects too; count them apart from credential rejects
+            throttled = report['server_stats']['rate_limited']
+            answered = report['accepted'] + report['rejected']
+            report['rate_limited'] = throttled
+            report['rejected'] -= throttled
+            report['reject_ratio'] = round(report['rejected'] / answered, 4) if answered else 0.0
+        else:
+            options['auth_port'] = options['auth_port'] or getattr(settings, 'RADIUS_AUTH_PORT', 1812)
+            options['acct_port'] = options['acct_port'] or getattr(settings, 'RADIUS_ACCT_PORT', 1813)
+            report = self.run_load(usernames, secret.encode(), options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def seed_users(self, count, prefix, password):
+        """Create missing benchmark users, each with a running subscription"""
+        usernames = [f"{prefix}{i}" for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        missing = [name for name in usernames if name not in existing]
+        if missing:
+            # One hash for everyone keeps seeding fast; every login still runs the hasher
+            encoded = make_password(password)
+            users = User.objects.bulk_create([
+                User(username=name, password=encoded, user_type=UserType.CUSTOMER) for name in missing
+            ])
+            plan, _ = Plan.objects.get_or_create(
+                name='Benchmark Plan', defaults={'price': 0, 'duration_days': 365}
+            )
+            end_date = timezone.now() + timezone.timedelta(days=plan.duration_days)
+            Subscription.objects.bulk_create([
+                Subscription(user=user, plan=plan, end_date=end_date, is_active=True) for user in users
+            ])
+            self.stderr.write(f"Seeded {len(missing)} benchmark users")
+        return usernames
+
+    def seed_hotspot(self):
+        """The hotspot benchmark sessions are accounted to; stopped, so nothing tries to run it"""
+        owner, _ = User.objects.get_or_create(
+            username='radius_benchmark_owner', defaults={'user_type': UserType.RESELLER}
+        )
+        location, _ = HotspotLocation.objects.get_or_create(
+            name='Benchmark Location', defaults={'address': 'radius_benchmark', 'latitude': 0, 'longitude': 0}
+        )
+        hotspot, created = Hotspot.objects.get_or_create(
+            owner=owner, ssid='radius_benchmark',
+            defaults={'location': location, 'is_active': False, 'desired_state': Hotspot.DesiredState.STOPPED}
+        )
+        if created:
+            self.stderr.write(f"Seeded benchmark hotspot {hotspot.id}")
+        return hotspot
+
+    def run_load(self, usernames, secret, options):
+        total = options['requests']
+        rate = options['rate']
+        local = threading.local()
+        lock = threading.Lock()
+        results = {'accepted': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+        auth_latencies = []
+        acct_latencies = []
+
+        def get_client():
+            if not hasattr(local, 'client'):
+                local.client = Client(
+                    server=options['server'],
+                    authport=options['auth_port'],
+                    acctport=options['acct_port'],
+                    secret=secret,
+                    dict=Dictionary(DICTIONARY_PATH),
+                    retries=1,
+                    timeout=options['timeout']
+                )
+            return local.client
+
+        def send_one(index, started):
+            if rate:
+                # Open-loop pacing: request i is due at started + i / rate
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            client = get_client()
+            username = usernames[index % len(usernames)]
+            password = options['password']
+            if random.random() < options['bad_password_ratio']:
+                password = f"{password}-wrong"
+
+            request = client.CreateAuthPacket(code=AccessRequest, User_Name=username)
+            request['User-Password'] = request.PwCrypt(password)
+            sent = time.perf_counter()
+            try:
+                reply = client.SendPacket(request)
+            except Timeout:
+                outcome = 'timeouts'
+            except Exception:
+                outcome = 'errors'
+            else:
+                outcome = 'accepted' if reply.code == AccessAccept else 'rejected'
+            latency = (time.perf_counter() - sent) * 1000
+
+            acct = []
+            if outcome == 'accepted' and options['accounting']:
+                acct = self.send_accounting(client, username, index, options['nas_identifier'])
+            with lock:
+                results[outcome] += 1
+                if outcome in ('accepted', 'rejected'):
+                    auth_latencies.append(latency)
+                acct_latencies.extend(acct)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(lambda i: send_one(i, started), range(total)))
+        duration = time.perf_counter() - started
+
+        answered = results['accepted'] + results['rejected']
+        report = {
+            'requests': total,
+            'concurrency': options['concurrency'],
+            'target_rate': rate,
+            'duration_seconds': round(duration, 3),
+            'throughput_rps': round(answered / duration, 2) if duration else 0.0,
+            **results,
+            'reject_ratio': round(results['rejected'] / answered, 4) if answered else 0.0,
+            'latency_ms': summarize(auth_latencies),
+        }
+        if options['accounting']:
+            report['accounting_latency_ms'] = summarize(acct_latencies)
+        return report
+
+    @staticmethod
+    def send_accounting(client, username, index, nas_identifier):
+        """Start and Stop for one session; returns the latencies that got a reply"""
+        latencies = []
+        session_id = f"bench-{index}-{time.time_ns()}"
+        for status in ('Start', 'Stop'):
+            request = client.CreateAcctPacket(
+                User_Name=username,
+                Acct_Status_Type=status,
+                Acct_Session_Id=session_id,
+                NAS_Identifier=nas_identifier,
+            )
+            sent = time.perf_counter()
+            try:
+                client.SendPacket(request)
+            except Exception:
+                continue
+            latencies.append((time.perf_counter() - sent) * 1000)
+        return latencies
+
+
+class NoRateLimit:
+    """Stands in for the login rate limiter; allows every attempt"""
+
+    blocking = False
+
+    def check(self, username=None, mac=None, hotspot=None, now=None):
+        return None
+
+
+class EmbeddedServer:
+    """RadiusServer on its own event loop thread, bound to ephemeral ports"""
+
+    def __init__(self, rate_limit=False):
+        self.server = RadiusServer(
+            host='127.0.0.1', auth_port=0, acct_port=0,
+            rate_limiter=None if rate_limit else NoRateLimit()
+        )
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        self.auth_address = asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(timeout=30)
+        self.acct_address = self.server.acct_address
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(timeout=60)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
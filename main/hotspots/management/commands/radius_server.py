@@ -0,0 +1,37 @@
+# hotspots/management/commands/radius_server.py
+import asyncio
+from django.core.management.base import BaseCommand
+from accounts.eligibility import eligibility_cache_stats
+from accounts.password_verifier import get_password_verifier
+from hotspots.radius.server import RadiusServer
+
+class Command(BaseCommand):
+    help = 'Run the asyncio RADIUS authentication and accounting server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', help='Address to bind (default: RADIUS_HOST)')
+        parser.add_argument('--auth-port', type=int, help='Authentication port (default: RADIUS_AUTH_PORT)')
+        parser.add_argument('--acct-port', type=int, help='Accounting port (default: RADIUS_ACCT_PORT)')
+        parser.add_argument('--workers', type=int, help='Worker threads for DB and hashing work')
+        parser.add_argument('--max-pending', type=int, help='Requests in flight before new ones are dropped')
+
+    def handle(self, *args, **options):
+        server = RadiusServer(
+            host=options['host'],
+            auth_port=options['auth_port'],
+            acct_port=options['acct_port'],
+            max_workers=options['workers'],
+            max_pending=options['max_pending']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Starting RADIUS server on {server.host}:{server.auth_port}/{server.acct_port} "
+            f"({server.max_workers} workers)"
+        ))
+        # Boot the hashing pool now instead of on the first logins
+        get_password_verifier().warm_up()
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            self.stdout.write(f"RADIUS server stopped: {server.stats}")
+            self.stdout.write(f"Eligibility cache: {eligibility_cache_stats()}")
+            self.stdout.write(f"Password verifier: {get_password_verifier().stats()}")
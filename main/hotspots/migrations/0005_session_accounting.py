@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0004_hotspot_channel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='acct_session_id',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='input_octets',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='nas_ip_address',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='output_octets',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:14
+
+import django.db.models.deletion
+import hotspots.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0005_session_accounting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NasClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('network', models.CharField(help_text='Source address or CIDR network, e.g. 192.168.1.0/24', max_length=49, unique=True, validators=[hotspots.models.validate_network])),
+                ('secret', models.CharField(max_length=128)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hotspot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='nas_clients', to='hotspots.hotspot')),
+            ],
+            options={
+                'verbose_name': 'NAS Client',
+                'verbose_name_plural': 'NAS Clients',
+                'ordering': ['network'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0006_nasclient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotspot',
+            name='interface',
+            field=models.CharField(blank=True, default='', help_text='Wireless interface the AP runs on, e.g. wlan0', max_length=15),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0008_hotspot_interface'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotspot',
+            name='config_hash',
+            field=models.CharField(blank=True, default='', help_text='sha256 of the config files last rendered for this hotspot', max_length=64),
+        ),
+    ]
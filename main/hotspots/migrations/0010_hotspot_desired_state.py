@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 08:13
+
+from django.db import migrations, models
+
+
+def desire_current_state(apps, schema_editor):
+    """Existing hotspots should stay as they are: running if active, stopped otherwise"""
+    Hotspot = apps.get_model('hotspots', 'Hotspot')
+    Hotspot.objects.filter(is_active=False).update(desired_state='stopped')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0009_hotspot_config_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotspot',
+            name='desired_state',
+            field=models.CharField(choices=[('running', 'Running'), ('stopped', 'Stopped')], default='running', help_text='State the reconciler converges this hotspot to', max_length=7),
+        ),
+        migrations.RunPython(desire_current_state, migrations.RunPython.noop),
+    ]
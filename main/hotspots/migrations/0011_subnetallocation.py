@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0010_hotspot_desired_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubnetAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pool', models.CharField(help_text='Supernet the subnet was carved from', max_length=49)),
+                ('prefixlen', models.PositiveSmallIntegerField()),
+                ('index', models.PositiveIntegerField(help_text='Position of the subnet within the pool')),
+                ('network', models.CharField(max_length=49, unique=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hotspot', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subnet', to='hotspots.hotspot')),
+            ],
+            options={
+                'ordering': ['pool', 'index'],
+                'indexes': [models.Index(fields=['pool', 'prefixlen', 'hotspot', 'index'], name='subnet_free_list')],
+                'constraints': [models.UniqueConstraint(fields=('pool', 'prefixlen', 'index'), name='unique_subnet_position')],
+            },
+        ),
+    ]
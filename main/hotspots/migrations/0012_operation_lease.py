@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0011_subnetallocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(blank=True, default='', max_length=255)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='hotspot',
+            name='current_action',
+            field=models.CharField(blank=True, default='', help_text='Action of current_task_id', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='hotspot',
+            name='current_task_queued_at',
+            field=models.DateTimeField(blank=True, help_text='When current_task_id was queued; cleared once it starts running', null=True),
+        ),
+    ]
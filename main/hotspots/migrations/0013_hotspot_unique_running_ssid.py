@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+def check_running_ssids(apps, schema_editor):
+    """Which of two running hotspots sharing an SSID to stop is an operator's call"""
+    Hotspot = apps.get_model('hotspots', 'Hotspot')
+    seen = {}
+    for hotspot_id, ssid in Hotspot.objects.filter(desired_state='running').order_by('id').values_list('id', 'ssid'):
+        seen.setdefault(ssid, []).append(hotspot_id)
+    shared = {ssid: ids for ssid, ids in seen.items() if len(ids) > 1}
+    if shared:
+        raise RuntimeError(
+            "Running hotspots share an SSID, stop or rename all but one of each before migrating: "
+            + ", ".join(f"{ssid!r} (hotspots {ids})" for ssid, ids in shared.items())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0012_operation_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_running_ssids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='hotspot',
+            constraint=models.UniqueConstraint(condition=models.Q(('desired_state', 'running')), fields=('ssid',), name='unique_running_hotspot_ssid'),
+        ),
+    ]
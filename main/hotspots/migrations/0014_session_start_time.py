@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 10:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotspots', '0013_hotspot_unique_running_ssid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,10 +1,14 @@
 # hotspots/models.py
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.core.exceptions import ValidationError
 from accounts.enums import UserType
+from .hostapd import HostapdControlError, control_for, find_interface
 import subprocess
+import ipaddress
 import os
 
 User = get_user_model()
@@ -53,6 +57,10 @@ class Hotspot(models.Model):
         PUBLIC = 'PUB', _('Public')
         PRIVATE = 'PRI', _('Private')
         COMMERCIAL = 'COM', _('Commercial')
+
+    class DesiredState(models.TextChoices):
+        RUNNING = 'running', _('Running')
+        STOPPED = 'stopped', _('Stopped')
     
     owner = models.ForeignKey(
         User,
@@ -84,9 +92,38 @@ class Hotspot(models.Model):
         default=6,
         validators=[MinValueValidator(1)]
     )
+    interface = models.CharField(
+        max_length=15,
+        blank=True,
+        default='',
+        help_text="Wireless interface the AP runs on, e.g. wlan0"
+    )
     is_active = models.BooleanField(default=True)
+    desired_state = models.CharField(
+        max_length=7,
+        choices=DesiredState.choices,
+        default=DesiredState.RUNNING,
+        help_text="State the reconciler converges this hotspot to"
+    )
+    config_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="sha256 of the config files last rendered for this hotspot"
+    )
     allowed_users = models.ManyToManyField(User, related_name="allowed_hotspots", blank=True)
     current_task_id = models.CharField(max_length=255, blank=True, null=True)
+    current_action = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        help_text="Action of current_task_id"
+    )
+    current_task_queued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When current_task_id was queued; cleared once it starts running"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -94,10 +131,39 @@ class Hotspot(models.Model):
         verbose_name = "Hotspot"
         verbose_name_plural = "Hotspots"
         unique_together = ('owner', 'ssid')
+        constraints = [
+            # Backs the SSID lookup of hotspot authentication. Keyed on what was
+            # asked for rather than is_active, so it is checked before going on air
+            models.UniqueConstraint(
+                fields=['ssid'], condition=models.Q(desired_state='running'), name='unique_running_hotspot_ssid'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.ssid} at {self.location.name}"
 
+    def ssid_in_use(self):
+        """Whether another hotspot that should be running has this SSID"""
+        return Hotspot.objects.filter(
+            ssid=self.ssid, desired_state=self.DesiredState.RUNNING
+        ).exclude(pk=self.pk).exists()
+
+    def set_desired_state(self, desired):
+        """
+        Record desired_state. Returns False, leaving it unchanged, when running
+        is asked for while another hotspot that should be running has this SSID.
+        """
+        if self.desired_state == desired:
+            return True
+        previous, self.desired_state = self.desired_state, desired
+        try:
+            with transaction.atomic():
+                self.save(update_fields=['desired_state', 'updated_at'])
+        except IntegrityError:
+            self.desired_state = previous
+            return False
+        return True
+
     def start(self):
         """Start hotspot using service layer"""
         from hotspots.services import HotspotControlService
@@ -142,7 +208,7 @@ class Hotspot(models.Model):
                 return False
 
             # Check for our specific hotspot by verifying config file
-            config_path = f'/etc/hostapd-prod/hostapd.conf'
+            config_path = f'/etc/hostapd-prod/hotspot_{self.id}.hostapd.conf'
             if os.path.exists(config_path):
                 with open(config_path, 'r') as f:
                     config_content = f.read()
@@ -172,27 +238,30 @@ class Hotspot(models.Model):
         except Exception:
             return None
     
+    def running_interface(self):
+        """interface, or the one the start script detected when the row leaves it blank"""
+        return self.interface or find_interface(self.id, self.ssid)
+
     def get_connected_clients(self):
-        """Get number of connected clients by parsing hostapd status"""
-        try:
-            pid = self.get_hostapd_pid()
-            if not pid:
-                return 0
-                
-            # Use hostapd_cli to get connected stations
-            result = subprocess.run(
-                ['hostapd_cli', '-p', '/var/run/hostapd', 'list_sta'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if result.returncode == 0:
-                return len([line for line in result.stdout.split('\n') 
-                        if line.strip()])
+        """Number of stations associated with this hotspot, from hostapd's STATUS"""
+        interface = self.running_interface()
+        if not interface:
             return 0
-        except Exception:
+        try:
+            return control_for(interface).station_count(ssid=self.ssid)
+        except HostapdControlError:
             return 0
 
+    def get_station_stats(self):
+        """Per-station counters (bytes, packets, connected_time) from hostapd"""
+        interface = self.running_interface()
+        if not interface:
+            return []
+        try:
+            return control_for(interface).stations()
+        except HostapdControlError:
+            return []
+
     def _log_error(self, message):
         """Helper method for consistent error logging"""
         import logging
@@ -210,7 +279,8 @@ class Session(models.Model):
         on_delete=models.CASCADE,
         related_name='sessions'
     )
-    start_time = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: RADIUS accounting sets it from the Acct-Start event time
+    start_time = models.DateTimeField(default=timezone.now, editable=False)
     end_time = models.DateTimeField(null=True, blank=True)
     data_used = models.PositiveIntegerField(
         default=0,
@@ -219,6 +289,11 @@ class Session(models.Model):
     ip_address = models.GenericIPAddressField()
     mac_address = models.CharField(max_length=17, blank=True)
     is_active = models.BooleanField(default=True)
+    # RADIUS accounting (hotspots/radius/accounting.py)
+    acct_session_id = models.CharField(max_length=64, blank=True, db_index=True)
+    nas_ip_address = models.GenericIPAddressField(null=True, blank=True)
+    input_octets = models.PositiveBigIntegerField(default=0)
+    output_octets = models.PositiveBigIntegerField(default=0)
     
     class Meta:
         verbose_name = "Session"
@@ -226,4 +301,94 @@ class Session(models.Model):
         ordering = ['-start_time']
     
     def __str__(self):
-        return f"Session #{self.id} by {self.user.username}"
\ No newline at end of file
+        return f"Session #{self.id} by {self.user.username}"
+
+
+def validate_network(value):
+    try:
+        ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        raise ValidationError(_("Enter a valid IP address or CIDR network."))
+
+
+class NasClient(models.Model):
+    """RADIUS client (access point or NAS) allowed to talk to the RADIUS server"""
+    name = models.CharField(max_length=100)
+    network = models.CharField(
+        max_length=49,
+        unique=True,
+        validators=[validate_network],
+        help_text="Source address or CIDR network, e.g. 192.168.1.0/24"
+    )
+    secret = models.CharField(max_length=128)
+    hotspot = models.ForeignKey(
+        Hotspot,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='nas_clients'
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "NAS Client"
+        verbose_name_plural = "NAS Clients"
+        ordering = ['network']
+
+    def __str__(self):
+        return f"{self.name} ({self.network})"
+
+    def save(self, *args, **kwargs):
+        # Store the canonical form so '10.0.0.5/24' and '10.0.0.0/24' collide on unique
+        self.network = str(ipaddress.ip_network(self.network, strict=False))
+        super().save(*args, **kwargs)
+
+class SubnetAllocation(models.Model):
+    """
+    A subnet handed out from one of HOTSPOT_SUBNET_POOLS.
+
+    Rows are never deleted: a row without a hotspot is free and is reused
+    before the pool grows, lowest index first (see hotspots/subnets.py).
+    """
+    pool = models.CharField(max_length=49, help_text="Supernet the subnet was carved from")
+    prefixlen = models.PositiveSmallIntegerField()
+    index = models.PositiveIntegerField(help_text="Position of the subnet within the pool")
+    network = models.CharField(max_length=49, unique=True)
+    hotspot = models.OneToOneField(
+        Hotspot,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='subnet'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['pool', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'prefixlen', 'index'], name='unique_subnet_position'),
+        ]
+        indexes = [
+            # The free-list: lowest free index of a pool in one index lookup
+            models.Index(fields=['pool', 'prefixlen', 'hotspot', 'index'], name='subnet_free_list'),
+        ]
+
+    def __str__(self):
+        return self.network
+
+
+class OperationLease(models.Model):
+    """
+    A named lease held by one owner until it is released or expires.
+
+    Kept in the database so every process (web, Celery workers, management
+    commands, the reconciler) sees the same holder (see hotspots/operations.py).
+    """
+    key = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255, blank=True, default='')
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} held by {self.owner or 'nobody'} until {self.expires_at}"
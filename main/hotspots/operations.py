@@ -0,0 +1,135 @@
+# hotspots/operations.py
+import uuid
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Hotspot, OperationLease
+
+logger = logging.getLogger(__name__)
+
+
+def _lease_key(hotspot_id):
+    return f'hotspot_op_lease_{hotspot_id}'
+
+
+def _radio_lease_key(interface):
+    return f'radio_op_lease_{interface}'
+
+
+def lease_seconds():
+    # Outlives control_hotspot_async's time_limit, so a killed worker's lease still expires
+    return getattr(settings, 'HOTSPOT_OPERATION_LEASE', 310)
+
+
+def enqueue_operation(hotspot, action):
+    """
+    Queue action for hotspot as its one effective operation and return the task id.
+
+    The new task id is written to current_task_id before the task is sent,
+    so every operation queued earlier sees it has been superseded and exits
+    without touching the hotspot: start, stop, start collapses to one
+    start. Repeating the queued action returns the queued task instead of
+    sending another, as long as that task has not started running yet
+    (current_task_queued_at is cleared when it does) and was queued less
+    than a lease ago, so a lost message does not swallow retries forever.
+    """
+    from .tasks import control_hotspot_async
+
+    now = timezone.now()
+    current = Hotspot.objects.filter(id=hotspot.id).values(
+        'current_task_id', 'current_action', 'current_task_queued_at'
+    ).first()
+    if current and current['current_task_id'] and current['current_action'] == action \
+            and current['current_task_queued_at'] \
+            and current['current_task_queued_at'] > now - timedelta(seconds=lease_seconds()):
+        logger.info(f"Hotspot {hotspot.id}: {action} already queued as {current['current_task_id']}")
+        return current['current_task_id']
+
+    task_id = str(uuid.uuid4())
+    Hotspot.objects.filter(id=hotspot.id).update(
+        current_task_id=task_id, current_action=action, current_task_queued_at=now
+    )
+    hotspot.current_task_id, hotspot.current_action, hotspot.current_task_queued_at = task_id, action, now
+    control_hotspot_async.apply_async((hotspot.id, action), task_id=task_id)
+    logger.info(f"Hotspot {hotspot.id}: queued {action} as {task_id}")
+    return task_id
+
+
+def is_superseded(hotspot_id, task_id):
+    """Whether a later operation replaced task_id; a deleted hotspot's last operation still runs"""
+    current = Hotspot.objects.filter(id=hotspot_id).values_list('current_task_id', flat=True).first()
+    return current is not None and current != task_id
+
+
+def take_lease(key, owner, seconds):
+    """
+    Take the named lease for seconds; False while another owner holds it.
+
+    The lease is an OperationLease row, claimed with a conditional update
+    (or an insert the unique key lets only one process win), so it excludes
+    holders in every process sharing the database.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=seconds)
+    # A released or expired lease is taken over; the update only matches when it still is
+    if OperationLease.objects.filter(key=key).filter(Q(owner='') | Q(expires_at__lte=now)).update(
+        owner=owner, expires_at=expires_at
+    ):
+        return True
+    try:
+        with transaction.atomic():
+            OperationLease.objects.create(key=key, owner=owner, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def drop_lease(key, owner):
+    """Release the named lease if owner still holds it"""
+    OperationLease.objects.filter(key=key, owner=owner).update(owner='')
+
+
+def acquire_lease(hotspot_id, owner):
+    """Take the hotspot's operation lease; False while another operation holds it"""
+    if not take_lease(_lease_key(hotspot_id), owner, lease_seconds()):
+        return False
+    # Running now: a repeat of this action has to queue a new operation
+    Hotspot.objects.filter(id=hotspot_id, current_task_id=owner).update(current_task_queued_at=None)
+    return True
+
+
+def release_lease(hotspot_id, owner):
+    drop_lease(_lease_key(hotspot_id), owner)
+
+
+@contextmanager
+def operation_lease(hotspot_id, owner):
+    """Hold the hotspot's operation lease for the block; yields whether it was acquired"""
+    acquired = acquire_lease(hotspot_id, owner)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lease(hotspot_id, owner)
+
+
+@contextmanager
+def radio_lease(interface):
+    """
+    Hold the radio's lease for the block; yields whether it was acquired.
+
+    Taken around apply_radio by reconcile runs, control tasks and fleet
+    batches, so only one of them rewrites or reloads a radio's hostapd at
+    a time.
+    """
+    key, owner = _radio_lease_key(interface), str(uuid.uuid4())
+    acquired = take_lease(key, owner, lease_seconds())
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            drop_lease(key, owner)
@@ -0,0 +1,132 @@
+# hotspots/processes.py
+import os
+import re
+import time
+import logging
+import threading
+from collections import namedtuple
+import psutil
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'name', 'cmdline'])
+
+# Daemons a hotspot runs; anything else in the process table is ignored
+HOTSPOT_DAEMONS = ('hostapd', 'dnsmasq')
+MARKER = re.compile(r'hotspot_(\d+)')
+
+
+def _daemon(name):
+    # Exact executable name: hostapd_cli or hostapd-mana pointed at a hotspot are not its daemons
+    name = name.lower()
+    return name if name in HOTSPOT_DAEMONS else None
+
+
+class ProcessSnapshot:
+    """
+    One scan of the process table, indexed for hotspot status checks.
+
+    The scan reads /proc/<pid>/comm and cmdline directly and keeps only
+    hostapd/dnsmasq processes, indexed by every hotspot_<id> marker in
+    their command line. Lookups within max_age seconds of a scan share it;
+    invalidate() forces the next lookup to rescan, e.g. after start/stop.
+    Without /proc (non-Linux hosts) the scan goes through psutil.
+    """
+
+    def __init__(self, proc_root='/proc', max_age=None):
+        self.proc_root = proc_root
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._scanned_at = None
+        self._daemons = []
+        self._by_hotspot = {}
+        self.scans = 0
+
+    @property
+    def max_age(self):
+        if self._max_age is not None:
+            return self._max_age
+        return getattr(settings, 'PROCESS_SNAPSHOT_MAX_AGE', 1.0)
+
+    def _read_proc(self):
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            base = os.path.join(self.proc_root, entry)
+            try:
+                with open(os.path.join(base, 'comm'), encoding='utf-8', errors='replace') as f:
+                    name = f.read().strip()
+                with open(os.path.join(base, 'cmdline'), 'rb') as f:
+                    args = [arg.decode(errors='replace') for arg in f.read().split(b'\0') if arg]
+            except OSError:
+                # Exited mid-scan or not ours to read
+                continue
+            if args and os.path.basename(args[0]).startswith(name):
+                # comm is truncated to 15 characters; argv[0] is not
+                name = os.path.basename(args[0])
+            yield ProcessInfo(int(entry), name, args)
+
+    def _read_psutil(self):
+        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            try:
+                yield ProcessInfo(proc.info['pid'], proc.info['name'] or '', proc.info['cmdline'] or [])
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+    def scan(self):
+        """Rescan the process table now"""
+        source = self._read_proc() if os.path.isdir(self.proc_root) else self._read_psutil()
+        daemons = []
+        by_hotspot = {}
+        for info in source:
+            daemon = _daemon(info.name)
+            if daemon is None:
+                continue
+            daemons.append(info)
+            for hotspot_id in {int(match) for match in MARKER.findall(' '.join(info.cmdline))}:
+                by_hotspot.setdefault(hotspot_id, {}).setdefault(daemon, []).append(info)
+        with self._lock:
+            self._daemons, self._by_hotspot = daemons, by_hotspot
+            self._scanned_at = time.monotonic()
+            self.scans += 1
+
+    def _fresh(self):
+        with self._lock:
+            stale = self._scanned_at is None or time.monotonic() - self._scanned_at > self.max_age
+        if stale:
+            self.scan()
+
+    def invalidate(self):
+        with self._lock:
+            self._scanned_at = None
+
+    def processes(self, hotspot_id=None):
+        """hostapd/dnsmasq processes, all of them or those marked with hotspot_id"""
+        self._fresh()
+        if hotspot_id is None:
+            return list(self._daemons)
+        daemons = self._by_hotspot.get(int(hotspot_id), {})
+        return [info for daemon in HOTSPOT_DAEMONS for info in daemons.get(daemon, [])]
+
+    def find(self, hotspot_id, daemon='hostapd'):
+        """First daemon process marked with hotspot_id, or None"""
+        self._fresh()
+        matches = self._by_hotspot.get(int(hotspot_id), {}).get(daemon)
+        return matches[0] if matches else None
+
+    def is_running(self, hotspot_id, daemon='hostapd'):
+        return self.find(hotspot_id, daemon) is not None
+
+    def any_running(self, daemon):
+        """Whether any process of daemon runs, marked or not"""
+        self._fresh()
+        return any(_daemon(info.name) == daemon for info in self._daemons)
+
+    def running_hotspots(self):
+        """{hotspot_id: set of daemons running for it}"""
+        self._fresh()
+        return {hotspot_id: set(daemons) for hotspot_id, daemons in self._by_hotspot.items()}
+
+
+process_snapshot = ProcessSnapshot()
@@ -0,0 +1,228 @@
+# hotspots/radios.py
+import os
+import logging
+from django.conf import settings
+from .hostapd import HostapdControlError, control_for
+from .models import Hotspot
+from .rendering import apply_config, config_dir, unit_dir
+from .subnets import hotspot_network
+from .systemd import get_systemd_manager, unit_name
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_CODE = 'KE'
+DHCP_LEASE_TIME = '12h'
+# Longest Linux interface name (IFNAMSIZ minus the terminating NUL)
+IFNAME_MAX = 15
+
+RADIO_SCRIPT_PATH = os.path.join(settings.BASE_DIR, 'scripts', 'production', 'radio_script.sh')
+
+
+def multi_bss_enabled():
+    return getattr(settings, 'HOTSPOT_MULTI_BSS', False)
+
+
+def serves_as_bss(hotspot):
+    """Whether hotspot runs as one BSS of its radio's shared hostapd"""
+    return multi_bss_enabled() and bool(hotspot.interface)
+
+
+def radio_unit_name(interface):
+    return f'hotspot_radio_{interface}.service'
+
+
+def unit_for(hotspot):
+    """The systemd unit that serves hotspot: its radio's in multi-BSS mode, its own otherwise"""
+    return radio_unit_name(hotspot.interface) if serves_as_bss(hotspot) else unit_name(hotspot.id)
+
+
+def radio_paths(interface):
+    base = os.path.join(config_dir(), f'radio_{interface}')
+    return {'hostapd': f'{base}.conf', 'dnsmasq': f'{base}.dnsmasq.conf', 'addresses': f'{base}.addresses'}
+
+
+def bss_ifname(interface, index):
+    """Interface hostapd creates for the index-th BSS; the first BSS uses the radio itself"""
+    if index == 0:
+        return interface
+    suffix = f'_{index}'
+    return interface[:IFNAME_MAX - len(suffix)] + suffix
+
+
+def radio_members(interface, add=None, remove=None):
+    """Hotspots the radio should serve: those desired running, plus add and minus remove, by id"""
+    members = {
+        hotspot.id: hotspot
+        for hotspot in Hotspot.objects.filter(
+            interface=interface, desired_state=Hotspot.DesiredState.RUNNING
+        ).order_by('id')
+    }
+    if add is not None:
+        members[add.id] = add
+    if remove is not None:
+        members.pop(remove.id, None)
+    return [members[hotspot_id] for hotspot_id in sorted(members)]
+
+
+def _bss_section(hotspot):
+    lines = [f'ssid={hotspot.ssid}', f'max_num_sta={hotspot.max_users}', 'auth_algs=1']
+    if hotspot.password:
+        lines += [
+            'wpa=2',
+            f'wpa_passphrase={hotspot.password}',
+            'wpa_key_mgmt=WPA-PSK',
+            'rsn_pairwise=CCMP',
+        ]
+    return lines
+
+
+def render_radio_config(interface, hotspots):
+    """
+    hostapd.conf serving every hotspot in hotspots from one hostapd on interface.
+
+    The first hotspot is the primary BSS and fixes the channel; each other
+    one becomes a bss= section with its own SSID, passphrase and station
+    limit.
+    """
+    primary = hotspots[0]
+    channel = primary.channel or 6
+    for hotspot in hotspots[1:]:
+        if hotspot.channel != channel:
+            logger.warning(
+                f"Hotspot {hotspot.id} wants channel {hotspot.channel} but shares {interface} on channel {channel}"
+            )
+    lines = [
+        f'interface={interface}',
+        'driver=nl80211',
+        f"ctrl_interface={getattr(settings, 'HOSTAPD_CTRL_DIR', '/var/run/hostapd')}",
+        f'country_code={COUNTRY_CODE}',
+        f"hw_mode={'g' if channel <= 14 else 'a'}",
+        f'channel={channel}',
+        'beacon_int=100',
+        'dtim_period=2',
+        'ieee80211n=0',
+        'ieee80211ac=0',
+        'wmm_enabled=0',
+        '',
+        f'# hotspot {primary.id}',
+        *_bss_section(primary),
+    ]
+    for index, hotspot in enumerate(hotspots[1:], start=1):
+        lines += ['', f'# hotspot {hotspot.id}', f'bss={bss_ifname(interface, index)}', *_bss_section(hotspot)]
+    return '\n'.join(lines) + '\n'
+
+
+def render_radio_dnsmasq(interface, hotspots):
+    """One dnsmasq for the radio, handing out each BSS's own range"""
+    lines = ['bind-dynamic', 'dhcp-authoritative', 'log-dhcp']
+    for index, hotspot in enumerate(hotspots):
+        network = hotspot_network(hotspot)
+        gateway = network['gateway'].split('/')[0]
+        ifname = bss_ifname(interface, index)
+        lines += [
+            f'interface={ifname}',
+            f"dhcp-range=set:{ifname},{network['dhcp_start']},{network['dhcp_end']},{DHCP_LEASE_TIME}",
+            f'dhcp-option=tag:{ifname},option:router,{gateway}',
+            f'dhcp-option=tag:{ifname},option:dns-server,{gateway},8.8.8.8',
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def render_radio_addresses(interface, hotspots):
+    """'<ifname> <gateway/prefix>' per BSS, read by radio_script.sh"""
+    return ''.join(
+        f"{bss_ifname(interface, index)} {hotspot_network(hotspot)['gateway']}\n"
+        for index, hotspot in enumerate(hotspots)
+    )
+
+
+def render_radio_unit(interface):
+    paths = radio_paths(interface)
+    return f"""[Unit]
+Description=Hotspot radio {interface}
+After=network.target
+Requires=network.target
+
+[Service]
+Type=simple
+ExecStart=/usr/sbin/hostapd {paths['hostapd']}
+ExecStartPost={RADIO_SCRIPT_PATH} up {interface}
+ExecReload=/bin/kill -HUP $MAINPID
+ExecReload={RADIO_SCRIPT_PATH} up {interface}
+ExecStopPost={RADIO_SCRIPT_PATH} down {interface}
+Restart=on-failure
+RestartSec=5s
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def radio_files(interface, hotspots):
+    """{kind: (path, content)} of everything the radio's unit runs from"""
+    paths = radio_paths(interface)
+    return {
+        'hostapd': (paths['hostapd'], render_radio_config(interface, hotspots)),
+        'dnsmasq': (paths['dnsmasq'], render_radio_dnsmasq(interface, hotspots)),
+        'addresses': (paths['addresses'], render_radio_addresses(interface, hotspots)),
+        'unit': (os.path.join(unit_dir(), radio_unit_name(interface)), render_radio_unit(interface)),
+    }
+
+
+def apply_radio(interface, add=None, remove=None, members=None):
+    """
+    Bring the radio's shared hostapd in line with the hotspots it should serve.
+
+    Adding or removing an SSID rewrites the config and reloads the running
+    hostapd (SIGHUP through the unit's ExecReload) instead of starting a
+    process per hotspot; nothing is rewritten or reloaded when the rendered
+    files are unchanged. The unit is started for the first SSID and stopped
+    when none is left. members overrides the lookup of the radio's
+    hotspots. Returns a result dict like
+    HotspotControlService.execute_hotspot_command.
+    """
+    manager = get_systemd_manager()
+    unit = radio_unit_name(interface)
+    if members is None:
+        members = radio_members(interface, add=add, remove=remove)
+    try:
+        if not members:
+            ok = manager.stop(unit)
+            return {'success': ok, 'stdout': f'Stopped {unit}', 'stderr': '' if ok else f'Could not stop {unit}'}
+
+        plan = apply_config(radio_files(interface, members), members)
+        if manager.active_state(unit) == 'active':
+            if plan.action == 'none':
+                return {'success': True, 'stdout': f'{unit} already serving', 'stderr': '', 'already_running': True}
+            if plan.action == 'restart':
+                ok, done = manager.restart(unit), f'Restarted {unit}'
+            else:
+                ok, done = manager.reload(unit), f'Reloaded {unit}'
+        else:
+            ok, done = manager.start(unit), f'Started {unit}'
+    except Exception as e:
+        logger.error(f"Applying radio {interface} failed: {e}")
+        return {'success': False, 'stdout': '', 'stderr': str(e)}
+
+    ssids = ', '.join(hotspot.ssid for hotspot in members)
+    logger.info(f"{done} with {len(members)} BSS: {ssids}")
+    return {
+        'success': ok,
+        'stdout': f'{done} ({ssids})',
+        'stderr': '' if ok else f'{done} failed',
+        'already_running': False,
+    }
+
+
+def serving_ssids(interface):
+    """SSIDs the radio's hostapd is beaconing, empty when it does not answer"""
+    try:
+        return {bss.get('ssid') for bss in control_for(interface).bss_status()}
+    except HostapdControlError:
+        return set()
+
+
+def is_bss_serving(hotspot):
+    return get_systemd_manager().active_state(radio_unit_name(hotspot.interface)) == 'active' and (
+        hotspot.ssid in serving_ssids(hotspot.interface)
+    )
@@ -0,0 +1,383 @@
+# hotspots/radius/accounting.py
+import os
+import re
+import json
+import time
+import logging
+import ipaddress
+import threading
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DataError, IntegrityError, transaction
+from hotspots.models import Hotspot, Session
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+STATUS_START = 1
+STATUS_STOP = 2
+STATUS_INTERIM = 3
+
+BYTES_PER_MB = 1024 * 1024
+# Column limits of Session; a record past them would fail its whole batch
+SESSION_ID_LENGTH = Session._meta.get_field('acct_session_id').max_length
+MAX_OCTETS = 2 ** 63 - 1
+MAX_DATA_USED = 2 ** 31 - 1
+# Failures caused by one record's values; anything else (a lost connection) keeps the batch for later
+RECORD_ERRORS = (DataError, IntegrityError, ValueError, TypeError, OverflowError)
+HOTSPOT_MARKER = re.compile(r'hotspot_(\d+)')
+CALLED_STATION = re.compile(r'^([0-9A-Fa-f]{2}[-:]){5}[0-9A-Fa-f]{2}:?(.*)$')
+
+
+def _first(packet, name, default=None):
+    return packet[name][0] if name in packet else default
+
+
+def _normalize_mac(value):
+    digits = re.sub(r'[^0-9A-Fa-f]', '', value or '')
+    if len(digits) != 12:
+        return (value or '')[:17]
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2)).upper()
+
+
+def called_station_ssid(value):
+    """SSID from a Called-Station-Id of "<bssid>:<ssid>"; None when the NAS sent only its MAC"""
+    match = CALLED_STATION.match(value or '')
+    return (match.group(2) or None) if match else None
+
+
+def _ip_or_none(value):
+    try:
+        return str(ipaddress.ip_address(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _clamp_octets(value):
+    try:
+        return min(max(int(value), 0), MAX_OCTETS)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _timestamp_or_none(value):
+    try:
+        value = int(value)
+        datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        return value or None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def clean_record(record):
+    """record with every value made to fit its Session column"""
+    event_time = _timestamp_or_none(record.get('event_time')) or int(time.time())
+    # Kept through merges with later records: the session started then, not at flush time
+    if record.get('status') == STATUS_START:
+        started_at = event_time
+    else:
+        started_at = _timestamp_or_none(record.get('started_at'))
+    return {
+        **record,
+        'session_id': str(record.get('session_id') or '')[:SESSION_ID_LENGTH],
+        'username': str(record.get('username') or ''),
+        'framed_ip': _ip_or_none(record.get('framed_ip')),
+        'mac': _normalize_mac(str(record.get('mac') or '')),
+        'nas_ip': _ip_or_none(record.get('nas_ip')),
+        'input_octets': _clamp_octets(record.get('input_octets')),
+        'output_octets': _clamp_octets(record.get('output_octets')),
+        'event_time': event_time,
+        'started_at': started_at,
+    }
+
+
+def record_key(record):
+    """Acct-Session-Id is only unique per NAS"""
+    return (record.get('nas_ip') or '', record['session_id'])
+
+
+def parse_accounting_packet(packet):
+    """Flatten an Accounting-Request into a JSON-serialisable record"""
+    gigaword = 2 ** 32
+    input_octets = _first(packet, 'Acct-Input-Octets', 0) + _first(packet, 'Acct-Input-Gigawords', 0) * gigaword
+    output_octets = _first(packet, 'Acct-Output-Octets', 0) + _first(packet, 'Acct-Output-Gigawords', 0) * gigaword
+    status = _first(packet, 'Acct-Status-Type')
+    if isinstance(status, str):
+        status = {'Start': STATUS_START, 'Stop': STATUS_STOP, 'Interim-Update': STATUS_INTERIM}.get(status)
+
+    return {
+        'status': status,
+        'session_id': _first(packet, 'Acct-Session-Id', ''),
+        'username': _first(packet, 'User-Name', ''),
+        'framed_ip': _first(packet, 'Framed-IP-Address'),
+        'mac': _normalize_mac(_first(packet, 'Calling-Station-Id', '')),
+        'called_station_id': _first(packet, 'Called-Station-Id', ''),
+        'nas_ip': _first(packet, 'NAS-IP-Address'),
+        'nas_identifier': _first(packet, 'NAS-Identifier', ''),
+        'input_octets': input_octets,
+        'output_octets': output_octets,
+        # A NAS resending a record counts the seconds it waited in Acct-Delay-Time
+        'event_time': _first(packet, 'Event-Timestamp') or int(time.time()) - _first(packet, 'Acct-Delay-Time', 0),
+    }
+
+
+class AccountingBuffer:
+    """
+    Write-behind buffer for RADIUS accounting records.
+
+    Records are appended to a spool file and merged in memory per NAS and
+    Acct-Session-Id, so a burst of Interim-Updates for one session costs a
+    single row write. flush() applies everything pending with one
+    bulk_create and one bulk_update; when the database refuses the batch
+    its records are applied one by one and the ones refused again are
+    dropped. The spool is rotated before each flush and removed once the
+    batch is committed; recover() replays whatever a crash left behind.
+    """
+
+    def __init__(self, spool_path=None, batch_size=None, flush_interval=None):
+        self.spool_path = str(spool_path or getattr(
+            settings, 'RADIUS_ACCOUNTING_SPOOL',
+            os.path.join(settings.BASE_DIR, 'tmp', 'radius-accounting.spool')
+        ))
+        self.batch_size = batch_size or getattr(settings, 'RADIUS_ACCOUNTING_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'RADIUS_ACCOUNTING_FLUSH_INTERVAL', 5)
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+    @property
+    def flushing_path(self):
+        return f"{self.spool_path}.flushing"
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, record):
+        """Buffer one record; returns True when a flush is due"""
+        if not record.get('session_id'):
+            logger.warning(f"Ignoring accounting record without Acct-Session-Id: {record}")
+            return False
+        record = clean_record(record)
+        with self._lock:
+            self._spool.write(json.dumps(record) + '\n')
+            self._spool.flush()
+            self._merge(record)
+            return self.flush_due()
+
+    def flush_due(self):
+        return bool(
+            len(self._pending) >= self.batch_size or
+            (self._pending and time.monotonic() - self._last_flush >= self.flush_interval)
+        )
+
+    def _merge(self, record):
+        current = self._pending.get(record_key(record))
+        if current is None:
+            self._pending[record_key(record)] = dict(record)
+            return
+        started = current['status'] == STATUS_START or record['status'] == STATUS_START
+        stopped = current['status'] == STATUS_STOP or record['status'] == STATUS_STOP
+        for key, value in record.items():
+            if value not in (None, '') and key not in ('input_octets', 'output_octets', 'status'):
+                current[key] = value
+        current['input_octets'] = max(current['input_octets'], record['input_octets'])
+        current['output_octets'] = max(current['output_octets'], record['output_octets'])
+        current['status'] = STATUS_STOP if stopped else (STATUS_START if started else STATUS_INTERIM)
+
+    def flush(self):
+        """Write all pending records to Session; returns the number applied"""
+        with self._flush_lock:
+            with self._lock:
+                records = self._pending
+                self._pending = {}
+                self._last_flush = time.monotonic()
+                self._rotate_spool()
+            if not records:
+                self._discard_flushing()
+                return 0
+
+            batch = list(records.values())
+            try:
+                self._apply(batch)
+                applied = len(batch)
+            except RECORD_ERRORS:
+                logger.warning("Accounting batch refused, applying its records one by one", exc_info=True)
+                applied = self._apply_each(batch)
+            except Exception:
+                self._keep(batch)
+                raise
+            self._discard_flushing()
+            return applied
+
+    def _apply_each(self, batch):
+        """Apply records separately, dropping the ones the database refuses"""
+        applied = 0
+        for index, record in enumerate(batch):
+            try:
+                self._apply([record])
+                applied += 1
+            except RECORD_ERRORS as e:
+                logger.error(f"Dropping accounting record the database refused ({e}): {record}")
+            except Exception:
+                self._keep(batch[index:])
+                raise
+        return applied
+
+    def _keep(self, records):
+        # Keep the rotated spool and put the records back for the next attempt
+        logger.error("Accounting flush failed, records kept for retry", exc_info=True)
+        with self._lock:
+            for record in records:
+                self._merge(record)
+
+    def recover(self):
+        """Replay records left in the spool files by a previous process"""
+        with self._lock:
+            self._spool.close()
+            replayed = 0
+            for path in (self.flushing_path, self.spool_path):
+                if not os.path.exists(path):
+                    continue
+                with open(path, encoding='utf-8') as spool:
+                    for line in spool:
+                        try:
+                            self._merge(clean_record(json.loads(line)))
+                            replayed += 1
+                        except (ValueError, KeyError, TypeError, AttributeError):
+                            logger.warning(f"Skipping corrupt accounting spool line: {line!r}")
+            # Everything now lives in memory; persist it again as one compacted spool
+            compacted_path = f"{self.spool_path}.tmp"
+            with open(compacted_path, 'w', encoding='utf-8') as compacted:
+                for record in self._pending.values():
+                    compacted.write(json.dumps(record) + '\n')
+            os.replace(compacted_path, self.spool_path)
+            if os.path.exists(self.flushing_path):
+                os.remove(self.flushing_path)
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        if replayed:
+            logger.info(f"Recovered {replayed} accounting records from spool")
+        return replayed
+
+    def close(self):
+        with self._lock:
+            self._spool.close()
+
+    def _rotate_spool(self):
+        self._spool.close()
+        if os.path.exists(self.flushing_path):
+            # A previous flush failed; keep its records ahead of the new ones
+            with open(self.flushing_path, 'a', encoding='utf-8') as target, \
+                    open(self.spool_path, encoding='utf-8') as source:
+                target.write(source.read())
+            os.remove(self.spool_path)
+        else:
+            os.replace(self.spool_path, self.flushing_path)
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+    def _discard_flushing(self):
+        if os.path.exists(self.flushing_path):
+            os.remove(self.flushing_path)
+
+    def _apply(self, records):
+        sessions = {
+            (session.nas_ip_address or '', session.acct_session_id): session
+            for session in Session.objects.filter(acct_session_id__in={r['session_id'] for r in records})
+        }
+        existing = {}
+        for record in records:
+            # Rows written before sessions were keyed per NAS may have no NAS address
+            session = sessions.get(record_key(record)) or sessions.get(('', record['session_id']))
+            if session is not None:
+                existing[record_key(record)] = session
+        new_records = [r for r in records if record_key(r) not in existing]
+        users = dict(User.objects.filter(
+            username__in={r['username'] for r in new_records}
+        ).values_list('username', 'id'))
+        hotspot_ids = self._resolve_hotspots(new_records)
+
+        to_create = []
+        for record in new_records:
+            user_id = users.get(record['username'])
+            hotspot_id = hotspot_ids.get(record_key(record))
+            if not user_id or not hotspot_id:
+                logger.warning(
+                    f"Dropping accounting for session {record['session_id']}: "
+                    f"unknown user '{record['username']}' or hotspot"
+                )
+                continue
+            session = Session(
+                user_id=user_id,
+                hotspot_id=hotspot_id,
+                acct_session_id=record['session_id'],
+                nas_ip_address=record['nas_ip'],
+                ip_address=record['framed_ip'] or '0.0.0.0'
+            )
+            self._update_session(session, record)
+            to_create.append(session)
+
+        to_update = []
+        for record in records:
+            session = existing.get(record_key(record))
+            if session is not None:
+                self._update_session(session, record)
+                to_update.append(session)
+
+        with transaction.atomic():
+            if to_create:
+                Session.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update:
+                Session.objects.bulk_update(to_update, [
+                    'ip_address', 'mac_address', 'nas_ip_address', 'input_octets',
+                    'output_octets', 'data_used', 'start_time', 'end_time', 'is_active'
+                ], batch_size=self.batch_size)
+        logger.debug(f"Accounting flush: {len(to_create)} created, {len(to_update)} updated")
+
+    @staticmethod
+    def _update_session(session, record):
+        if record['framed_ip']:
+            session.ip_address = record['framed_ip']
+        if record['mac']:
+            session.mac_address = record['mac']
+        if record['nas_ip']:
+            session.nas_ip_address = record['nas_ip']
+        session.input_octets = max(session.input_octets or 0, record['input_octets'])
+        session.output_octets = max(session.output_octets or 0, record['output_octets'])
+        session.data_used = min((session.input_octets + session.output_octets) // BYTES_PER_MB, MAX_DATA_USED)
+        if record.get('started_at'):
+            # New rows default to now; a Start seen after an Interim-Update moves it back
+            started = datetime.fromtimestamp(record['started_at'], tz=dt_timezone.utc)
+            if session.start_time is None or started < session.start_time:
+                session.start_time = started
+        if record['status'] == STATUS_STOP:
+            session.end_time = datetime.fromtimestamp(record['event_time'], tz=dt_timezone.utc)
+            session.is_active = False
+
+    @staticmethod
+    def _resolve_hotspots(records):
+        """Map record keys to hotspots via the NAS client, NAS-Identifier (hotspot_<id>) or the SSID in Called-Station-Id"""
+        by_marker = {}
+        by_ssid = {}
+        for record in records:
+            match = HOTSPOT_MARKER.search(record['nas_identifier'] or '')
+            ssid = called_station_ssid(record['called_station_id'])
+            if record.get('nas_hotspot_id'):
+                by_marker[record_key(record)] = record['nas_hotspot_id']
+            elif match:
+                by_marker[record_key(record)] = int(match.group(1))
+            elif ssid:
+                by_ssid[record_key(record)] = ssid
+
+        known_ids = set(Hotspot.objects.filter(id__in=set(by_marker.values())).values_list('id', flat=True))
+        ssids = dict(Hotspot.objects.filter(
+            ssid__in=set(by_ssid.values()), is_active=True
+        ).values_list('ssid', 'id'))
+
+        resolved = {sid: hid for sid, hid in by_marker.items() if hid in known_ids}
+        resolved.update({sid: ssids[ssid] for sid, ssid in by_ssid.items() if ssid in ssids})
+        return resolved
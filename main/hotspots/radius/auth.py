@@ -1,8 +1,14 @@
 # hotspots/radius/auth.py
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
 from pyrad.packet import AccessAccept, AccessReject
-from django.contrib.auth import authenticate
 from pyrad import __version__
+from accounts.auth_snapshot import snapshot_reader
+from accounts.credential_cache import credential_cache
+from accounts.password_verifier import (
+    check_user_password, get_password_verifier, hash_dummy_password, verify_user_credentials
+)
+from hotspots.authorization import GRANTED, authorize, resolve_hotspot
 
 User = get_user_model()
 
@@ -10,12 +16,44 @@ if not __version__.startswith('2.4'):
     import warnings
     warnings.warn(f"pyrad {__version__} may behave differently than expected")
 
-def radius_authenticate(username, password):
+def _check_credentials(username, password):
+    """Return the active user for these credentials, or None.
+
+    With the verified-credential cache enabled, a re-authentication with a
+    password that was checked recently is answered from an HMAC comparison
+    instead of another run of the password hasher.
+    """
+    if not credential_cache.enabled:
+        return verify_user_credentials(username, password)
+
+    # The user row the cache lookup needs is checked directly on a miss
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        hash_dummy_password(password)
+        user = None
+    if user is not None:
+        if user.is_active and credential_cache.verify(user, password):
+            return user
+        if check_user_password(user, password):
+            credential_cache.remember(user, password)
+            return user
+    user_login_failed.send(sender=__name__, credentials={'username': username}, request=None)
+    return None
+
+
+def radius_authenticate(username, password, ssid=None):
     """Authenticate user against RADIUS server.
     Returns AccessAccept (2) or AccessReject (3) from pyrad.packet
+
+    With ssid, the hotspot ownership rules of the HTTP endpoint apply too.
     """
-    user = authenticate(username=username, password=password)
-    
+    if ssid:
+        result = authorize(username, password, ssid)
+        user = result.user if result.status == GRANTED else None
+    else:
+        user = _check_credentials(username, password)
+
     if not user or not user.is_active:
         return AccessReject  
     
@@ -25,6 +63,21 @@ def radius_authenticate(username, password):
     return AccessReject
 
 
+def snapshot_authenticate(username, password, ssid=None):
+    """Answer from the exported auth snapshot without touching the database
+
+    Hotspot ownership is only checked when ssid is already in the SSID cache.
+    """
+    entry = snapshot_reader.lookup(username)
+    if not entry or not get_password_verifier().verify(password, entry['password']):
+        return AccessReject
+    if ssid:
+        hotspot = resolve_hotspot(ssid, cached_only=True)
+        if hotspot and not snapshot_reader.owner_allowed(entry, hotspot.owner_id):
+            return AccessReject
+    return AccessAccept
+
+
 # def radius_authenticate(username, password):
 #     try:
 #         user = User.objects.get(username=username)
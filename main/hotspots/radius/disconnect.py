@@ -0,0 +1,213 @@
+# hotspots/radius/disconnect.py
+import asyncio
+import logging
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from pyrad.dictionary import Dictionary
+from pyrad.packet import (
+    CoAACK, CoANAK, CoAPacket, CoARequest, DisconnectACK, DisconnectNAK, DisconnectRequest, Packet, PacketError
+)
+from accounts.eligibility import invalidate_eligibility
+from accounts.enums import UserType
+from billing.models import Subscription
+from hotspots.models import Session
+from hotspots.radius.nas import NasRegistry
+from hotspots.radius.server import DICTIONARY_PATH
+
+logger = logging.getLogger(__name__)
+
+ACKED = 'acked'
+NAKED = 'nak'
+TIMEOUT = 'timeout'
+UNKNOWN_NAS = 'unknown_nas'
+NO_NAS = 'no_nas'
+
+# RFC 5176 Error-Cause: the NAS has no such session, so it is already gone
+SESSION_NOT_FOUND = 503
+
+
+def expire_subscriptions(now=None):
+    """Deactivate lapsed subscriptions in one query; returns the affected user ids"""
+    now = now or timezone.now()
+    lapsed = Subscription.objects.filter(is_active=True, end_date__lt=now)
+    user_ids = set(lapsed.values_list('user_id', flat=True))
+    if user_ids:
+        # update() skips the pre_save signal and auto_now, so mirror both here
+        lapsed.update(is_active=False, updated_at=now)
+        for user_id in user_ids:
+            invalidate_eligibility(user_id)
+    return user_ids
+
+
+def ineligible_sessions(now=None):
+    """Active sessions whose user is inactive or has neither a running subscription nor credit"""
+    now = now or timezone.now()
+    running = Subscription.objects.filter(user=OuterRef('user'), is_active=True, end_date__gte=now)
+    return Session.objects.filter(is_active=True).annotate(
+        has_subscription=Exists(running)
+    ).exclude(
+        Q(user__is_active=True) & (
+            Q(has_subscription=True) | Q(user__user_type=UserType.CUSTOMER, user__credit__gt=0)
+        )
+    ).select_related('user')
+
+
+class DisconnectProtocol(asyncio.DatagramProtocol):
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    def datagram_received(self, data, addr):
+        self.dispatcher.reply_received(data, addr)
+
+    def error_received(self, exc):
+        logger.warning(f"Disconnect socket error: {exc}")
+
+
+class DisconnectDispatcher:
+    """
+    Send RFC 5176 Disconnect-Requests (or CoA-Requests) for many sessions at once.
+
+    All packets share one UDP socket. Up to concurrency requests are in
+    flight; replies are matched on (NAS address, identifier) and checked
+    against the request authenticator. Unanswered requests are resent
+    unchanged up to retries times.
+    """
+
+    def __init__(self, registry=None, port=None, timeout=None, retries=None,
+                 concurrency=None, coa=False, dictionary=None):
+        self.registry = registry or NasRegistry()
+        self.port = port or getattr(settings, 'RADIUS_DISCONNECT_PORT', 3799)
+        self.timeout = timeout or getattr(settings, 'RADIUS_DISCONNECT_TIMEOUT', 3)
+        self.retries = retries if retries is not None else getattr(settings, 'RADIUS_DISCONNECT_RETRIES', 2)
+        self.concurrency = concurrency or getattr(settings, 'RADIUS_DISCONNECT_CONCURRENCY', 64)
+        self.coa = coa
+        self.dict = dictionary or Dictionary(DICTIONARY_PATH)
+        self._transport = None
+        self._waiting = {}
+        self._next_id = {}
+
+    def _allocate_id(self, address):
+        """Next identifier not currently in flight to this NAS"""
+        start = self._next_id.get(address, 0)
+        for offset in range(256):
+            packet_id = (start + offset) % 256
+            if (address, packet_id) not in self._waiting:
+                self._next_id[address] = (packet_id + 1) % 256
+                return packet_id
+        return None
+
+    def build_request(self, session, secret, packet_id):
+        attributes = {'User_Name': session.user.username}
+        if session.acct_session_id:
+            attributes['Acct_Session_Id'] = session.acct_session_id
+        if session.ip_address and session.ip_address != '0.0.0.0':
+            attributes['Framed_IP_Address'] = session.ip_address
+        if session.mac_address:
+            attributes['Calling_Station_Id'] = session.mac_address
+        if self.coa:
+            attributes['Filter_Id'] = getattr(settings, 'RADIUS_COA_FILTER_ID', 'expired')
+        request = CoAPacket(
+            code=CoARequest if self.coa else DisconnectRequest,
+            id=packet_id, secret=secret, dict=self.dict, **attributes
+        )
+        return request, request.RequestPacket()
+
+    def reply_received(self, data, addr):
+        try:
+            reply = Packet(packet=data, dict=self.dict)
+        except (PacketError, KeyError, ValueError) as e:
+            logger.warning(f"Malformed disconnect reply from {addr[0]}: {e}")
+            return
+        waiter = self._waiting.get((addr[0], reply.id))
+        if waiter is None:
+            return
+        request, future = waiter
+        reply.secret = request.secret
+        if future.done() or not request.VerifyReply(reply, data):
+            logger.warning(f"Unverifiable disconnect reply from {addr[0]}")
+            return
+        future.set_result(reply)
+
+    async def _send(self, session, semaphore):
+        address = session.nas_ip_address
+        if not address:
+            # Never seen in accounting, so there is no NAS to ask
+            return session.id, NO_NAS
+        secret = self.registry.get_secret(address)
+        if secret is None:
+            return session.id, UNKNOWN_NAS
+
+        async with semaphore:
+            packet_id = self._allocate_id(address)
+            if packet_id is None:
+                return session.id, TIMEOUT
+            request, raw = self.build_request(session, secret, packet_id)
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[(address, packet_id)] = (request, future)
+            try:
+                for _ in range(self.retries + 1):
+                    self._transport.sendto(raw, (address, self.port))
+                    try:
+                        reply = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+                        break
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    return session.id, TIMEOUT
+            finally:
+                del self._waiting[(address, packet_id)]
+
+        if reply.code in (DisconnectACK, CoAACK):
+            return session.id, ACKED
+        if reply.code in (DisconnectNAK, CoANAK) and 'Error-Cause' in reply \
+                and SESSION_NOT_FOUND in reply['Error-Cause']:
+            return session.id, ACKED
+        return session.id, NAKED
+
+    async def dispatch(self, sessions):
+        """Send one request per session; returns {session_id: outcome}"""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: DisconnectProtocol(self), local_addr=('0.0.0.0', 0)
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            results = await asyncio.gather(*(self._send(session, semaphore) for session in sessions))
+        finally:
+            self._transport.close()
+            self._transport = None
+        return dict(results)
+
+
+def close_sessions(session_ids, now=None):
+    """Mark disconnected sessions as ended in one query"""
+    if not session_ids:
+        return 0
+    return Session.objects.filter(id__in=session_ids, is_active=True).update(
+        is_active=False, end_time=now or timezone.now()
+    )
+
+
+def disconnect_ineligible_sessions(dispatcher=None, now=None):
+    """
+    Expire lapsed subscriptions, disconnect sessions of users who lost
+    eligibility and close the sessions the NAS confirmed (or that never had
+    a NAS). Sessions that were NAKed or timed out stay active and are
+    retried on the next run.
+    """
+    now = now or timezone.now()
+    expire_subscriptions(now)
+    sessions = list(ineligible_sessions(now))
+    if not sessions:
+        return {}
+
+    dispatcher = dispatcher or DisconnectDispatcher()
+    results = asyncio.run(dispatcher.dispatch(sessions))
+    close_sessions([session_id for session_id, outcome in results.items() if outcome in (ACKED, NO_NAS)], now)
+
+    summary = {}
+    for outcome in results.values():
+        summary[outcome] = summary.get(outcome, 0) + 1
+    logger.info(f"Disconnect run for {len(sessions)} sessions: {summary}")
+    return summary
@@ -0,0 +1,139 @@
+# hotspots/radius/nas.py
+import logging
+import ipaddress
+import threading
+import weakref
+from collections import namedtuple
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+NasEntry = namedtuple('NasEntry', ['secret', 'hotspot_id', 'network', 'ssid'])
+
+
+class PrefixTrie:
+    """
+    Binary trie over address bits for longest-prefix matching.
+
+    A lookup walks at most one node per bit of the longest stored prefix,
+    so its cost does not grow with the number of networks.
+    """
+
+    def __init__(self):
+        # Node layout: [zero_child, one_child, value]
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, network, value):
+        network = ipaddress.ip_network(network, strict=False)
+        bits = network.max_prefixlen
+        address = int(network.network_address)
+        node = self._roots[network.version]
+        for i in range(network.prefixlen):
+            bit = (address >> (bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            self._size += 1
+        node[2] = value
+
+    def longest_match(self, address):
+        """Value of the most specific network containing address, or None"""
+        ip = ipaddress.ip_address(address)
+        bits = ip.max_prefixlen
+        value = int(ip)
+        node = self._roots[ip.version]
+        match = node[2]
+        for i in range(bits):
+            node = node[(value >> (bits - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                match = node[2]
+        return match
+
+
+_registries = weakref.WeakSet()
+
+
+class NasRegistry:
+    """
+    Resolve the shared secret (and linked hotspot) of a NAS from its source address.
+
+    With explicit clients the registry is static. Otherwise it is built from
+    RADIUS_CLIENTS plus active NasClient rows, database rows winning on equal
+    prefixes. NasClient changes rebuild registries in the saving process
+    through signals; other processes (the RADIUS server) call refresh()
+    periodically, which compares a one-query fingerprint before rebuilding.
+    Rebuilds swap in a new trie, so lookups never block.
+    """
+
+    def __init__(self, clients=None):
+        self._static = clients
+        self._trie = PrefixTrie()
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.reload()
+        if clients is None:
+            _registries.add(self)
+
+    def __len__(self):
+        return len(self._trie)
+
+    def _fetch_fingerprint(self):
+        from hotspots.models import NasClient
+        # A renamed hotspot changes the SSID its clients resolve to
+        stats = NasClient.objects.aggregate(
+            count=Count('id'), changed=Max('updated_at'), hotspot_changed=Max('hotspot__updated_at')
+        )
+        return stats['count'], stats['changed'], stats['hotspot_changed']
+
+    def reload(self):
+        """Rebuild the index from settings and the database"""
+        trie = PrefixTrie()
+        clients = self._static if self._static is not None else getattr(settings, 'RADIUS_CLIENTS', {})
+        for network, secret in clients.items():
+            trie.insert(network, NasEntry(secret.encode(), None, str(network), None))
+
+        fingerprint = None
+        if self._static is None:
+            from hotspots.models import NasClient
+            with self._lock:
+                fingerprint = self._fetch_fingerprint()
+                clients = NasClient.objects.filter(is_active=True).values_list(
+                    'network', 'secret', 'hotspot_id', 'hotspot__ssid'
+                )
+                for network, secret, hotspot_id, ssid in clients:
+                    trie.insert(network, NasEntry(secret.encode(), hotspot_id, network, ssid))
+        self._trie, self._fingerprint = trie, fingerprint
+        logger.info(f"NAS registry loaded with {len(trie)} clients")
+
+    def refresh(self):
+        """Reload only if NasClient rows changed since the last load; returns True if reloaded"""
+        if self._static is not None or self._fetch_fingerprint() == self._fingerprint:
+            return False
+        self.reload()
+        return True
+
+    def lookup(self, address):
+        """NasEntry for address, or None for unknown clients"""
+        try:
+            return self._trie.longest_match(address)
+        except ValueError:
+            return None
+
+    def get_secret(self, address):
+        """Return the secret for address as bytes, or None for unknown clients"""
+        entry = self.lookup(address)
+        return entry.secret if entry else None
+
+
+def reload_registries():
+    """Rebuild every database-backed registry in this process"""
+    for registry in list(_registries):
+        registry.reload()
@@ -0,0 +1,322 @@
+# hotspots/radius/server.py
+import os
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from pyrad.dictionary import Dictionary
+from pyrad.packet import AccessAccept, AccessReject, AccessRequest, AccountingRequest, AcctPacket, AuthPacket, Packet, PacketError
+
+from accounts.rate_limit import get_login_rate_limiter
+from hotspots.models import Hotspot
+from hotspots.radius.accounting import AccountingBuffer, called_station_ssid, parse_accounting_packet
+from hotspots.radius.auth import radius_authenticate, snapshot_authenticate
+from hotspots.radius.nas import NasRegistry
+
+logger = logging.getLogger(__name__)
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dictionary')
+
+
+class RadiusProtocol(asyncio.DatagramProtocol):
+    """Thin UDP protocol that hands every datagram to a server callback"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.handler(self.transport, data, addr)
+
+    def error_received(self, exc):
+        logger.error(f"RADIUS socket error: {exc}")
+
+
+class RadiusServer:
+    """
+    Asyncio RADIUS authentication and accounting server.
+
+    Datagrams are decoded on the event loop and every Access-Request is
+    handled in its own task, so requests are pipelined instead of being
+    answered one at a time. The blocking part (ORM queries and password
+    hashing) runs on a bounded thread pool; once max_pending requests are
+    in flight new packets are dropped and the NAS retransmits them.
+
+    Accounting-Requests are acknowledged as soon as they are spooled; the
+    AccountingBuffer writes them to Session in batches.
+
+    When the database path errors or takes longer than db_timeout, the
+    request is answered by fallback (the exported auth snapshot) instead,
+    on a pool of its own so it never queues behind hung database calls.
+    """
+
+    def __init__(self, host=None, auth_port=None, registry=None, max_workers=None,
+                 max_pending=None, authenticate=None, dictionary=None,
+                 acct_port=None, accounting=None, fallback=None, db_timeout=None, rate_limiter=None):
+        self.host = host or getattr(settings, 'RADIUS_HOST', '0.0.0.0')
+        self.auth_port = auth_port if auth_port is not None else getattr(settings, 'RADIUS_AUTH_PORT', 1812)
+        self.acct_port = acct_port if acct_port is not None else getattr(settings, 'RADIUS_ACCT_PORT', 1813)
+        self.accounting = accounting
+        self.registry = registry or NasRegistry()
+        self.max_workers = max_workers or getattr(settings, 'RADIUS_MAX_WORKERS', 16)
+        self.fallback_workers = getattr(settings, 'RADIUS_FALLBACK_WORKERS', 4)
+        self.max_pending = max_pending or getattr(settings, 'RADIUS_MAX_PENDING', 1024)
+        self.authenticate = authenticate or radius_authenticate
+        self.fallback = fallback or snapshot_authenticate
+        self.rate_limiter = rate_limiter or get_login_rate_limiter()
+        self.db_timeout = db_timeout if db_timeout is not None else getattr(settings, 'RADIUS_DB_TIMEOUT', None)
+        self.dict = dictionary or Dictionary(DICTIONARY_PATH)
+
+        self.executor = None
+        self.fallback_executor = None
+        self.transports = []
+        self.acct_address = None
+        self._in_flight = set()
+        self._flush_task = None
+        self._flush_loop_task = None
+        self._nas_reload_task = None
+        self.nas_reload_interval = getattr(settings, 'RADIUS_NAS_RELOAD_INTERVAL', 5)
+        self.stats = {
+            'received': 0,
+            'accepted': 0,
+            'rejected': 0,
+            'rate_limited': 0,
+            'accounted': 0,
+            'fallbacks': 0,
+            'dropped': 0,
+            'duplicates': 0,
+            'errors': 0,
+        }
+
+    @property
+    def pending(self):
+        return len(self._in_flight)
+
+    async def start(self):
+        """Bind the sockets and return the authentication address"""
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='radius-worker'
+        )
+        self.fallback_executor = ThreadPoolExecutor(
+            max_workers=self.fallback_workers,
+            thread_name_prefix='radius-fallback'
+        )
+        address = await self._bind(self.auth_port, self.datagram_received)
+        logger.info(f"RADIUS authentication listening on {address[0]}:{address[1]}")
+        self._nas_reload_task = asyncio.get_running_loop().create_task(self._nas_reload_loop())
+
+        if self.acct_port is not False:
+            if self.accounting is None:
+                self.accounting = AccountingBuffer()
+            self.accounting.recover()
+            self.acct_address = await self._bind(self.acct_port, self.accounting_received)
+            self._flush_loop_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            logger.info(f"RADIUS accounting listening on {self.acct_address[0]}:{self.acct_address[1]}")
+        return address
+
+    async def _bind(self, port, handler):
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: RadiusProtocol(handler),
+            local_addr=(self.host, port)
+        )
+        self.transports.append(transport)
+        return transport.get_extra_info('sockname')
+
+    async def stop(self):
+        for transport in self.transports:
+            transport.close()
+        self.transports = []
+        for task in (self._flush_loop_task, self._nas_reload_task):
+            if task:
+                task.cancel()
+        self._flush_loop_task = self._nas_reload_task = None
+        if self.accounting is not None and self.executor:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._flush_accounting)
+            self.accounting.close()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.fallback_executor:
+            self.fallback_executor.shutdown(wait=True)
+            self.fallback_executor = None
+        logger.info("RADIUS server stopped")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    def datagram_received(self, transport, data, addr):
+        self.stats['received'] += 1
+
+        secret = self.registry.get_secret(addr[0])
+        if secret is None:
+            logger.warning(f"Dropping RADIUS packet from unknown client {addr[0]}")
+            self.stats['dropped'] += 1
+            return
+
+        try:
+            header = Packet(packet=data, dict=self.dict)
+        except (PacketError, KeyError, ValueError) as e:
+            logger.warning(f"Malformed RADIUS packet from {addr[0]}: {e}")
+            self.stats['errors'] += 1
+            return
+
+        if header.code != AccessRequest:
+            logger.debug(f"Ignoring RADIUS packet code {header.code} from {addr[0]}")
+            self.stats['dropped'] += 1
+            return
+
+        # Retransmissions of a request still being processed are ignored
+        key = (addr, header.id, header.authenticator)
+        if key in self._in_flight:
+            self.stats['duplicates'] += 1
+            return
+        if len(self._in_flight) >= self.max_pending:
+            self.stats['dropped'] += 1
+            return
+
+        request = AuthPacket(packet=data, secret=secret, dict=self.dict)
+        self._in_flight.add(key)
+        task = asyncio.get_running_loop().create_task(self.handle_access_request(transport, request, addr))
+        task.add_done_callback(lambda _: self._in_flight.discard(key))
+
+    async def handle_access_request(self, transport, request, addr):
+        try:
+            username = request['User-Name'][0] if 'User-Name' in request else ''
+            password = request.PwDecrypt(request['User-Password'][0]) if 'User-Password' in request else ''
+            # Called-Station-Id is "<bssid>:<ssid>" on hostapd, only the MAC on many other NASes
+            ssid = called_station_ssid(request['Called-Station-Id'][0] if 'Called-Station-Id' in request else '')
+        except (KeyError, UnicodeDecodeError) as e:
+            logger.warning(f"Undecodable Access-Request from {addr[0]}: {e}")
+            self.stats['errors'] += 1
+            return
+
+        # Throttled attempts are rejected here, before any thread, query or hash
+        nas = self.registry.lookup(addr[0])
+        check = partial(
+            self.rate_limiter.check,
+            username=username,
+            mac=request['Calling-Station-Id'][0] if 'Calling-Station-Id' in request else None,
+            # Keyed by SSID like the HTTP endpoint, so both paths share one hotspot bucket
+            hotspot=ssid or (nas.ssid if nas else None) or f"nas_{addr[0]}"
+        )
+        loop = asyncio.get_running_loop()
+        if self.rate_limiter.blocking:
+            # A Redis round-trip; the default pool, so it never queues behind database calls
+            limited = await loop.run_in_executor(None, check)
+        else:
+            limited = check()
+        if limited:
+            self.stats['rate_limited'] += 1
+            code = AccessReject
+        else:
+            try:
+                code = await self._authenticate_or_fallback(
+                    loop, username, password, ssid, nas.hotspot_id if nas and not ssid else None
+                )
+            except Exception as e:
+                logger.error(f"RADIUS authentication failed for {username}: {e}", exc_info=True)
+                self.stats['errors'] += 1
+                return
+
+        reply = request.CreateReply()
+        reply.code = code
+        if code == AccessAccept:
+            self.stats['accepted'] += 1
+        else:
+            self.stats['rejected'] += 1
+        transport.sendto(reply.ReplyPacket(), addr)
+
+    async def _authenticate_or_fallback(self, loop, username, password, ssid=None, hotspot_id=None):
+        future = loop.run_in_executor(self.executor, self._authenticate, username, password, ssid, hotspot_id)
+        # A timed-out call keeps running; swallow its late result or error
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            if self.db_timeout:
+                return await asyncio.wait_for(asyncio.shield(future), self.db_timeout)
+            return await future
+        except (asyncio.TimeoutError, DatabaseError) as e:
+            logger.warning(f"Database path unavailable for {username} ({e!r}), answering from auth snapshot")
+            self.stats['fallbacks'] += 1
+            # Not self.executor: its threads may all be stuck in the database calls that timed out
+            return await loop.run_in_executor(self.fallback_executor, self.fallback, username, password, ssid)
+
+    def _authenticate(self, username, password, ssid=None, hotspot_id=None):
+        """Runs on the worker pool; keeps the thread's DB connection healthy"""
+        close_old_connections()
+        if hotspot_id and not ssid:
+            # No SSID in Called-Station-Id: the hotspot the NAS client is registered for
+            ssid = Hotspot.objects.filter(id=hotspot_id).values_list('ssid', flat=True).first()
+        return self.authenticate(username, password, ssid)
+
+    def accounting_received(self, transport, data, addr):
+        self.stats['received'] += 1
+
+        secret = self.registry.get_secret(addr[0])
+        if secret is None:
+            logger.warning(f"Dropping accounting packet from unknown client {addr[0]}")
+            self.stats['dropped'] += 1
+            return
+
+        try:
+            request = AcctPacket(packet=data, secret=secret, dict=self.dict)
+        except (PacketError, KeyError, ValueError) as e:
+            logger.warning(f"Malformed accounting packet from {addr[0]}: {e}")
+            self.stats['errors'] += 1
+            return
+        if request.code != AccountingRequest or not request.VerifyAcctRequest():
+            logger.warning(f"Dropping unverifiable accounting packet from {addr[0]}")
+            self.stats['dropped'] += 1
+            return
+
+        # Acknowledge only once the record is spooled
+        record = parse_accounting_packet(request)
+        record['nas_hotspot_id'] = self.registry.lookup(addr[0]).hotspot_id
+        # Sessions are keyed per NAS; not every NAS sends NAS-IP-Address
+        record['nas_ip'] = record['nas_ip'] or addr[0]
+        flush_due = self.accounting.add(record)
+        self.stats['accounted'] += 1
+        transport.sendto(request.CreateReply().ReplyPacket(), addr)
+        if flush_due:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            loop = asyncio.get_running_loop()
+            self._flush_task = loop.run_in_executor(self.executor, self._flush_accounting)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.accounting.flush_interval)
+            if self.accounting.flush_due():
+                self._schedule_flush()
+
+    async def _nas_reload_loop(self):
+        """Pick up NasClient changes made by other processes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.nas_reload_interval)
+            try:
+                await loop.run_in_executor(self.executor, self._refresh_registry)
+            except Exception as e:
+                logger.error(f"NAS registry refresh failed: {e}")
+
+    def _refresh_registry(self):
+        close_old_connections()
+        self.registry.refresh()
+
+    def _flush_accounting(self):
+        close_old_connections()
+        try:
+            self.accounting.flush()
+        except Exception as e:
+            logger.error(f"Accounting flush failed: {e}")
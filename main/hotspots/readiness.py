@@ -0,0 +1,144 @@
+# hotspots/readiness.py
+import os
+import time
+import logging
+import threading
+from django.conf import settings
+from .fleet import interface_states
+from .hostapd import control_at, control_socket_path
+from .processes import process_snapshot
+from .radios import radio_unit_name, serving_ssids
+from .systemd import get_systemd_manager, unit_name
+
+logger = logging.getLogger(__name__)
+
+# Unit states that mean systemd is still working on the unit
+TRANSITIONAL_STATES = ('activating', 'deactivating', 'reloading')
+
+
+class Deadline:
+    def __init__(self, timeout):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.remaining() == 0.0
+
+
+def wait_for(condition, timeout, interval=0.05, max_interval=0.5, cancel=None):
+    """
+    Re-evaluate condition until it returns something truthy or the deadline passes.
+
+    Probes start 50 ms apart and back off to max_interval, so the caller
+    returns moments after the condition holds instead of after a fixed
+    sleep. Setting the cancel event ends the wait early. Returns the last
+    value of condition.
+    """
+    deadline = Deadline(timeout)
+    cancel = cancel or threading.Event()
+    delay = interval
+    while True:
+        result = condition()
+        if result or deadline.expired() or cancel.is_set():
+            return result
+        cancel.wait(min(delay, deadline.remaining()))
+        delay = min(delay * 2, max_interval)
+
+
+def hostapd_ping(path):
+    """True if the hostapd control socket at path answers PING, None if there is no socket"""
+    if not os.path.exists(path):
+        return None
+    return control_at(path).ping()
+
+
+def probe(hotspot_id, interface=None):
+    """One look at everything that tells whether a hotspot is up"""
+    process_snapshot.invalidate()
+    daemons = process_snapshot.running_hotspots().get(int(hotspot_id), set())
+    return {
+        'unit_state': get_systemd_manager().active_state(unit_name(hotspot_id)),
+        'hostapd': 'hostapd' in daemons,
+        'dnsmasq': 'dnsmasq' in daemons,
+        'interface_state': interface_states([interface])[interface] if interface else None,
+        'ctrl_ping': hostapd_ping(control_socket_path(interface)) if interface else None,
+    }
+
+
+def is_ready(state):
+    """Serving (unit active or both daemons up), interface up and hostapd answering"""
+    serving = state['unit_state'] == 'active' or (state['hostapd'] and state['dnsmasq'])
+    interface_up = state['interface_state'] in (None, 'up', 'unknown')
+    return serving and interface_up and state['ctrl_ping'] is not False
+
+
+def is_stopped(state):
+    return (
+        state['unit_state'] != 'active'
+        and state['unit_state'] not in TRANSITIONAL_STATES
+        and not state['hostapd']
+        and not state['dnsmasq']
+    )
+
+
+def wait_until_running(hotspot_id, interface=None, timeout=None, cancel=None):
+    """
+    Block until the hotspot is up or the deadline passes; returns (ready, last state).
+
+    A unit that reaches 'failed' ends the wait at once.
+    """
+    timeout = timeout if timeout is not None else getattr(settings, 'HOTSPOT_START_TIMEOUT', 45)
+    states = []
+
+    def check():
+        state = probe(hotspot_id, interface)
+        states.append(state)
+        return is_ready(state) or state['unit_state'] == 'failed'
+
+    wait_for(check, timeout, cancel=cancel)
+    state = states[-1]
+    ready = is_ready(state)
+    if not ready:
+        logger.warning(f"Hotspot {hotspot_id} not ready after {timeout}s: {state}")
+    return ready, state
+
+
+def wait_until_stopped(hotspot_id, timeout=None, cancel=None):
+    """Block until the unit and daemons are gone or the deadline passes; returns (stopped, last state)"""
+    timeout = timeout if timeout is not None else getattr(settings, 'HOTSPOT_STOP_TIMEOUT', 10)
+    states = []
+
+    def check():
+        state = probe(hotspot_id)
+        states.append(state)
+        return is_stopped(state)
+
+    stopped = bool(wait_for(check, timeout, cancel=cancel))
+    return stopped, states[-1]
+
+
+def wait_until_bss(hotspot, serving=True, timeout=None, cancel=None):
+    """
+    Multi-BSS counterpart of wait_until_running/wait_until_stopped.
+
+    Waits until hotspot's SSID is (or, with serving=False, is no longer)
+    beaconed by its radio's hostapd; returns (done, last state).
+    """
+    setting, default = ('HOTSPOT_START_TIMEOUT', 45) if serving else ('HOTSPOT_STOP_TIMEOUT', 10)
+    timeout = timeout if timeout is not None else getattr(settings, setting, default)
+    states = []
+
+    def check():
+        unit_state = get_systemd_manager().active_state(radio_unit_name(hotspot.interface))
+        ssids = serving_ssids(hotspot.interface) if unit_state == 'active' else set()
+        states.append({'unit_state': unit_state, 'ssids': sorted(ssids)})
+        return (hotspot.ssid in ssids) == serving or (serving and unit_state == 'failed')
+
+    wait_for(check, timeout, cancel=cancel)
+    state = states[-1]
+    done = (hotspot.ssid in state['ssids']) == serving
+    if not done:
+        logger.warning(f"Hotspot {hotspot.id} on {hotspot.interface} not {'serving' if serving else 'removed'} after {timeout}s: {state}")
+    return done, state
@@ -0,0 +1,184 @@
+# hotspots/reconciler.py
+import uuid
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .fleet import collect_fleet_status
+from .models import Hotspot
+from .operations import drop_lease, operation_lease, radio_lease, take_lease
+from .processes import process_snapshot
+from .radios import apply_radio, radio_files, serves_as_bss, serving_ssids
+from .rendering import config_digest
+from .services import HotspotControlService
+from .systemd import get_systemd_manager, unit_name
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'hotspot_reconcile_pending'
+PENDING_OWNER = 'queued'
+RUN_KEY = 'hotspot_reconcile_run'
+
+# kind: start, stop, restart (one hotspot) or radio (re-apply one multi-BSS radio)
+Action = namedtuple('Action', ['kind', 'hotspot_id', 'interface', 'hotspots'])
+
+
+def reconciler_enabled():
+    return getattr(settings, 'HOTSPOT_RECONCILER_ENABLED', False)
+
+
+def _config_stale(hotspot):
+    # Hotspots started before config hashing are adopted as they run
+    return bool(hotspot.config_hash) and (
+        config_digest(HotspotControlService.config_files(hotspot)) != hotspot.config_hash
+    )
+
+
+def plan_actions(hotspots, statuses, orphans=(), radio_ssids=None):
+    """
+    The fewest actions that bring observed state in line with desired state.
+
+    Standalone hotspots are started, stopped or restarted (when running on
+    outdated config). A multi-BSS radio gets one 'radio' action when the
+    SSIDs it beacons or its rendered files differ from what its running
+    hotspots want. orphans are ids of hotspot daemons with no row left.
+    """
+    radio_ssids = radio_ssids or {}
+    running = {status['id']: status['is_running'] for status in statuses}
+    actions = []
+    radios = {}
+    for hotspot in hotspots:
+        wanted = hotspot.desired_state == Hotspot.DesiredState.RUNNING
+        if serves_as_bss(hotspot):
+            radios.setdefault(hotspot.interface, []).append(hotspot)
+        elif wanted and not running[hotspot.id]:
+            actions.append(Action('start', hotspot.id, hotspot.interface, [hotspot]))
+        elif not wanted and running[hotspot.id]:
+            actions.append(Action('stop', hotspot.id, hotspot.interface, [hotspot]))
+        elif wanted and _config_stale(hotspot):
+            actions.append(Action('restart', hotspot.id, hotspot.interface, [hotspot]))
+
+    for interface, members in sorted(radios.items()):
+        wanted = [hotspot for hotspot in members if hotspot.desired_state == Hotspot.DesiredState.RUNNING]
+        served = radio_ssids.get(interface, set())
+        stale = bool(wanted) and config_digest(radio_files(interface, wanted)) != wanted[0].config_hash
+        if {hotspot.ssid for hotspot in wanted} != served or stale:
+            actions.append(Action('radio', None, interface, wanted))
+
+    for hotspot_id in sorted(orphans):
+        actions.append(Action('stop', hotspot_id, None, []))
+    return actions
+
+
+def _execute(action):
+    """Carry out one action; runs on a worker thread"""
+    try:
+        if action.kind == 'radio':
+            with radio_lease(action.interface) as acquired:
+                if not acquired:
+                    return {'success': False, 'stdout': '', 'stderr': f'another operation is in progress on {action.interface}'}
+                return apply_radio(action.interface, members=action.hotspots)
+        with operation_lease(action.hotspot_id, 'reconcile') as acquired:
+            if not acquired:
+                # A control task is working on it; the next run sees the outcome
+                return {'success': False, 'stdout': '', 'stderr': 'another operation is in progress'}
+            return _execute_hotspot(action)
+    except Exception as e:
+        logger.error(f"Reconcile {action.kind} of {action.hotspot_id or action.interface} failed: {e}")
+        return {'success': False, 'stdout': '', 'stderr': str(e)}
+    finally:
+        close_old_connections()
+
+
+def _execute_hotspot(action):
+    service = HotspotControlService()
+    if action.kind in ('start', 'restart'):
+        service.prepare_config(action.hotspots[0])
+        return service.execute_hotspot_command(action.kind, action.hotspot_id)
+    if not action.hotspots:
+        # Daemons of a deleted hotspot: nothing in the database to go through
+        ok = get_systemd_manager().stop(unit_name(action.hotspot_id))
+        return {'success': ok, 'stdout': '', 'stderr': '' if ok else 'stop failed'}
+    return service.execute_hotspot_command('stop', action.hotspot_id)
+
+
+def reconcile(hotspots=None, max_workers=None):
+    """
+    Converge hotspots (all of them by default) to their desired_state.
+
+    Observation is one fleet status batch plus one STATUS query per active
+    radio; only the differences turn into actions, which run at most
+    max_workers (HOTSPOT_RECONCILE_WORKERS) at a time. Acted-on hotspots
+    are observed again and their is_active flags corrected in one update.
+
+    Runs exclude each other through a run-wide lease; a run that finds it
+    held does nothing, as the one in progress converges the same fleet.
+    """
+    owner = str(uuid.uuid4())
+    if not take_lease(RUN_KEY, owner, getattr(settings, 'HOTSPOT_RECONCILE_LEASE', 600)):
+        logger.info("Reconcile run already in progress, skipping")
+        return {'checked': 0, 'actions': [], 'failed': [], 'skipped': True}
+    try:
+        return _reconcile(hotspots, max_workers)
+    finally:
+        drop_lease(RUN_KEY, owner)
+
+
+def _reconcile(hotspots, max_workers):
+    drop_lease(PENDING_KEY, PENDING_OWNER)
+    hotspots = list(hotspots if hotspots is not None else Hotspot.objects.select_related('subnet').order_by('id'))
+    statuses = collect_fleet_status(hotspots, reconcile=False)
+
+    known = {hotspot.id for hotspot in hotspots}
+    orphans = set(process_snapshot.running_hotspots()) - known
+    if orphans:
+        orphans -= set(Hotspot.objects.filter(id__in=orphans).values_list('id', flat=True))
+    active_radios = {
+        hotspot.interface for hotspot, status in zip(hotspots, statuses)
+        if serves_as_bss(hotspot) and status['unit_state'] == 'active'
+    }
+    radio_ssids = {interface: serving_ssids(interface) for interface in active_radios}
+
+    actions = plan_actions(hotspots, statuses, orphans, radio_ssids)
+    if not actions:
+        return {'checked': len(hotspots), 'actions': [], 'failed': []}
+
+    workers = max_workers or getattr(settings, 'HOTSPOT_RECONCILE_WORKERS', 4)
+    logger.info(f"Reconciling {len(actions)} of {len(hotspots)} hotspots with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        results = list(pool.map(_execute, actions))
+
+    acted_ids = {action.hotspot_id for action in actions}
+    acted_radios = {action.interface for action in actions if action.kind == 'radio'}
+    collect_fleet_status(
+        [hotspot for hotspot in hotspots
+         if hotspot.id in acted_ids or (serves_as_bss(hotspot) and hotspot.interface in acted_radios)],
+        reconcile=True,
+    )
+    summary = [
+        {'action': action.kind, 'hotspot_id': action.hotspot_id, 'interface': action.interface,
+         'success': result.get('success', False)}
+        for action, result in zip(actions, results)
+    ]
+    return {
+        'checked': len(hotspots),
+        'actions': summary,
+        'failed': [entry for entry in summary if not entry['success']],
+    }
+
+
+def request_reconcile():
+    """
+    Queue one reconcile run after the current transaction; calls while one is pending coalesce.
+
+    The pending marker is an OperationLease row, so calls from every web and
+    worker process coalesce, and it is rolled back with the transaction.
+    """
+    if not reconciler_enabled():
+        return False
+    if not take_lease(PENDING_KEY, PENDING_OWNER, getattr(settings, 'HOTSPOT_RECONCILE_PENDING_TTL', 30)):
+        return False
+    from .tasks import reconcile_hotspots_task
+    transaction.on_commit(reconcile_hotspots_task.delay)
+    return True
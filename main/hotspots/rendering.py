@@ -0,0 +1,122 @@
+# hotspots/rendering.py
+import os
+import hashlib
+import logging
+import tempfile
+import subprocess
+from collections import namedtuple
+from django.conf import settings
+from .models import Hotspot
+from .systemd import get_systemd_manager
+
+logger = logging.getLogger(__name__)
+
+# Files a running hostapd picks up on reload (SIGHUP / ExecReload); any other change needs a restart
+RELOADABLE_KINDS = frozenset({'hostapd', 'dnsmasq', 'addresses'})
+
+
+class ConfigPlan(namedtuple('ConfigPlan', ['digest', 'changed', 'action'])):
+    """
+    Outcome of applying rendered config files.
+
+    changed lists the kinds of file that were rewritten; action is 'none',
+    'reload' or 'restart', whatever the running service needs to pick
+    them up.
+    """
+
+    @property
+    def needs_daemon_reload(self):
+        return 'unit' in self.changed
+
+
+def config_dir():
+    """Where env files and radio configs are rendered"""
+    return getattr(settings, 'HOTSPOT_CONFIG_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'hostapd-prod'))
+
+
+def unit_dir():
+    return getattr(settings, 'SYSTEMD_UNIT_DIR', '/etc/systemd/system')
+
+
+def config_digest(files):
+    """sha256 over the rendered content of files ({kind: (path, content)})"""
+    digest = hashlib.sha256()
+    for kind in sorted(files):
+        path, content = files[kind]
+        digest.update(f'{kind}\0{path}\0{content}\0'.encode())
+    return digest.hexdigest()
+
+
+def _differs(path, content):
+    try:
+        with open(path) as f:
+            return f.read() != content
+    except OSError:
+        return True
+
+
+def write_atomic(path, content, mode=0o644):
+    """
+    Replace path with content in one rename, so readers never see half a file.
+
+    Directories the Django user cannot write to (e.g. /etc/systemd/system)
+    are written through sudo: the content is staged next to the target
+    and renamed over it.
+    """
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        pass
+    privileged = not os.access(directory, os.W_OK)
+    fd, temp_path = tempfile.mkstemp(dir=None if privileged else directory, prefix='.render-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(temp_path, mode)
+        if privileged:
+            staged = f'{path}.render'
+            subprocess.run(['sudo', 'install', '-m', f'{mode:o}', temp_path, staged], check=True, capture_output=True)
+            subprocess.run(['sudo', 'mv', '-f', staged, path], check=True, capture_output=True)
+        else:
+            os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def apply_config(files, hotspots):
+    """
+    Write files ({kind: (path, content)}) that changed and record their digest on hotspots.
+
+    When every hotspot already carries the digest and the files exist,
+    nothing is read or written, so a repeated start of an unchanged
+    hotspot skips straight to the status check. A changed unit file is
+    followed by one systemd daemon reload.
+    """
+    hotspots = list(hotspots)
+    digest = config_digest(files)
+    if all(hotspot.config_hash == digest for hotspot in hotspots) and all(
+        os.path.exists(path) for path, _ in files.values()
+    ):
+        return ConfigPlan(digest, (), 'none')
+
+    changed = tuple(kind for kind in sorted(files) if _differs(*files[kind]))
+    for kind in changed:
+        path, content = files[kind]
+        write_atomic(path, content)
+        logger.info(f"Rendered {kind} config to {path}")
+    if 'unit' in changed and not get_systemd_manager().daemon_reload():
+        raise Exception("systemd daemon reload failed")
+
+    Hotspot.objects.filter(id__in=[hotspot.id for hotspot in hotspots]).update(config_hash=digest)
+    for hotspot in hotspots:
+        hotspot.config_hash = digest
+
+    if not changed:
+        action = 'none'
+    elif set(changed) <= RELOADABLE_KINDS:
+        action = 'reload'
+    else:
+        action = 'restart'
+    return ConfigPlan(digest, changed, action)
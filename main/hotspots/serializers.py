@@ -22,9 +22,11 @@ class HotspotSerializer(serializers.ModelSerializer):
         model = Hotspot
         fields = '__all__'
         extra_kwargs = {
-            'password': {'write_only': True}
+            'password': {'write_only': True},
+            # unique_running_hotspot_ssid also depends on desired_state, see validate()
+            'ssid': {'validators': []},
         }
-        read_only_fields = ['owner', 'created_at', 'updated_at']
+        read_only_fields = ['owner', 'config_hash', 'created_at', 'updated_at']
 
     def validate_ssid(self, value):
         """Validate SSID format"""
@@ -34,6 +36,20 @@ class HotspotSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("SSID contains invalid characters")
         return value
 
+    def validate(self, attrs):
+        """Only one hotspot that should be running may use an SSID"""
+        attrs = super().validate(attrs)
+        candidate = Hotspot(
+            pk=getattr(self.instance, 'pk', None),
+            ssid=attrs.get('ssid', getattr(self.instance, 'ssid', None)),
+            desired_state=attrs.get(
+                'desired_state', getattr(self.instance, 'desired_state', Hotspot.DesiredState.RUNNING)
+            ),
+        )
+        if candidate.desired_state == Hotspot.DesiredState.RUNNING and candidate.ssid_in_use():
+            raise serializers.ValidationError({'ssid': "A running hotspot already uses this SSID"})
+        return attrs
+
     def validate_password(self, value):
         """Validate WiFi password"""
         if len(value) < 8 or len(value) > 63:
@@ -4,10 +4,18 @@ import os
 import time
 import subprocess
 import logging
-import psutil
 from datetime import datetime
 from django.conf import settings
+from hotspots.hostapd import HostapdControlError, control_for
+from hotspots.interfaces import interface_serving, inventory
 from hotspots.models import Hotspot
+from hotspots.operations import radio_lease
+from hotspots.processes import process_snapshot
+from hotspots.radios import apply_radio, is_bss_serving, multi_bss_enabled, serves_as_bss
+from hotspots.readiness import wait_until_bss, wait_until_running
+from hotspots.rendering import apply_config, config_dir, unit_dir
+from hotspots.subnets import hotspot_network
+from hotspots.systemd import get_systemd_manager, unit_name
 
 logger = logging.getLogger(__name__)
 
@@ -18,29 +26,25 @@ class HotspotControlService:
         settings.BASE_DIR, 'scripts', 'production', 'django_script.sh'
     )
 
+    # Hotspot fields that end up in hostapd's configuration
+    CONFIG_FIELDS = ('ssid', 'password', 'max_users', 'channel', 'interface')
+    # Fields a running hostapd takes over its control socket: field -> hostapd setting.
+    # A restart takes them from the env file, see render_env_file
+    LIVE_SETTINGS = {'ssid': 'ssid', 'password': 'wpa_passphrase', 'max_users': 'max_num_sta'}
+
     # Function to get detailed service status for debugging
     def get_service_status(self, hotspot_id):
         """Get detailed service status for debugging"""
         try:
             # Get systemd status
-            systemd_status = subprocess.run(
-                ['sudo', 'systemctl', 'status', f'hotspot_{hotspot_id}.service'],
-                capture_output=True,
-                text=True
-            ).stdout
+            unit = unit_name(hotspot_id)
+            systemd_status = get_systemd_manager().units([unit])[unit]
             
             # Get process info
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if 'hostapd' in proc.info['name'].lower() or 'dnsmasq' in proc.info['name'].lower():
-                        processes.append({
-                            'pid': proc.info['pid'],
-                            'name': proc.info['name'],
-                            'cmdline': ' '.join(proc.info['cmdline'] or [])
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            processes = [
+                {'pid': info.pid, 'name': info.name, 'cmdline': ' '.join(info.cmdline)}
+                for info in process_snapshot.processes()
+            ]
             
             # Get interface info if available
             hotspot = Hotspot.objects.filter(id=hotspot_id).first()
@@ -78,11 +82,15 @@ class HotspotControlService:
     def _activate_wireless_interfaces(cls):
         """Ensure wireless interfaces are ready for AP mode"""
         try:
-            # Unblock all wireless devices
-            subprocess.run(['sudo', 'rfkill', 'unblock', 'wifi'], check=True)
+            interfaces = inventory.interfaces()
+            # Unblock wireless devices, only when one is blocked
+            if any(inventory.rfkill_blocked(iface) for iface in interfaces):
+                subprocess.run(['sudo', 'rfkill', 'unblock', 'wifi'], check=True)
             
-            # Bring up common wireless interfaces
-            for iface in ['wlo1', 'wlan0', 'wlan1']:
+            # Bring up wireless interfaces that are down
+            for iface in interfaces:
+                if inventory.is_up(iface):
+                    continue
                 try:
                     subprocess.run(
                         ['sudo', 'ip', 'link', 'set', iface, 'up'],
@@ -94,20 +102,76 @@ class HotspotControlService:
         except Exception as e:
             logger.warning(f"Could not activate wireless interfaces: {str(e)}")
 
+    @classmethod
+    def env_file_path(cls, hotspot):
+        return os.path.join(config_dir(), f'hotspot_{hotspot.id}.env')
+
+    @classmethod
+    def render_env_file(cls, hotspot):
+        network = hotspot_network(hotspot)
+        env = f"""# Hotspot-specific overrides
+HOTSPOT_ENV_FILE={cls.env_file_path(hotspot)}
+SSID={hotspot.ssid}
+PASSPHRASE={hotspot.password}
+CHANNEL={hotspot.channel or 6}
+MAX_USERS={hotspot.max_users}
+AP_IP={network['address']}
+NETMASK={network['netmask']}
+DHCP_RANGE_START={network['dhcp_start']}
+DHCP_RANGE_END={network['dhcp_end']}
+"""
+        if hotspot.interface:
+            # The script uses it as given instead of detecting one
+            env += f"INTERFACE={hotspot.interface}\n"
+        return env
+
+    @classmethod
+    def render_systemd_service(cls, hotspot):
+        return f"""[Unit]
+Description=Hotspot Service for {hotspot.ssid}
+After=network.target
+Requires=network.target
+
+[Service]
+Type=simple
+EnvironmentFile={cls.env_file_path(hotspot)}
+ExecStart={cls.HOTSPOT_SCRIPT_PATH} start {hotspot.id}
+ExecStop={cls.HOTSPOT_SCRIPT_PATH} stop {hotspot.id}
+Restart=on-failure
+RestartSec=5s
+TimeoutStartSec=30s
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+    @classmethod
+    def config_files(cls, hotspot):
+        """{kind: (path, content)} of the files the hotspot's unit runs from"""
+        return {
+            'env': (cls.env_file_path(hotspot), cls.render_env_file(hotspot)),
+            'unit': (os.path.join(unit_dir(), unit_name(hotspot.id)), cls.render_systemd_service(hotspot)),
+        }
+
+    @classmethod
+    def prepare_config(cls, hotspot):
+        """
+        Render the env file and systemd unit, writing only what changed.
+
+        Returns a ConfigPlan whose action says whether the running hotspot
+        needs a restart to pick the files up.
+        """
+        return apply_config(cls.config_files(hotspot), [hotspot])
+
     @classmethod
     def generate_env_file(cls, hotspot):
         """Generate only hotspot-specific variables"""
-        config_dir = os.path.join(settings.BASE_DIR, 'tmp/hostapd-prod')
+        config_path = cls.env_file_path(hotspot)
         try:
-            os.makedirs(config_dir, exist_ok=True, mode=0o777)
-            config_path = os.path.join(config_dir, f'hotspot_{hotspot.id}.env')
+            os.makedirs(os.path.dirname(config_path), exist_ok=True, mode=0o777)
             
             with open(config_path, 'w') as f:
-                f.write(f"""# Hotspot-specific overrides
-SSID={hotspot.ssid}
-PASSWORD={hotspot.password}
-CHANNEL={hotspot.channel or 6}
-""")
+                f.write(cls.render_env_file(hotspot))
             os.chmod(config_path, 0o666)  # Make file writable by others
             return config_path
         except Exception as e:
@@ -119,31 +183,19 @@ CHANNEL={hotspot.channel or 6}
         """More robust AP mode verification"""
         try:
             # First check if interface exists
-            if not os.path.exists(f'/sys/class/net/{interface}'):
+            if inventory.operstate(interface) == 'missing':
                 logger.warning(f"Interface {interface} not found in /sys/class/net")
                 return False
 
             # Check rfkill status
-            rfkill_result = subprocess.run(
-                ['sudo', 'rfkill', 'list'],
-                capture_output=True,
-                text=True
-            )
-            if 'blocked: yes' in rfkill_result.stdout:
+            if inventory.rfkill_blocked(interface):
                 logger.info(f"Wireless is blocked, attempting to unblock")
                 subprocess.run(['sudo', 'rfkill', 'unblock', 'wifi'], check=True)
 
-            # Check AP mode support with sudo
-            result = subprocess.run(
-                ['sudo', 'iw', interface, 'info'],
-                capture_output=True,
-                text=True
-            )
-            
-            # Check both supported and current modes
-            if 'AP' not in result.stdout and '* AP' not in result.stdout:
+            # Check AP mode support of the interface's phy (probed once per phy)
+            if not inventory.ap_capable(interface):
                 logger.error(f"Interface {interface} doesn't support AP mode")
-                logger.debug(f"iw info output:\n{result.stdout}")
+                logger.debug(f"Supported modes of {interface}: {inventory.describe(interface)}")
                 return False
                 
             return True
@@ -157,17 +209,12 @@ CHANNEL={hotspot.channel or 6}
         """Enhanced interface validation"""
         try:
             # 1. Check interface exists
-            if not os.path.exists(f'/sys/class/net/{interface}'):
+            if inventory.operstate(interface) == 'missing':
                 logger.warning(f"Interface {interface} not found")
                 return False
 
             # 2. Ensure interface is up
-            link_result = subprocess.run(
-                ['sudo', 'ip', 'link', 'show', interface],
-                capture_output=True,
-                text=True
-            )
-            if 'state DOWN' in link_result.stdout:
+            if not inventory.is_up(interface):
                 logger.info(f"Bringing up interface {interface}")
                 subprocess.run(
                     ['sudo', 'ip', 'link', 'set', interface, 'up'],
@@ -188,34 +235,10 @@ CHANNEL={hotspot.channel or 6}
     def _detect_wireless_interfaces(cls):
         """Detect available wireless interfaces"""
         try:
-            # Get list of wireless interfaces using iw
-            result = subprocess.run(
-                ['iw', 'dev'],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Parse output to find interface names
-            interfaces = []
-            for line in result.stdout.split('\n'):
-                if 'Interface' in line:
-                    interfaces.append(line.split(' ')[1])
-            
-            # Fallback to checking standard wireless interface names
-            if not interfaces:
-                standard_names = ['wlo1', 'wlan0', 'wlan1', 'wlp2s0']
-                for name in standard_names:
-                    if os.path.exists(f'/sys/class/net/{name}'):
-                        interfaces.append(name)
-            
+            # Interfaces with a phy80211 link in sysfs; rescanned only on hotplug
+            interfaces = inventory.interfaces()
             logger.debug(f"Detected wireless interfaces: {interfaces}")
             return interfaces
-            
-        except subprocess.CalledProcessError:
-            logger.warning("'iw dev' command failed, falling back to basic detection")
-            return cls._fallback_detect_interfaces()
         except Exception as e:
             logger.error(f"Interface detection failed: {str(e)}")
             return []
@@ -223,23 +246,8 @@ CHANNEL={hotspot.channel or 6}
     @classmethod
     def _fallback_detect_interfaces(cls):
         """Fallback method for interface detection"""
-        try:
-            # Check for wireless interfaces in /sys/class/net
-            interfaces = []
-            net_path = '/sys/class/net'
-            if os.path.exists(net_path):
-                for iface in os.listdir(net_path):
-                    # Skip loopback and ethernet interfaces
-                    if iface.startswith(('lo', 'eth', 'enp')):
-                        continue
-                    # Check if wireless by looking for wireless subdirectory
-                    wireless_path = os.path.join(net_path, iface, 'wireless')
-                    if os.path.exists(wireless_path):
-                        interfaces.append(iface)
-            return interfaces
-        except Exception as e:
-            logger.error(f"Fallback detection failed: {str(e)}")
-            return []
+        # The inventory also lists interfaces that only have a sysfs wireless directory
+        return cls._detect_wireless_interfaces()
 
     @classmethod
     def generate_systemd_service(cls, hotspot):
@@ -267,23 +275,7 @@ CHANNEL={hotspot.channel or 6}
             env_file = cls.generate_env_file(hotspot)
             
             # 3. Create service file content
-            service_content = f"""[Unit]
-Description=Hotspot Service for {hotspot.ssid}
-After=network.target
-Requires=network.target
-
-[Service]
-Type=simple
-EnvironmentFile={env_file}
-ExecStart={cls.HOTSPOT_SCRIPT_PATH} start {hotspot.id}
-ExecStop={cls.HOTSPOT_SCRIPT_PATH} stop {hotspot.id}
-Restart=on-failure
-RestartSec=5s
-TimeoutStartSec=30s
-
-[Install]
-WantedBy=multi-user.target
-"""
+            service_content = cls.render_systemd_service(hotspot)
 
             # 4. Write directly to target location with sudo
             temp_path = f"/tmp/{service_name}"
@@ -309,10 +301,8 @@ WantedBy=multi-user.target
             )
             
             # 7. Reload systemd
-            subprocess.run(
-                ['sudo', 'systemctl', 'daemon-reload'],
-                check=True
-            )
+            if not get_systemd_manager().daemon_reload():
+                raise Exception("systemd daemon reload failed")
             
             logger.info(f"Successfully created service file at {service_path}")
             return service_path
@@ -336,9 +326,10 @@ WantedBy=multi-user.target
     def execute_hotspot_command(self, action, hotspot_id):
         """Execute hotspot command with enhanced timeout handling"""
         try:
-            self._verify_script()
-            self._activate_wireless_interfaces()
-            
+            hotspot = Hotspot.objects.filter(id=hotspot_id).first()
+            if hotspot and serves_as_bss(hotspot):
+                return self._execute_bss_command(action, hotspot)
+
             # Check if already running before attempting start
             if action == 'start' and self.is_hotspot_running(hotspot_id):
                 return {
@@ -347,6 +338,9 @@ WantedBy=multi-user.target
                     'stderr': '',
                     'already_running': True
                 }
+
+            self._verify_script()
+            self._activate_wireless_interfaces()
             
             # Prepare environment with default values
             env = os.environ.copy()
@@ -369,8 +363,8 @@ WantedBy=multi-user.target
             except subprocess.TimeoutExpired:
                 # For start commands, check if it actually started despite timeout
                 if action == 'start':
-                    time.sleep(5)  # Additional time for startup
-                    if self.is_hotspot_running(hotspot_id):
+                    ready, _ = wait_until_running(hotspot_id, self._interface_of(hotspot_id))
+                    if ready:
                         return {
                             'success': True,
                             'stdout': 'Hotspot started (despite timeout)',
@@ -379,14 +373,17 @@ WantedBy=multi-user.target
                         }
                 raise
             
+            # The process table changed under the last snapshot
+            process_snapshot.invalidate()
+
             # For start commands, verify the service actually started
             if action == 'start':
-                time.sleep(3)  # Brief delay for service initialization
-                if not self.is_hotspot_running(hotspot_id):
+                ready, state = wait_until_running(hotspot_id, self._interface_of(hotspot_id))
+                if not ready:
                     return {
                         'success': False,
                         'stdout': result.stdout,
-                        'stderr': result.stderr + '\nPost-start verification failed',
+                        'stderr': result.stderr + f'\nPost-start verification failed: {state}',
                         'already_running': False
                     }
             
@@ -411,23 +408,116 @@ WantedBy=multi-user.target
                 'stderr': str(e)
             }
 
+    def _execute_bss_command(self, action, hotspot):
+        """Add the hotspot to (or drop it from) its radio's shared hostapd"""
+        stopping = action == 'stop'
+        with radio_lease(hotspot.interface) as acquired:
+            if not acquired:
+                return {'success': False, 'stdout': '', 'stderr': f'another operation is in progress on {hotspot.interface}'}
+            result = apply_radio(
+                hotspot.interface,
+                add=None if stopping else hotspot,
+                remove=hotspot if stopping else None,
+            )
+        if result['success']:
+            done, state = wait_until_bss(hotspot, serving=not stopping)
+            if not done:
+                result.update(success=False, stderr=result['stderr'] + f'\nPost-{action} verification failed: {state}')
+        return result
+
+    def execute_fleet_commands(self, operations, max_concurrency=None, timeout=None, cancel=None, on_result=None):
+        """
+        Run (action, hotspot_id) operations concurrently; see hotspots.executor.FleetExecutor.
+
+        Returns a list of OperationResults; on_result is called with each one
+        as it finishes.
+        """
+        from hotspots.executor import FleetExecutor
+        executor = FleetExecutor(max_concurrency=max_concurrency, timeout=timeout, cancel=cancel)
+        return executor.run(operations, on_result=on_result)
+
+    def apply_config_change(self, hotspot, previous):
+        """
+        Bring a running hotspot in line with edited fields, restarting only when unavoidable.
+
+        previous holds the CONFIG_FIELDS values before the edit. SSID,
+        passphrase and station limit are SET over the control socket and
+        applied with RELOAD, and a channel change is announced with
+        CHAN_SWITCH, so associated clients stay up. A new passphrase is not a
+        security change: stations associated with the old one are not
+        deauthenticated and need the new one the next time they authenticate.
+        A new interface, a switch between open and WPA, or a refused command
+        needs a restart. Returns
+        {'method': 'none' | 'live' | 'reload' | 'restart', 'changed': [...]}.
+        """
+        changed = [field for field in self.CONFIG_FIELDS if getattr(hotspot, field) != previous[field]]
+        if not changed:
+            return {'method': 'none', 'changed': changed}
+
+        if multi_bss_enabled() and (hotspot.interface or previous['interface']):
+            # The radio's hostapd re-reads its file on SIGHUP and only resets BSSes that changed
+            if previous['interface'] and previous['interface'] != hotspot.interface:
+                apply_radio(previous['interface'])
+            if serves_as_bss(hotspot) and hotspot.desired_state == Hotspot.DesiredState.RUNNING:
+                apply_radio(hotspot.interface)
+            return {'method': 'reload', 'changed': changed}
+
+        if not self.is_hotspot_running(hotspot.id):
+            # Rendered afresh by the next start
+            return {'method': 'none', 'changed': changed}
+
+        security_changed = bool(previous['password']) != bool(hotspot.password)
+        if 'interface' not in changed and hotspot.interface and not security_changed:
+            try:
+                self._apply_live(hotspot, changed)
+            except HostapdControlError as e:
+                logger.warning(f"Live update of hotspot {hotspot.id} failed, restarting: {e}")
+                return {'method': 'restart', 'changed': changed}
+            logger.info(f"Applied {changed} to running hotspot {hotspot.id} without restart")
+            # Keep the rendered files and config_hash in step with what hostapd
+            # now runs, so the reconciler does not restart it for stale config.
+            # Until then they stay stale, which is how it finds the restarts.
+            try:
+                self.prepare_config(hotspot)
+            except Exception as e:
+                logger.error(f"Rendering config of hotspot {hotspot.id} failed: {e}")
+            return {'method': 'live', 'changed': changed}
+        return {'method': 'restart', 'changed': changed}
+
+    @classmethod
+    def _apply_live(cls, hotspot, changed):
+        control = control_for(hotspot.interface)
+        for field in changed:
+            if field in cls.LIVE_SETTINGS:
+                control.set(cls.LIVE_SETTINGS[field], getattr(hotspot, field))
+        if 'ssid' in changed or 'password' in changed:
+            if not control.reload():
+                raise HostapdControlError(f"RELOAD refused by {control.path}")
+        if 'channel' in changed:
+            control.chan_switch(hotspot.channel)
+
+    @staticmethod
+    def _interface_of(hotspot_id):
+        return Hotspot.objects.filter(id=hotspot_id).values_list('interface', flat=True).first() or None
+
     def _force_stop_hotspot(self, hotspot_id):
-        """Force stop hotspot by killing processes and resetting interface"""
+        """Force stop hotspot by killing its own processes and resetting interface"""
         try:
-            # Kill any remaining processes
-            subprocess.run(['sudo', 'pkill', '-f', f'hotspot_{hotspot_id}'], timeout=10)
-            subprocess.run(['sudo', 'pkill', '-f', 'hostapd'], timeout=10)
-            subprocess.run(['sudo', 'pkill', '-f', 'dnsmasq'], timeout=10)
-            
+            # Stopping the unit ends every process in its cgroup
+            get_systemd_manager().stop(unit_name(hotspot_id))
+
+            # Then only daemons marked with this hotspot: other hotspots and multi-BSS radios keep theirs
+            process_snapshot.invalidate()
+            leftovers = [str(info.pid) for info in process_snapshot.processes(hotspot_id)]
+            if leftovers:
+                logger.warning(f"Killing leftover processes of hotspot {hotspot_id}: {leftovers}")
+                subprocess.run(['sudo', 'kill', '-9', *leftovers], timeout=10)
+
             # Reset the interface
             hotspot = Hotspot.objects.filter(id=hotspot_id).first()
-            if hotspot and hotspot.interface:
+            if hotspot and hotspot.interface and not serves_as_bss(hotspot):
                 subprocess.run(['sudo', 'ip', 'link', 'set', hotspot.interface, 'down'], timeout=5)
-            
-            # Stop systemd service
-            subprocess.run(['sudo', 'systemctl', 'stop', f'hotspot_{hotspot_id}.service'], timeout=10)
-            
-            time.sleep(1)
+            process_snapshot.invalidate()
         except Exception as e:
             logger.error(f"Force stop failed: {str(e)}")
             
@@ -483,47 +573,31 @@ WantedBy=multi-user.target
     def is_hotspot_running(self, hotspot_id):
         """Comprehensive hotspot status check"""
         try:
+            hotspot = Hotspot.objects.filter(id=hotspot_id).first()
+            if hotspot and serves_as_bss(hotspot):
+                return is_bss_serving(hotspot)
+
             # 1. Check systemd status first
-            status_result = subprocess.run(
-                ['sudo', 'systemctl', 'is-active', f'hotspot_{hotspot_id}.service'],
-                capture_output=True,
-                text=True
-            )
+            unit_state = get_systemd_manager().active_state(unit_name(hotspot_id))
             
             # If systemd says it's active, trust that
-            if status_result.stdout.strip() == 'active':
+            if unit_state == 'active':
                 return True
                 
             # 2. Check for running processes (fallback)
-            hostapd_running = False
-            dnsmasq_running = False
+            hostapd_running = process_snapshot.is_running(hotspot_id, 'hostapd')
+            dnsmasq_running = process_snapshot.is_running(hotspot_id, 'dnsmasq')
             
-            for proc in psutil.process_iter(['name', 'cmdline']):
-                try:
-                    cmdline = ' '.join(proc.info['cmdline'] or [])
-                    if 'hostapd' in proc.info['name'].lower() and f'hotspot_{hotspot_id}' in cmdline:
-                        hostapd_running = True
-                    if 'dnsmasq' in proc.info['name'].lower() and f'hotspot_{hotspot_id}' in cmdline:
-                        dnsmasq_running = True
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            # 3. Check interface state if available
-            hotspot = Hotspot.objects.filter(id=hotspot_id).first()
-            interface_up = True  # Assume true if we can't check
-            if hotspot and hotspot.interface:
-                ifconfig = subprocess.run(
-                    ['sudo', 'ip', 'link', 'show', hotspot.interface],
-                    capture_output=True,
-                    text=True
-                )
-                interface_up = "state UP" in ifconfig.stdout
+            # 3. Check interface state if available (same rule as the fleet status)
+            interface_up = interface_serving(
+                inventory.operstate(hotspot.interface) if hotspot and hotspot.interface else None
+            )
             
             # Consider running if either:
             # - systemd reports active, OR
             # - both processes are running and interface is up
             return (
-                status_result.stdout.strip() == 'active' or 
+                unit_state == 'active' or 
                 (hostapd_running and dnsmasq_running and interface_up)
             )
             
@@ -535,26 +609,17 @@ WantedBy=multi-user.target
         """More accurate service verification"""
         try:
             # First check systemd status
-            status = subprocess.run(
-                ['sudo', 'systemctl', 'is-active', f'hotspot_{hotspot_id}.service'],
-                capture_output=True,
-                text=True
-            )
+            unit_state = get_systemd_manager().active_state(unit_name(hotspot_id))
             
             # Also check for running processes
-            hostapd_running = False
-            dnsmasq_running = False
-            for proc in psutil.process_iter(['name']):
-                if 'hostapd' in proc.info['name'].lower():
-                    hostapd_running = True
-                if 'dnsmasq' in proc.info['name'].lower():
-                    dnsmasq_running = True
+            hostapd_running = process_snapshot.any_running('hostapd')
+            dnsmasq_running = process_snapshot.any_running('dnsmasq')
             
             # Service is considered running if either:
             # 1. Systemd reports it's active, OR
             # 2. Both required processes are running
             return (
-                status.stdout.strip() == 'active' or 
+                unit_state == 'active' or 
                 (hostapd_running and dnsmasq_running)
             )
             
@@ -567,14 +632,9 @@ WantedBy=multi-user.target
         """Check hostapd process with logging"""
         logger.debug(f"Checking process for hotspot {hotspot.id}")
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if 'hostapd' in proc.name().lower():
-                        if any(f'hotspot_{hotspot.id}' in cmd for cmd in proc.cmdline()):
-                            logger.debug(f"Found running process for hotspot {hotspot.id}")
-                            return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            if process_snapshot.is_running(hotspot.id):
+                logger.debug(f"Found running process for hotspot {hotspot.id}")
+                return True
             return False
         except Exception as e:
             logger.error(f"Process check failed: {str(e)}")
@@ -585,14 +645,10 @@ WantedBy=multi-user.target
         """Get PID with logging"""
         logger.debug(f"Getting PID for hotspot {hotspot.id}")
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if 'hostapd' in proc.name().lower():
-                        if any(f'hotspot_{hotspot.id}' in cmd for cmd in proc.cmdline()):
-                            logger.debug(f"Found PID {proc.pid} for hotspot {hotspot.id}")
-                            return proc.pid
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            info = process_snapshot.find(hotspot.id)
+            if info:
+                logger.debug(f"Found PID {info.pid} for hotspot {hotspot.id}")
+                return info.pid
             return None
         except Exception as e:
             logger.error(f"PID lookup failed: {str(e)}")
@@ -0,0 +1,29 @@
+# hotspots/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .authorization import invalidate_hotspot
+from .models import Hotspot, NasClient
+from .radius.nas import reload_registries
+from .reconciler import request_reconcile
+
+@receiver([post_save, post_delete], sender=NasClient)
+def reload_nas_registries(sender, instance, **kwargs):
+    """Rebuild NAS lookups in this process once the change is committed"""
+    transaction.on_commit(reload_registries)
+
+@receiver(pre_save, sender=Hotspot)
+def remember_previous_ssid(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_ssid = Hotspot.objects.filter(pk=instance.pk).values_list('ssid', flat=True).first()
+
+@receiver([post_save, post_delete], sender=Hotspot)
+def invalidate_hotspot_ssid(sender, instance, **kwargs):
+    """Drop cached SSID lookups for the hotspot's old and new SSID"""
+    for ssid in {instance.ssid, getattr(instance, '_previous_ssid', None)} - {None}:
+        invalidate_hotspot(ssid)
+
+@receiver([post_save, post_delete], sender=Hotspot)
+def reconcile_hotspot_change(sender, instance, **kwargs):
+    """Converge after any change to a hotspot; pending runs coalesce"""
+    request_reconcile()
@@ -0,0 +1,125 @@
+# hotspots/subnets.py
+import logging
+import ipaddress
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from .models import SubnetAllocation
+
+logger = logging.getLogger(__name__)
+
+
+class SubnetPoolExhausted(Exception):
+    """Every pool in HOTSPOT_SUBNET_POOLS is fully allocated"""
+
+
+def subnet_pools():
+    return [ipaddress.ip_network(pool) for pool in getattr(settings, 'HOTSPOT_SUBNET_POOLS', ['10.128.0.0/9'])]
+
+
+def subnet_prefixlen():
+    return getattr(settings, 'HOTSPOT_SUBNET_PREFIX', 24)
+
+
+def excluded_networks():
+    return [ipaddress.ip_network(network) for network in getattr(settings, 'HOTSPOT_SUBNET_EXCLUDE', [])]
+
+
+def subnet_at(pool, prefixlen, index):
+    """The index-th subnet of size prefixlen in pool, computed without enumerating the pool"""
+    size = 2 ** (pool.max_prefixlen - prefixlen)
+    return ipaddress.ip_network((int(pool.network_address) + index * size, prefixlen))
+
+
+def _claim_free(hotspot, pools, prefixlen):
+    """Take the lowest free row of the first pool that has one"""
+    for pool in pools:
+        while True:
+            free = SubnetAllocation.objects.filter(
+                pool=str(pool), prefixlen=prefixlen, hotspot__isnull=True
+            ).order_by('index').values_list('id', flat=True).first()
+            if free is None:
+                break
+            # Conditional update: a concurrent allocation of the same row loses and tries the next
+            try:
+                with transaction.atomic():
+                    claimed = SubnetAllocation.objects.filter(id=free, hotspot__isnull=True).update(hotspot=hotspot)
+            except IntegrityError:
+                # The hotspot got a subnet meanwhile
+                return SubnetAllocation.objects.get(hotspot=hotspot)
+            if claimed:
+                return SubnetAllocation.objects.get(id=free)
+    return None
+
+
+def _grow(hotspot, pools, prefixlen):
+    """Add the pool's next subnet, skipping ones that overlap HOTSPOT_SUBNET_EXCLUDE"""
+    excluded = excluded_networks()
+    for pool in pools:
+        if SubnetAllocation.objects.filter(pool=str(pool)).exclude(prefixlen=prefixlen).exists():
+            # Carved with another prefix length; mixing sizes would overlap
+            continue
+        capacity = 2 ** (prefixlen - pool.prefixlen)
+        last = SubnetAllocation.objects.filter(pool=str(pool), prefixlen=prefixlen).aggregate(last=Max('index'))['last']
+        index = 0 if last is None else last + 1
+        while index < capacity:
+            network = subnet_at(pool, prefixlen, index)
+            if any(network.overlaps(other) for other in excluded):
+                index += 1
+                continue
+            try:
+                with transaction.atomic():
+                    return SubnetAllocation.objects.create(
+                        pool=str(pool), prefixlen=prefixlen, index=index, network=str(network), hotspot=hotspot
+                    )
+            except IntegrityError:
+                # Another allocation took this index (or the hotspot got a subnet meanwhile)
+                existing = SubnetAllocation.objects.filter(hotspot=hotspot).first()
+                if existing:
+                    return existing
+                index += 1
+    return None
+
+
+def allocate_subnet(hotspot):
+    """
+    The hotspot's subnet, allocating one on first use.
+
+    Freed subnets are reused lowest index first; only when a pool has none
+    free does it grow by one subnet. Both steps are single index lookups on
+    subnet_free_list / unique_subnet_position, so allocation stays O(log n)
+    however many hotspots there are. Deleting a hotspot frees its subnet.
+    """
+    try:
+        # No query when loaded with select_related('subnet')
+        return hotspot.subnet
+    except SubnetAllocation.DoesNotExist:
+        pass
+    pools, prefixlen = subnet_pools(), subnet_prefixlen()
+    allocation = _claim_free(hotspot, pools, prefixlen) or _grow(hotspot, pools, prefixlen)
+    if allocation is None:
+        raise SubnetPoolExhausted(f"No /{prefixlen} left in {', '.join(str(pool) for pool in pools)}")
+    logger.info(f"Allocated {allocation.network} to hotspot {hotspot.id}")
+    hotspot.subnet = allocation
+    return allocation
+
+
+def release_subnet(hotspot):
+    """Return the hotspot's subnet to the free-list; deleting the hotspot does the same"""
+    released = SubnetAllocation.objects.filter(hotspot=hotspot).update(hotspot=None)
+    hotspot._state.fields_cache.pop('subnet', None)
+    return released
+
+
+def hotspot_network(hotspot):
+    """Gateway address, netmask and DHCP range of the hotspot's allocated subnet"""
+    network = ipaddress.ip_network(allocate_subnet(hotspot).network)
+    hosts = network.num_addresses - 2
+    return {
+        'gateway': f'{network[1]}/{network.prefixlen}',
+        'address': str(network[1]),
+        'netmask': str(network.netmask),
+        # Leave the low addresses for the gateway and static devices
+        'dhcp_start': str(network[10 if hosts > 20 else 2]),
+        'dhcp_end': str(network[-2]),
+    }
@@ -0,0 +1,364 @@
+# hotspots/systemd.py
+import logging
+import subprocess
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+NO_SUCH_UNIT = 'org.freedesktop.systemd1.NoSuchUnit'
+
+UNIT_PROPERTIES = ('Id', 'LoadState', 'ActiveState', 'SubState')
+
+
+class SystemdBusError(Exception):
+    """Error reply from systemd, e.g. NoSuchUnit or AccessDenied"""
+
+    def __init__(self, name, message=''):
+        super().__init__(f"{name}: {message}" if message else name)
+        self.name = name
+
+
+def unit_name(hotspot_id):
+    return f'hotspot_{hotspot_id}.service'
+
+
+def parse_systemctl_show(output):
+    """{unit id: {property: value}} from `systemctl show` output for several units"""
+    units = {}
+    for block in output.strip().split('\n\n'):
+        properties = dict(line.split('=', 1) for line in block.splitlines() if '=' in line)
+        if properties.get('Id'):
+            units[properties['Id']] = properties
+    return units
+
+
+def _unknown(unit):
+    return {'Id': unit, 'LoadState': 'unknown', 'ActiveState': 'unknown', 'SubState': 'unknown'}
+
+
+class SubprocessSystemdManager:
+    """Talks to systemd by running `sudo systemctl`, one process per call"""
+
+    name = 'subprocess'
+
+    def _systemctl(self, *args, sudo=True, timeout=30):
+        command = (['sudo'] if sudo else []) + ['systemctl', *args]
+        return subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+
+    def _run(self, *args):
+        try:
+            result = self._systemctl(*args)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"systemctl {' '.join(args)} failed: {e}")
+            return False
+        if result.returncode != 0:
+            logger.error(f"systemctl {' '.join(args)} failed: {(result.stderr or '').strip()}")
+        return result.returncode == 0
+
+    def start(self, unit):
+        return self._run('start', unit)
+
+    def stop(self, unit):
+        return self._run('stop', unit)
+
+    def restart(self, unit):
+        return self._run('restart', unit)
+
+    def reload(self, unit):
+        return self._run('reload', unit)
+
+    def daemon_reload(self):
+        return self._run('daemon-reload')
+
+    def active_state(self, unit):
+        try:
+            return self._systemctl('is-active', unit).stdout.strip() or 'unknown'
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"systemctl is-active {unit} failed: {e}")
+            return 'unknown'
+
+    def units(self, units):
+        """{unit: properties} for many units from one `systemctl show`"""
+        units = list(units)
+        if not units:
+            return {}
+        try:
+            result = self._systemctl(
+                'show', f"--property={','.join(UNIT_PROPERTIES)}", *units, sudo=False, timeout=10
+            )
+            shown = parse_systemctl_show(result.stdout)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"systemctl show failed: {e}")
+            shown = {}
+        return {unit: shown.get(unit) or _unknown(unit) for unit in units}
+
+    def active_states(self, units):
+        return {unit: properties['ActiveState'] for unit, properties in self.units(units).items()}
+
+    def close(self):
+        pass
+
+
+class JeepneySystemBus:
+    """Blocking connection to the system bus through the optional jeepney package"""
+
+    def __init__(self, timeout=None):
+        from jeepney.io.blocking import open_dbus_connection
+        self.timeout = timeout or getattr(settings, 'SYSTEMD_DBUS_TIMEOUT', 10)
+        self._connection = open_dbus_connection(bus='SYSTEM')
+        self._lock = threading.Lock()
+
+    def call(self, path, interface, member, signature='', body=()):
+        from jeepney.wrappers import DBusAddress, DBusErrorResponse, new_method_call, unwrap_msg
+        message = new_method_call(
+            DBusAddress(path, bus_name=SYSTEMD_BUS_NAME, interface=interface), member, signature or None, tuple(body)
+        )
+        # The connection is not thread-safe; calls are short, so serialise them
+        with self._lock:
+            reply = self._connection.send_and_get_reply(message, timeout=self.timeout)
+        try:
+            return unwrap_msg(reply)
+        except DBusErrorResponse as e:
+            raise SystemdBusError(e.name, ' '.join(str(part) for part in e.data)) from e
+
+    def close(self):
+        self._connection.close()
+
+
+class DBusSystemdManager:
+    """
+    Talks to the systemd manager over one persistent D-Bus connection.
+
+    Each call is a method call on an open socket instead of a sudo +
+    systemctl process and a fresh systemd connection. Needs jeepney and a
+    polkit rule letting the Django user manage hotspot_*.service units.
+    When the bus cannot be reached the call goes through
+    SubprocessSystemdManager instead and the connection is retried on the
+    next call; without jeepney installed every call goes there, after one
+    warning per process.
+    """
+
+    name = 'dbus'
+
+    def __init__(self, bus=None, fallback=None):
+        self._bus = bus
+        self._static = bus is not None
+        self._bus_lock = threading.Lock()
+        self.fallback = fallback or SubprocessSystemdManager()
+        self.stats = {'bus_calls': 0, 'fallbacks': 0}
+        self._no_jeepney = False
+
+    def _get_bus(self):
+        with self._bus_lock:
+            if self._bus is None:
+                self._bus = JeepneySystemBus()
+                logger.info("Connected to systemd over D-Bus")
+            return self._bus
+
+    def _drop_bus(self):
+        if self._static:
+            return
+        with self._bus_lock:
+            bus, self._bus = self._bus, None
+        if bus is not None:
+            try:
+                bus.close()
+            except OSError:
+                pass
+
+    def _call(self, operation, fallback, *args):
+        if self._no_jeepney:
+            self.stats['fallbacks'] += 1
+            return getattr(self.fallback, fallback)(*args)
+        try:
+            result = operation(self._get_bus(), *args)
+        except SystemdBusError:
+            raise
+        except ImportError as e:
+            # Not coming back without a restart; stop retrying the import on every call
+            logger.warning(f"jeepney is not installed ({e}), managing units with systemctl")
+            self._no_jeepney = True
+            self.stats['fallbacks'] += 1
+            return getattr(self.fallback, fallback)(*args)
+        except Exception as e:
+            # A missing bus socket or a dropped connection
+            logger.warning(f"systemd D-Bus call failed ({e!r}), using systemctl")
+            self._drop_bus()
+            self.stats['fallbacks'] += 1
+            return getattr(self.fallback, fallback)(*args)
+        self.stats['bus_calls'] += 1
+        return result
+
+    def _job(self, member, fallback, unit):
+        def call(bus, unit):
+            bus.call(SYSTEMD_PATH, MANAGER_INTERFACE, member, 'ss', (unit, 'replace'))
+            return True
+        try:
+            return self._call(call, fallback, unit)
+        except SystemdBusError as e:
+            logger.error(f"systemd {member} {unit} failed: {e}")
+            return False
+
+    def start(self, unit):
+        return self._job('StartUnit', 'start', unit)
+
+    def stop(self, unit):
+        return self._job('StopUnit', 'stop', unit)
+
+    def restart(self, unit):
+        return self._job('RestartUnit', 'restart', unit)
+
+    def reload(self, unit):
+        return self._job('ReloadUnit', 'reload', unit)
+
+    def daemon_reload(self):
+        def call(bus):
+            bus.call(SYSTEMD_PATH, MANAGER_INTERFACE, 'Reload')
+            return True
+        try:
+            return self._call(call, 'daemon_reload')
+        except SystemdBusError as e:
+            logger.error(f"systemd daemon reload failed: {e}")
+            return False
+
+    def active_state(self, unit):
+        def call(bus, unit):
+            try:
+                (path,) = bus.call(SYSTEMD_PATH, MANAGER_INTERFACE, 'GetUnit', 's', (unit,))
+            except SystemdBusError as e:
+                if e.name == NO_SUCH_UNIT:
+                    # Not loaded, which is what `systemctl is-active` reports as inactive
+                    return 'inactive'
+                raise
+            (variant,) = bus.call(path, PROPERTIES_INTERFACE, 'Get', 'ss', (UNIT_INTERFACE, 'ActiveState'))
+            return variant[1]
+        try:
+            return self._call(call, 'active_state', unit)
+        except SystemdBusError as e:
+            logger.error(f"systemd state of {unit} unavailable: {e}")
+            return 'unknown'
+
+    def units(self, units):
+        """{unit: properties} for many units from one ListUnitsByNames call"""
+        def call(bus, units):
+            (rows,) = bus.call(SYSTEMD_PATH, MANAGER_INTERFACE, 'ListUnitsByNames', 'as', (units,))
+            found = {
+                row[0]: {'Id': row[0], 'LoadState': row[2], 'ActiveState': row[3], 'SubState': row[4]}
+                for row in rows
+            }
+            return {unit: found.get(unit) or _unknown(unit) for unit in units}
+        units = list(units)
+        if not units:
+            return {}
+        try:
+            return self._call(call, 'units', units)
+        except SystemdBusError as e:
+            logger.error(f"systemd unit listing failed: {e}")
+            return {unit: _unknown(unit) for unit in units}
+
+    def active_states(self, units):
+        return {unit: properties['ActiveState'] for unit, properties in self.units(units).items()}
+
+    def close(self):
+        self._drop_bus()
+
+
+class FakeSystemdBus:
+    """
+    In-memory stand-in for the systemd manager on D-Bus.
+
+    Understands the calls DBusSystemdManager makes, so tests and benchmarks
+    run without systemd. Units must be added (or started once) to exist;
+    start_states lets a unit come up 'failed' instead of 'active'.
+    """
+
+    def __init__(self, units=None, start_states=None):
+        self.units = {}
+        self.start_states = dict(start_states or {})
+        self.calls = []
+        self.daemon_reloads = 0
+        for unit, state in (units or {}).items():
+            self.add_unit(unit, state)
+
+    def add_unit(self, unit, state='inactive'):
+        self.units[unit] = {'LoadState': 'loaded', 'ActiveState': state, 'SubState': 'running' if state == 'active' else 'dead'}
+
+    def _path(self, unit):
+        return f"{SYSTEMD_PATH}/unit/{unit.replace('.', '_2e')}"
+
+    def _unit(self, unit):
+        if unit not in self.units:
+            raise SystemdBusError(NO_SUCH_UNIT, f"Unit {unit} not loaded.")
+        return self.units[unit]
+
+    def _set_state(self, unit, state):
+        self._unit(unit).update(ActiveState=state, SubState='running' if state == 'active' else 'dead')
+
+    def call(self, path, interface, member, signature='', body=()):
+        self.calls.append((member, tuple(body)))
+        if interface == PROPERTIES_INTERFACE and member == 'Get':
+            unit = next(name for name in self.units if self._path(name) == path)
+            return (('s', self.units[unit][body[1]]),)
+        if member in ('StartUnit', 'RestartUnit'):
+            self._set_state(body[0], self.start_states.get(body[0], 'active'))
+        elif member == 'StopUnit':
+            self._set_state(body[0], 'inactive')
+        elif member == 'ReloadUnit':
+            if self._unit(body[0])['ActiveState'] != 'active':
+                raise SystemdBusError('org.freedesktop.systemd1.UnitInactive', f"Unit {body[0]} is not active.")
+        elif member == 'Reload':
+            self.daemon_reloads += 1
+            return ()
+        elif member == 'GetUnit':
+            self._unit(body[0])
+            return (self._path(body[0]),)
+        elif member == 'ListUnitsByNames':
+            return ([
+                (unit, '', *(self.units[unit][key] for key in ('LoadState', 'ActiveState', 'SubState')),
+                 '', self._path(unit), 0, '', '/')
+                for unit in body[0] if unit in self.units
+            ],)
+        else:
+            raise SystemdBusError('org.freedesktop.DBus.Error.UnknownMethod', member)
+        return (f"{SYSTEMD_PATH}/job/{len(self.calls)}",)
+
+    def close(self):
+        pass
+
+
+class FakeSystemdManager(DBusSystemdManager):
+    """DBusSystemdManager on a FakeSystemdBus, for development hosts without systemd"""
+
+    name = 'fake'
+
+    def __init__(self, bus=None, fallback=None):
+        super().__init__(bus=bus or FakeSystemdBus(), fallback=fallback)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_systemd_manager():
+    """The process-wide manager named by SYSTEMD_MANAGER_BACKEND"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            backend = getattr(settings, 'SYSTEMD_MANAGER_BACKEND', 'hotspots.systemd.DBusSystemdManager')
+            _manager = import_string(backend)()
+        return _manager
+
+
+def reset_systemd_manager():
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.close()
@@ -1,8 +1,11 @@
-import os
 from celery import shared_task
+from django.conf import settings
 from .models import Hotspot
+from .operations import acquire_lease, is_superseded, lease_seconds, release_lease
 from .services import HotspotControlService
-import time
+from .radios import serves_as_bss
+from .readiness import wait_until_bss, wait_until_running, wait_until_stopped
+import math
 import logging
 from datetime import datetime
 import traceback
@@ -20,6 +23,39 @@ logger = logging.getLogger(__name__)
     retry_jitter=True
 )
 def control_hotspot_async(self, hotspot_id, action):
+    """
+    Run action on the hotspot unless a later operation superseded it.
+
+    Operations on one hotspot never overlap: while another holds the
+    hotspot's lease this task is retried after
+    HOTSPOT_OPERATION_RETRY_DELAY seconds, and by then it may have been
+    superseded too (see hotspots/operations.py). A lease outlives any
+    operation, so once the task has waited a whole lease it gives up.
+    """
+    task_id = self.request.id
+    if task_id and is_superseded(hotspot_id, task_id):
+        logger.info(f"[Task:{task_id}] {action} for hotspot:{hotspot_id} superseded, skipping")
+        return {'success': False, 'superseded': True, 'hotspot_id': hotspot_id, 'action': action, 'task_id': task_id}
+
+    owner = task_id or f'local-{action}'
+    if not acquire_lease(hotspot_id, owner):
+        delay = getattr(settings, 'HOTSPOT_OPERATION_RETRY_DELAY', 5)
+        max_busy_retries = math.ceil(lease_seconds() / delay)
+        if self.request.retries >= max_busy_retries:
+            error_msg = f"Hotspot {hotspot_id} still busy after {max_busy_retries} retries over {lease_seconds()}s"
+            logger.error(f"[Task:{task_id}] {action} for hotspot:{hotspot_id} given up: {error_msg}")
+            # Not queued any more, so the next request for this action sends a new task
+            Hotspot.objects.filter(id=hotspot_id, current_task_id=task_id).update(current_task_queued_at=None)
+            return {'success': False, 'error': error_msg, 'hotspot_id': hotspot_id, 'action': action, 'task_id': task_id}
+        logger.info(f"[Task:{task_id}] hotspot:{hotspot_id} busy with another operation, retrying")
+        raise self.retry(countdown=delay, max_retries=max_busy_retries)
+    try:
+        return _control_hotspot(self, hotspot_id, action)
+    finally:
+        release_lease(hotspot_id, owner)
+
+
+def _control_hotspot(self, hotspot_id, action):
     """Enhanced async task with robust timeout handling and detailed diagnostics"""
     task_id = self.request.id
     start_time = datetime.now()
@@ -38,33 +74,33 @@ def control_hotspot_async(self, hotspot_id, action):
             extra={'ssid': hotspot.ssid, 'interface': hotspot.interface}
         )
         
+        # The request is the new desired state, so a reconcile run agrees with it
+        desired = Hotspot.DesiredState.STOPPED if action == 'stop' else Hotspot.DesiredState.RUNNING
+        if not hotspot.set_desired_state(desired):
+            raise Exception(f"A running hotspot already uses SSID {hotspot.ssid}")
+
         service = HotspotControlService()
+        # Multi-BSS: the hotspot is one SSID of its radio's shared hostapd
+        as_bss = serves_as_bss(hotspot)
         
-        # Generate config files for start/restart operations
-        if action in ['start', 'restart']:
-            logger.info("Generating configuration files...")
+        # Render config files for start/restart; unchanged files are not touched
+        command = action
+        if action in ['start', 'restart'] and not as_bss:
             try:
-                env_path = service.generate_env_file(hotspot)
-                service_path = service.generate_systemd_service(hotspot)
-                logger.debug(
-                    "Config files generated",
-                    extra={'env_path': env_path, 'service_path': service_path}
-                )
-                
-                # Verify service file exists
-                if not os.path.exists(service_path):
-                    logger.warning("Service file missing, regenerating...")
-                    service_path = service.generate_systemd_service(hotspot)
-                    if not os.path.exists(service_path):
-                        raise Exception(f"Service file creation failed at {service_path}")
+                plan = service.prepare_config(hotspot)
             except Exception as e:
                 logger.error("Config generation failed", exc_info=True)
                 raise Exception(f"Config generation failed: {str(e)}")
+            logger.info(f"Config {plan.digest[:12]}: changed {list(plan.changed) or 'nothing'}, needs {plan.action}")
+
+            # A running hotspot only picks up new files when restarted
+            if action == 'start' and plan.action != 'none' and service.is_hotspot_running(hotspot_id):
+                command = 'restart'
 
         # Execute command with enhanced monitoring
-        logger.info(f"Executing {action} command...")
+        logger.info(f"Executing {command} command...")
         try:
-            result = service.execute_hotspot_command(action, hotspot_id)
+            result = service.execute_hotspot_command(command, hotspot_id)
             logger.debug(
                 "Command execution result",
                 extra={'success': result.get('success'), 'timed_out': result.get('timed_out')}
@@ -79,10 +115,8 @@ def control_hotspot_async(self, hotspot_id, action):
                 "Command timed out, verifying hotspot status...",
                 extra={'timeout': True}
             )
-            time.sleep(5)  # Additional time for service initialization
-            
             # Check if service actually started despite timeout
-            is_running = service.is_hotspot_running(hotspot_id)
+            is_running, _ = wait_until_running(hotspot_id, hotspot.interface or None)
             if is_running:
                 logger.info(
                     "Hotspot started despite timeout",
@@ -115,47 +149,44 @@ def control_hotspot_async(self, hotspot_id, action):
         if action in ['start', 'restart']:
             logger.info("Performing post-start verification...")
             
-            # Verification with progressive backoff
-            max_attempts = 5
-            running = False
-            for attempt in range(max_attempts):
-                running = service.is_hotspot_running(hotspot_id)
-                if running:
-                    break
-                
-                wait_time = (attempt + 1) * 3  # 3, 6, 9, 12, 15s
-                logger.debug(
-                    f"Verification attempt {attempt+1}/{max_attempts}",
-                    extra={'wait_seconds': wait_time}
-                )
-                time.sleep(wait_time)
+            # Returns as soon as the unit, interface and hostapd control socket are up
+            if as_bss:
+                running, state = wait_until_bss(hotspot)
+            else:
+                running, state = wait_until_running(hotspot_id, hotspot.interface or None)
 
             if not running:
                 service_status = service.get_service_status(hotspot_id)
                 logger.error(
                     "Hotspot not running after start",
-                    extra={'service_status': service_status}
+                    extra={'service_status': service_status, 'readiness': state}
                 )
                 raise Exception(f"Hotspot not running after {action}. Service status: {service_status}")
             
             # Update hotspot status
             hotspot.is_active = True
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
             logger.info("Hotspot status updated to active")
 
         elif action == 'stop':
             # Verify stop was successful
-            time.sleep(2)  # Brief delay for shutdown
-            if service.is_hotspot_running(hotspot_id):
+            if as_bss:
+                stopped, state = wait_until_bss(hotspot, serving=False)
+                if not stopped:
+                    raise Exception(f"{hotspot.ssid} still served by {hotspot.interface}: {state}")
+            else:
+                stopped, _ = wait_until_stopped(hotspot_id)
+            if not stopped:
                 logger.warning("Hotspot still running, forcing stop...")
                 service._force_stop_hotspot(hotspot_id)
                 
-                if service.is_hotspot_running(hotspot_id):
-                    raise Exception("Failed to stop hotspot after force stop")
+                stopped, state = wait_until_stopped(hotspot_id)
+                if not stopped:
+                    raise Exception(f"Failed to stop hotspot after force stop: {state}")
             
             # Update hotspot status
             hotspot.is_active = False
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
             logger.info("Hotspot status updated to inactive")
 
         duration = (datetime.now() - start_time).total_seconds()
@@ -202,7 +233,7 @@ def control_hotspot_async(self, hotspot_id, action):
                 actual_status = service.is_hotspot_running(hotspot_id) if 'service' in locals() else None
                 if actual_status is not None:
                     hotspot.is_active = actual_status
-                    hotspot.save()
+                    hotspot.save(update_fields=['is_active', 'updated_at'])
                     logger.info(
                         "Updated hotspot status based on actual state",
                         extra={'is_active': actual_status}
@@ -221,4 +252,18 @@ def control_hotspot_async(self, hotspot_id, action):
             'task_id': task_id,
             'duration_seconds': duration,
             'traceback': traceback.format_exc()
-        }
\ No newline at end of file
+        }
+
+@shared_task(name='hotspots.disconnect_ineligible_sessions', ignore_result=True)
+def disconnect_ineligible_sessions_task():
+    """Periodic RFC 5176 disconnect of users who lost eligibility (CELERY_BEAT_SCHEDULE)"""
+    from hotspots.radius.disconnect import disconnect_ineligible_sessions
+    return disconnect_ineligible_sessions()
+
+@shared_task(name='hotspots.reconcile', ignore_result=True)
+def reconcile_hotspots_task():
+    """Converge hotspots to their desired_state (CELERY_BEAT_SCHEDULE and request_reconcile)"""
+    from hotspots.reconciler import reconcile, reconciler_enabled
+    if not reconciler_enabled():
+        return None
+    return reconcile()
@@ -12,6 +12,13 @@ def location(db):
         longitude=36.0
     )
 
+@pytest.fixture
+def hotspot_factory(db, reseller_user, location):
+    """Creates reseller hotspots at location: hotspot_factory(ssid, **fields)"""
+    def make(ssid, **kwargs):
+        return Hotspot.objects.create(owner=reseller_user, location=location, ssid=ssid, **kwargs)
+    return make
+
 @pytest.fixture
 def admin_hotspot(db, admin_user, location):
     return Hotspot.objects.create(
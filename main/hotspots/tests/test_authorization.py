@@ -0,0 +1,170 @@
+# hotspots/tests/test_authorization.py
+import pytest
+from unittest.mock import patch
+from django.db import IntegrityError, transaction
+from pyrad.packet import AccessReject
+from accounts.enums import UserType
+from hotspots.authorization import (
+    FORBIDDEN, GRANTED, INVALID_CREDENTIALS, UNKNOWN_HOTSPOT, authorize, authorize_many, resolve_hotspot
+)
+from hotspots.models import Hotspot
+from hotspots.radius.auth import radius_authenticate
+from hotspots.checks import shared_ssid_cache_check
+from tests.conftest_base import create_user
+
+
+@pytest.mark.django_db
+def test_customer_of_owning_reseller_is_granted(customer_user, reseller_hotspot):
+    result = authorize('customer', 'testpass123', 'ResellerNet')
+    assert result.status == GRANTED
+    assert result.user == customer_user
+    assert result.hotspot.owner_id == reseller_hotspot.owner_id
+
+
+@pytest.mark.django_db
+def test_decisions(customer_user, admin_user, admin_hotspot, reseller_hotspot):
+    assert authorize('customer', 'testpass123', 'AdminNet').status == FORBIDDEN
+    assert authorize('reseller', 'testpass123', 'AdminNet').status == FORBIDDEN
+    assert authorize('reseller', 'testpass123', 'ResellerNet').status == GRANTED
+    assert authorize('admin', 'testpass123', 'ResellerNet').status == GRANTED
+    assert authorize('customer', 'wrongpass', 'ResellerNet').status == INVALID_CREDENTIALS
+    assert authorize('nobody', 'testpass123', 'ResellerNet').status == INVALID_CREDENTIALS
+    assert authorize('customer', 'testpass123', 'NoSuchNet').status == UNKNOWN_HOTSPOT
+
+
+@pytest.mark.django_db
+def test_one_query_per_decision(customer_user, reseller_hotspot, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert authorize('customer', 'testpass123', 'ResellerNet').status == GRANTED
+    # Now served from the SSID cache, still a single user query
+    with django_assert_num_queries(1):
+        assert authorize('customer', 'testpass123', 'ResellerNet').status == GRANTED
+
+
+@pytest.mark.django_db
+def test_ssid_cache_follows_hotspot_changes(customer_user, reseller_hotspot):
+    assert resolve_hotspot('ResellerNet').id == reseller_hotspot.id
+
+    reseller_hotspot.ssid = 'RenamedNet'
+    reseller_hotspot.save()
+    assert resolve_hotspot('ResellerNet') is None
+    assert authorize('customer', 'testpass123', 'RenamedNet').status == GRANTED
+
+    reseller_hotspot.is_active = False
+    reseller_hotspot.save()
+    assert authorize('customer', 'testpass123', 'RenamedNet').status == UNKNOWN_HOTSPOT
+
+
+def test_process_local_cache_fails_the_ssid_cache_check(settings):
+    assert [warning.id for warning in shared_ssid_cache_check(None)] == ['hotspots.W001']
+    settings.HOTSPOT_SSID_CACHE_TTL = 0
+    assert shared_ssid_cache_check(None) == []
+
+
+@pytest.mark.django_db
+def test_running_ssid_is_unique(reseller_hotspot, admin_user, location):
+    Hotspot.objects.create(
+        owner=admin_user, location=location, ssid='ResellerNet', desired_state=Hotspot.DesiredState.STOPPED
+    )
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Hotspot.objects.create(owner=admin_user, location=location, ssid='ResellerNet')
+
+
+@pytest.mark.django_db
+def test_radius_applies_hotspot_rules_with_ssid(reseller_hotspot, admin_hotspot):
+    # Resellers pass the subscription check through their own hotspots only
+    create_user('owner2', password='ownerpass1', user_type=UserType.RESELLER)
+    assert radius_authenticate('reseller', 'testpass123', 'AdminNet') == AccessReject
+    assert radius_authenticate('owner2', 'ownerpass1', 'ResellerNet') == AccessReject
+
+
+@pytest.mark.django_db
+def test_endpoint_uses_authorization(api_client, customer_user, reseller_hotspot, admin_hotspot, capsys):
+    api_client.force_authenticate(user=customer_user)
+    url = '/api/hotspot-auth/authenticate/'
+
+    response = api_client.post(url, {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'ResellerNet'})
+    assert response.status_code == 200
+    assert response.data['status'] == 'access_granted'
+    assert (response.data['hotspot'], response.data['user']) == ('ResellerNet', 'customer')
+    assert api_client.post(url, {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'AdminNet'}).status_code == 403
+    assert api_client.post(url, {'username': 'customer', 'password': 'badpass', 'hotspot_ssid': 'ResellerNet'}).status_code == 401
+    assert api_client.post(url, {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'Missing'}).status_code == 404
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.django_db
+def test_authorize_many_matches_authorize(customer_user, admin_user, reseller_hotspot, admin_hotspot):
+    items = [
+        ('customer', 'testpass123', 'ResellerNet'),
+        ('customer', 'testpass123', 'AdminNet'),
+        ('customer', 'badpass', 'ResellerNet'),
+        ('nobody', 'testpass123', 'ResellerNet'),
+        ('admin', 'testpass123', 'Missing'),
+        ('customer', 'testpass123', 'ResellerNet'),
+    ]
+    expected = [authorize(*item).status for item in items]
+    assert [decision.status for decision in authorize_many(items)] == expected
+
+
+@pytest.mark.django_db
+def test_authorize_many_deduplicates_work(customer_user, reseller_hotspot, django_assert_num_queries):
+    items = [('customer', 'testpass123', 'ResellerNet')] * 50 + [('customer', 'badpass', 'ResellerNet')] * 50
+    with patch('hotspots.authorization.get_password_verifier') as get_verifier:
+        get_verifier.return_value.verify.side_effect = lambda password, encoded: password == 'testpass123'
+        # One hotspot query (not yet cached) and one user query for the whole batch
+        with django_assert_num_queries(2):
+            decisions = authorize_many(items)
+    assert get_verifier.return_value.verify.call_count == 2
+    assert [d.status for d in decisions] == [GRANTED] * 50 + [INVALID_CREDENTIALS] * 50
+
+
+@pytest.mark.django_db
+def test_batch_endpoint_returns_decisions_in_order(api_client, customer_user, reseller_hotspot):
+    api_client.force_authenticate(user=customer_user)
+    response = api_client.post('/api/hotspot-auth/authenticate/batch/', {'requests': [
+        {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'ResellerNet'},
+        {'username': 'customer', 'password': 'wrongpass', 'hotspot_ssid': 'ResellerNet'},
+        {'username': 'customer', 'hotspot_ssid': 'ResellerNet'},
+        {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'Missing'},
+    ]}, format='json')
+
+    assert response.status_code == 200
+    assert [item['code'] for item in response.data['results']] == [200, 401, 400, 404]
+    assert response.data['results'][0]['status'] == 'access_granted'
+    assert api_client.post('/api/hotspot-auth/authenticate/batch/', {'requests': 'nope'}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_batch_endpoint_rate_limits_items(api_client, customer_user, reseller_hotspot, reset_login_rate_limiter):
+    reset_login_rate_limiter.limits['username'] = (2, 0.001)
+    api_client.force_authenticate(user=customer_user)
+    attempt = {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'ResellerNet'}
+    response = api_client.post('/api/hotspot-auth/authenticate/batch/', {'requests': [attempt] * 3}, format='json')
+    assert [item['code'] for item in response.data['results']] == [200, 200, 429]
+
+
+@pytest.mark.django_db
+def test_non_string_mac_is_a_bad_request(api_client, customer_user):
+    api_client.force_authenticate(user=customer_user)
+    payload = {'username': 'a', 'password': 'b', 'hotspot_ssid': 'ResellerNet', 'mac_address': ['AA']}
+    assert api_client.post('/api/hotspot-auth/authenticate/', payload, format='json').status_code == 400
+
+    response = api_client.post('/api/hotspot-auth/authenticate/batch/', {'requests': [payload]}, format='json')
+    assert response.status_code == 200
+    assert response.data['results'][0]['code'] == 400
+
+
+@pytest.mark.django_db
+def test_unhashable_batch_fields_are_refused_per_item(api_client, customer_user, reseller_hotspot):
+    api_client.force_authenticate(user=customer_user)
+    response = api_client.post('/api/hotspot-auth/authenticate/batch/', {'requests': [
+        {'username': ['customer'], 'password': 'testpass123', 'hotspot_ssid': 'ResellerNet'},
+        {'username': 'customer', 'password': {'a': 1}, 'hotspot_ssid': 'ResellerNet'},
+        {'username': 'customer', 'password': 'testpass123', 'hotspot_ssid': 'ResellerNet'},
+    ]}, format='json')
+
+    assert response.status_code == 200
+    assert [item['code'] for item in response.data['results']] == [400, 400, 200]
+    with pytest.raises(ValueError):
+        authorize_many([(['customer'], 'testpass123', 'ResellerNet')])
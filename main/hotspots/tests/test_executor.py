@@ -0,0 +1,142 @@
+# hotspots/tests/test_executor.py
+import json
+import threading
+import time
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.core.management import call_command
+from hotspots.executor import FleetExecutor
+from hotspots.models import Hotspot
+from hotspots.operations import acquire_lease
+from hotspots.tasks import control_hotspot_async
+from hotspots.rendering import ConfigPlan
+from hotspots.services import HotspotControlService
+from hotspots.systemd import unit_name
+
+STOPPED = Hotspot.DesiredState.STOPPED
+
+
+@pytest.fixture
+def fleet(db, reseller_user, location):
+    """Hotspots whose systemctl calls run the given shell snippets instead"""
+    scripts = {}
+
+    def command(action, unit):
+        return ['sh', '-c', scripts.get(unit, 'echo {action} done').format(action=action)]
+
+    with patch('hotspots.executor.systemctl_command', side_effect=command), \
+            patch.object(HotspotControlService, 'prepare_config', return_value=ConfigPlan('d', (), 'none')), \
+            patch('hotspots.executor.collect_fleet_status') as observe:
+        def make(count, script=None):
+            hotspots = [
+                Hotspot.objects.create(owner=reseller_user, location=location, ssid=f'Fleet{index}')
+                for index in range(count)
+            ]
+            for hotspot in hotspots:
+                if script:
+                    scripts[unit_name(hotspot.id)] = script
+            return hotspots
+        make.scripts = scripts
+        make.observe = observe
+        yield make
+
+
+def test_runs_concurrently_and_streams_results(fleet):
+    hotspots = fleet(4, 'sleep 0.3; echo {action} ok')
+    fleet.scripts[unit_name(hotspots[0].id)] = 'echo quick'
+    streamed = []
+
+    began = time.monotonic()
+    results = FleetExecutor(max_concurrency=3).run(
+        [('restart', hotspot.id) for hotspot in hotspots], on_result=streamed.append
+    )
+    elapsed = time.monotonic() - began
+
+    assert results == streamed
+    assert results[0].hotspot_id == hotspots[0].id and results[0].stdout == 'quick\n'
+    assert all(result.success and result.returncode == 0 for result in results)
+    assert results[1].stdout == 'restart ok\n'
+    # Three slots: the quick command frees one early, so the three sleeps overlap
+    assert elapsed < 0.9
+    fleet.observe.assert_called_once()
+
+
+def test_slow_command_is_killed(fleet):
+    hotspot, = fleet(1, 'sleep 5')
+    result, = FleetExecutor(timeout=0.3).run([('start', hotspot.id)])
+    assert result.timed_out and not result.success
+    assert result.duration < 2
+
+
+def test_failure_exit_status(fleet):
+    hotspot, = fleet(1, 'echo no such unit >&2; exit 5')
+    result, = FleetExecutor().run([('stop', hotspot.id)])
+    assert (result.success, result.returncode, result.stderr) == (False, 5, 'no such unit\n')
+    assert Hotspot.objects.get(id=hotspot.id).desired_state == STOPPED
+
+
+def test_cancel_skips_queued_commands(fleet):
+    hotspots = fleet(3, 'sleep 0.2')
+    cancel = threading.Event()
+    results = FleetExecutor(max_concurrency=1, cancel=cancel).run(
+        [('start', hotspot.id) for hotspot in hotspots], on_result=lambda result: cancel.set()
+    )
+    assert results[0].success
+    assert [result.cancelled for result in results[1:]] == [True, True]
+
+
+def test_batch_is_checked_before_running(fleet):
+    free, busy = fleet(2)
+    acquire_lease(busy.id, 'task-a')
+    results = FleetExecutor().run([('start', free.id), ('stop', free.id), ('start', busy.id), ('start', 999)])
+
+    by_id = {result.hotspot_id: result for result in results}
+    # The last action given for a hotspot wins
+    assert by_id[free.id].action == 'stop' and by_id[free.id].stdout == 'stop done\n'
+    assert 'in progress' in by_id[busy.id].stderr
+    assert 'not found' in by_id[999].stderr
+    assert len(results) == 3
+    # The batch's own leases are released afterwards
+    assert acquire_lease(free.id, 'task-b')
+
+    with pytest.raises(ValueError):
+        FleetExecutor().run([('reboot', free.id)])
+
+
+def test_batch_and_control_tasks_exclude_each_other(fleet):
+    hotspot, = fleet(1)
+    Hotspot.objects.filter(id=hotspot.id).update(current_task_id='worker-task')
+    seen = []
+
+    def running_task(task, hotspot_id, action):
+        # Nothing but the database is shared with the worker
+        cache.clear()
+        seen.extend(FleetExecutor().run([('restart', hotspot_id)]))
+        return {'success': True}
+
+    with patch('hotspots.tasks._control_hotspot', side_effect=running_task):
+        control_hotspot_async.apply((hotspot.id, 'start'), task_id='worker-task').get()
+    assert 'in progress' in seen[0].stderr
+
+    # And a task that arrives during the batch waits for it
+    def arriving_task(action, unit):
+        with patch.object(control_hotspot_async, 'retry', side_effect=Retry()) as retry:
+            control_hotspot_async.apply((hotspot.id, 'stop'), task_id='worker-task')
+        seen.append(retry.call_count)
+        return ['true']
+
+    with patch('hotspots.executor.systemctl_command', side_effect=arriving_task):
+        assert FleetExecutor().run([('restart', hotspot.id)])[0].success
+    assert seen[1] == 1
+
+
+def test_command_streams_json_lines(fleet):
+    hotspots = fleet(2)
+    out = StringIO()
+    call_command('hotspot_control', 'restart', '--ids', str(hotspots[0].id), str(hotspots[1].id), stdout=out)
+    lines = out.getvalue().splitlines()
+    assert {json.loads(line)['hotspot_id'] for line in lines[:2]} == {hotspot.id for hotspot in hotspots}
+    assert 'succeeded for 2 hotspots' in lines[2]
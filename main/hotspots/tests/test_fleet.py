@@ -0,0 +1,97 @@
+# hotspots/tests/test_fleet.py
+import subprocess
+import pytest
+from unittest.mock import patch
+from hotspots.authorization import resolve_hotspot
+from hotspots.fleet import collect_fleet_status
+from hotspots.systemd import parse_systemctl_show
+from hotspots.models import Hotspot
+from hotspots.processes import ProcessSnapshot
+from hotspots.services import HotspotControlService
+from hotspots.tests.test_processes import add_process
+
+
+def systemctl_show(states):
+    blocks = [
+        f"Id={unit}\nLoadState=loaded\nActiveState={state}\nSubState=running" for unit, state in states.items()
+    ]
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout='\n\n'.join(blocks) + '\n', stderr='')
+
+
+@pytest.fixture
+def fleet(hotspot_factory):
+    return [
+        hotspot_factory('UnitNet', is_active=False),
+        hotspot_factory('ProcNet', interface='wlan1', is_active=False),
+        hotspot_factory('DownNet', interface='wlan2'),
+        hotspot_factory('IdleNet'),
+    ]
+
+
+@pytest.fixture
+def host(tmp_path, fleet):
+    proc = tmp_path / 'proc'
+    proc.mkdir()
+    for hotspot in fleet[1:3]:
+        add_process(proc, hotspot.id * 10, 'hostapd', 'hostapd', f'/etc/hostapd/hotspot_{hotspot.id}.conf')
+        add_process(proc, hotspot.id * 10 + 1, 'dnsmasq', 'dnsmasq', f'--conf-file=hotspot_{hotspot.id}.conf')
+    sysfs = tmp_path / 'net'
+    for name, state in (('wlan1', 'up'), ('wlan2', 'down')):
+        (sysfs / name).mkdir(parents=True)
+        (sysfs / name / 'operstate').write_text(f"{state}\n")
+
+    states = {f'hotspot_{hotspot.id}.service': 'inactive' for hotspot in fleet}
+    states[f'hotspot_{fleet[0].id}.service'] = 'active'
+    with patch('hotspots.systemd.subprocess.run', return_value=systemctl_show(states)) as run, \
+            patch('hotspots.fleet.process_snapshot', ProcessSnapshot(proc_root=str(proc), max_age=60)), \
+            patch('hotspots.fleet.SYSFS_NET_ROOT', str(sysfs)):
+        yield run
+
+
+def test_parse_systemctl_show():
+    output = "Id=a.service\nActiveState=active\n\nId=b.service\nActiveState=failed\n"
+    assert parse_systemctl_show(output) == {
+        'a.service': {'Id': 'a.service', 'ActiveState': 'active'},
+        'b.service': {'Id': 'b.service', 'ActiveState': 'failed'},
+    }
+
+
+def test_fleet_status_checks_everything_in_one_batch(fleet, host, django_assert_num_queries):
+    run = host
+    resolve_hotspot('DownNet')
+
+    # Hotspot select, then one bulk UPDATE
+    with django_assert_num_queries(2):
+        statuses = collect_fleet_status(Hotspot.objects.order_by('id'))
+
+    assert run.call_count == 1
+    assert [entry['is_running'] for entry in statuses] == [True, True, False, False]
+    assert statuses[1]['interface_state'] == 'up'
+    assert statuses[2]['interface_state'] == 'down'
+    assert statuses[2]['hostapd_running'] and statuses[2]['dnsmasq_running']
+    assert list(Hotspot.objects.order_by('id').values_list('is_active', flat=True)) == [True, True, False, False]
+    # The reconciled hotspot is no longer served from the SSID cache
+    assert resolve_hotspot('DownNet') is None
+
+
+def test_fleet_status_endpoint(db, api_client, reseller_user, admin_user, fleet, host):
+    api_client.force_authenticate(user=reseller_user)
+    response = api_client.get('/api/hotspots/status/')
+
+    assert response.status_code == 200
+    assert response.data['total'] == 4
+    assert response.data['running'] == 2
+    assert [entry['ssid'] for entry in response.data['hotspots']] == ['UnitNet', 'ProcNet', 'DownNet', 'IdleNet']
+
+
+@pytest.mark.parametrize('operstate, running', [('up', True), ('unknown', True), ('down', False)])
+def test_fleet_and_hotspot_status_agree_on_the_interface(fleet, host, tmp_path, operstate, running):
+    proc_net = fleet[1]
+    (tmp_path / 'net' / 'wlan1' / 'operstate').write_text(f"{operstate}\n")
+    snapshot = ProcessSnapshot(proc_root=str(tmp_path / 'proc'), max_age=60)
+
+    statuses = collect_fleet_status([proc_net], reconcile=False)
+    with patch('hotspots.services.process_snapshot', snapshot), \
+            patch('hotspots.services.inventory.operstate', return_value=operstate):
+        single = HotspotControlService().is_hotspot_running(proc_net.id)
+    assert statuses[0]['is_running'] is single is running
@@ -0,0 +1,305 @@
+# hotspots/tests/test_hostapd.py
+import os
+import re
+import socket
+import tempfile
+import threading
+import pytest
+from unittest.mock import patch
+from django.test import override_settings
+from hotspots.hostapd import (
+    HostapdControl, HostapdControlError, channel_frequency, close_controls, control_for, find_interface,
+)
+from hotspots.services import HotspotControlService
+
+STATIONS = {
+    '02:00:00:00:00:01': {'rx_bytes': 1200, 'tx_bytes': 3400, 'connected_time': 60},
+    '02:00:00:00:00:02': {'rx_bytes': 10, 'tx_bytes': 20, 'connected_time': 5},
+}
+
+
+class FakeHostapd(threading.Thread):
+    """Answers control-interface commands on a unix datagram socket like hostapd"""
+
+    def __init__(self, path, bsses=(('wlan0', 'CafeNet'),), stations=STATIONS):
+        super().__init__(daemon=True)
+        self.bsses = bsses
+        self.stations = dict(stations)
+        self.commands = []
+        # Command names answered with FAIL, e.g. {'CHAN_SWITCH'}
+        self.refuse = set()
+        self.clients = set()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.settimeout(0.05)
+        self.path = path
+        self.stopped = threading.Event()
+
+    def _station(self, address):
+        if address not in self.stations:
+            return 'FAIL\n'
+        counters = ''.join(f'{key}={value}\n' for key, value in self.stations[address].items())
+        return f'{address}\n{counters}'
+
+    def reply(self, command):
+        addresses = list(self.stations)
+        if command == 'PING':
+            return 'PONG\n'
+        if command.split(' ')[0] in self.refuse:
+            return 'FAIL\n'
+        if command == 'RELOAD' or command.startswith(('SET ', 'CHAN_SWITCH ')):
+            return 'OK\n'
+        if command == 'STATUS':
+            lines = ['state=ENABLED', 'channel=6']
+            for index, (ifname, ssid) in enumerate(self.bsses):
+                count = len(self.stations) if index == 0 else 0
+                lines += [f'bss[{index}]={ifname}', f'ssid[{index}]={ssid}', f'num_sta[{index}]={count}']
+            return '\n'.join(lines) + '\n'
+        if command == 'STA-FIRST':
+            return self._station(addresses[0]) if addresses else ''
+        if command.startswith('STA-NEXT '):
+            position = addresses.index(command.split()[1]) + 1
+            return self._station(addresses[position]) if position < len(addresses) else ''
+        if command.startswith('STA '):
+            return self._station(command.split()[1])
+        return 'UNKNOWN COMMAND\n'
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                data, address = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            command = data.decode()
+            self.commands.append(command)
+            self.clients.add(address)
+            self.sock.sendto(self.reply(command).encode(), address)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sock.close()
+        os.unlink(self.path)
+
+
+@pytest.fixture
+def server():
+    path = os.path.join(tempfile.mkdtemp(dir='/tmp'), 'wlan0')
+    fake = FakeHostapd(path)
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+def test_status_and_station_count(server):
+    control = HostapdControl(server.path)
+    status = control.status()
+    assert status['state'] == 'ENABLED'
+    assert status['channel'] == 6
+    assert control.bss_status() == [{'ifname': 'wlan0', 'ssid': 'CafeNet', 'num_sta': 2}]
+    assert control.station_count() == 2
+    assert control.station_count(ssid='OtherNet') == 0
+    control.close()
+
+
+def test_numeric_ssid_stays_text():
+    path = os.path.join(tempfile.mkdtemp(dir='/tmp'), 'wlan0')
+    fake = FakeHostapd(path, bsses=(('wlan0', '12345'), ('wlan0_1', '007')))
+    fake.start()
+    try:
+        control = HostapdControl(path)
+        assert [bss['ssid'] for bss in control.bss_status()] == ['12345', '007']
+        assert control.station_count(ssid='12345') == 2
+        assert control.status()['num_sta[0]'] == 2
+        control.close()
+    finally:
+        fake.stop()
+
+
+def test_stations_walk_with_counters(server):
+    control = HostapdControl(server.path)
+    stations = control.stations()
+    assert [station['address'] for station in stations] == list(STATIONS)
+    assert stations[0]['rx_bytes'] == 1200
+    assert control.station('02:00:00:00:00:02')['connected_time'] == 5
+    assert control.station('02:00:00:00:00:99') is None
+    assert server.commands == [
+        'STA-FIRST', 'STA-NEXT 02:00:00:00:00:01', 'STA-NEXT 02:00:00:00:00:02',
+        'STA 02:00:00:00:00:02', 'STA 02:00:00:00:00:99',
+    ]
+    control.close()
+
+
+def test_connection_is_reused(server):
+    control = HostapdControl(server.path)
+    assert control.ping()
+    assert control.reload()
+    control.station_count()
+    # Every command came from the same bound client socket
+    assert len(server.clients) == 1
+    control.close()
+
+
+def test_reconnects_after_hostapd_restart(server):
+    control = HostapdControl(server.path)
+    assert control.ping()
+    server.stop()
+    restarted = FakeHostapd(server.path)
+    restarted.start()
+    assert control.ping()
+    assert restarted.commands == ['PING']
+    control.close()
+    restarted.stop()
+    # Leave a file for the fixture's teardown to remove
+    open(server.path, 'w').close()
+
+
+def test_missing_socket_raises():
+    control = HostapdControl('/tmp/no-such-hostapd-socket')
+    assert control.ping() is False
+    with pytest.raises(HostapdControlError):
+        control.status()
+
+
+def test_hotspot_counts_clients_over_control_socket(server, admin_hotspot):
+    admin_hotspot.interface = 'wlan0'
+    admin_hotspot.ssid = 'CafeNet'
+    with override_settings(HOSTAPD_CTRL_DIR=os.path.dirname(server.path)):
+        try:
+            assert control_for('wlan0').path == server.path
+            assert admin_hotspot.get_connected_clients() == 2
+            assert len(admin_hotspot.get_station_stats()) == 2
+        finally:
+            close_controls()
+
+
+def test_blank_interface_is_found_from_script_config_or_control_dir(server, admin_hotspot, tmp_path):
+    # Rows created before the interface field: the start script picked the interface
+    admin_hotspot.interface = ''
+    admin_hotspot.ssid = 'CafeNet'
+    with override_settings(HOSTAPD_CTRL_DIR=os.path.dirname(server.path), HOSTAPD_SCRIPT_CONFIG_DIR=str(tmp_path)):
+        try:
+            assert admin_hotspot.get_connected_clients() == 2
+            assert len(admin_hotspot.get_station_stats()) == 2
+            assert find_interface(admin_hotspot.id, 'OtherNet') is None
+
+            (tmp_path / f'hotspot_{admin_hotspot.id}.hostapd.conf').write_text('interface=wlan7\ndriver=nl80211\n')
+            assert find_interface(admin_hotspot.id, 'CafeNet') == 'wlan7'
+        finally:
+            close_controls()
+
+
+def test_set_and_channel_switch(server):
+    control = HostapdControl(server.path)
+    control.set('ssid', 'NewName')
+    control.chan_switch(11)
+    assert server.commands == ['SET ssid NewName', 'CHAN_SWITCH 5 2462']
+    assert [channel_frequency(channel) for channel in (1, 14, 36)] == [2412, 2484, 5180]
+
+    server.refuse.add('SET')
+    with pytest.raises(HostapdControlError) as error:
+        control.set('wpa_passphrase', 'secret-pass')
+    assert 'SET wpa_passphrase' in str(error.value) and 'secret-pass' not in str(error.value)
+    control.close()
+
+
+@pytest.fixture
+def running(server, admin_hotspot, settings):
+    settings.HOSTAPD_CTRL_DIR = os.path.dirname(server.path)
+    admin_hotspot.interface = 'wlan0'
+    admin_hotspot.save()
+    with patch.object(HotspotControlService, 'is_hotspot_running', return_value=True), \
+            patch.object(HotspotControlService, 'prepare_config') as prepare:
+        yield admin_hotspot, prepare
+    close_controls()
+
+
+def edit(hotspot, **fields):
+    previous = {field: getattr(hotspot, field) for field in HotspotControlService.CONFIG_FIELDS}
+    for field, value in fields.items():
+        setattr(hotspot, field, value)
+    return HotspotControlService().apply_config_change(hotspot, previous)
+
+
+def test_config_change_applied_live(server, running):
+    hotspot, prepare = running
+    result = edit(hotspot, ssid='Renamed', password='another-pass', max_users=30, channel=11)
+    assert result == {'method': 'live', 'changed': ['ssid', 'password', 'max_users', 'channel']}
+    assert server.commands == [
+        'SET ssid Renamed', 'SET wpa_passphrase another-pass', 'SET max_num_sta 30', 'RELOAD',
+        'CHAN_SWITCH 5 2462',
+    ]
+    prepare.assert_called_once_with(hotspot)
+
+
+def restart_hostapd_conf(hotspot):
+    """hostapd settings django_script.sh writes from the hotspot's rendered env file"""
+    env = dict(
+        line.split('=', 1) for line in HotspotControlService.render_env_file(hotspot).splitlines()
+        if '=' in line and not line.startswith('#')
+    )
+    with open(HotspotControlService.HOTSPOT_SCRIPT_PATH) as f:
+        template = f.read().split('cat <<EOF > "$HOSTAPD_CONF"\n', 1)[1].split('\nEOF\n', 1)[0]
+    conf = re.sub(
+        r'\$\{(\w+)(?::-([^}]*))?\}|\$(\w+)',
+        lambda m: env.get(m.group(1) or m.group(3), m.group(2) or ''),
+        template,
+    )
+    return dict(line.split('=', 1) for line in conf.splitlines() if '=' in line and not line.startswith('#'))
+
+
+def test_restart_applies_what_is_set_live(server, running):
+    hotspot, _ = running
+    edit(hotspot, ssid='Renamed', password='another-pass', max_users=30)
+    live = dict(command.split(' ', 2)[1:] for command in server.commands if command.startswith('SET '))
+    assert set(live) == set(HotspotControlService.LIVE_SETTINGS.values())
+    conf = restart_hostapd_conf(hotspot)
+    assert {setting: conf[setting] for setting in live} == live
+
+
+def test_config_change_falls_back_to_restart(server, running):
+    hotspot, prepare = running
+    server.refuse.add('CHAN_SWITCH')
+    assert edit(hotspot, channel=1)['method'] == 'restart'
+    # Interface-level changes never go over the socket
+    assert edit(hotspot, interface='wlan1')['method'] == 'restart'
+    assert edit(hotspot, password='')['method'] == 'restart'
+    assert server.commands == ['CHAN_SWITCH 5 2412']
+    # The stale config_hash is what tells the reconciler to restart
+    prepare.assert_not_called()
+
+
+def test_config_change_of_stopped_hotspot_waits_for_start(admin_hotspot):
+    with patch.object(HotspotControlService, 'is_hotspot_running', return_value=False), \
+            patch.object(HotspotControlService, 'prepare_config') as prepare:
+        assert edit(admin_hotspot, ssid='Later') == {'method': 'none', 'changed': ['ssid']}
+        assert edit(admin_hotspot) == {'method': 'none', 'changed': []}
+    prepare.assert_not_called()
+
+
+def test_update_restarts_only_when_needed(db, api_client, admin_user, admin_hotspot):
+    api_client.force_authenticate(user=admin_user)
+    url = f'/api/hotspots/{admin_hotspot.id}/'
+    with patch('hotspots.views.HotspotControlService.apply_config_change') as apply, \
+            patch('hotspots.views.enqueue_operation', return_value='task-1') as enqueue:
+        apply.return_value = {'method': 'live', 'changed': ['ssid']}
+        response = api_client.patch(url, {'ssid': 'LiveName'})
+        assert response.data['config_change']['method'] == 'live'
+        enqueue.assert_not_called()
+
+        apply.return_value = {'method': 'restart', 'changed': ['interface']}
+        response = api_client.patch(url, {'interface': 'wlan1'})
+    assert response.data['config_change'] == {'method': 'restart', 'changed': ['interface'], 'task_id': 'task-1'}
+    assert enqueue.call_args.args[0].id == admin_hotspot.id and enqueue.call_args.args[1] == 'restart'
+    assert apply.call_args.args[1]['interface'] != 'wlan1'
+
+
+def test_update_leaves_restart_to_the_reconciler(db, api_client, admin_user, admin_hotspot, settings):
+    settings.HOTSPOT_RECONCILER_ENABLED = True
+    api_client.force_authenticate(user=admin_user)
+    with patch('hotspots.views.HotspotControlService.apply_config_change') as apply, \
+            patch('hotspots.views.enqueue_operation') as enqueue:
+        apply.return_value = {'method': 'restart', 'changed': ['interface']}
+        response = api_client.patch(f'/api/hotspots/{admin_hotspot.id}/', {'interface': 'wlan1'})
+    assert response.data['config_change'] == {'method': 'restart', 'changed': ['interface']}
+    enqueue.assert_not_called()
@@ -0,0 +1,92 @@
+# hotspots/tests/test_interfaces.py
+import os
+import pytest
+from unittest.mock import patch
+from hotspots.interfaces import InterfaceInventory, parse_interface_modes
+from hotspots.services import HotspotControlService
+
+IW_PHY = """Wiphy phy0
+	Supported interface modes:
+		 * IBSS
+		 * managed
+		 * AP
+		 * monitor
+	Band 1:
+	valid interface combinations:
+		 * #{ managed } <= 1, #{ AP } <= 1
+"""
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    def add(name, phy=None, operstate='down', flags='0x1002', blocked='0'):
+        write(str(tmp_path / 'class' / 'net' / name / 'operstate'), f'{operstate}\n')
+        write(str(tmp_path / 'class' / 'net' / name / 'flags'), f'{flags}\n')
+        if phy:
+            phy_dir = tmp_path / 'class' / 'ieee80211' / phy
+            write(str(phy_dir / 'index'), phy[-1])
+            write(str(phy_dir / 'macaddress'), '02:00:00:00:00:01')
+            write(str(phy_dir / 'rfkill0' / 'soft'), blocked)
+            write(str(phy_dir / 'rfkill0' / 'hard'), '0')
+            os.symlink(phy_dir, tmp_path / 'class' / 'net' / name / 'phy80211')
+            write(str(phy_dir / 'name'), phy)
+    add.root = str(tmp_path)
+    return add
+
+
+def test_parse_supported_modes_only():
+    assert parse_interface_modes(IW_PHY) == {'IBSS', 'managed', 'AP', 'monitor'}
+
+
+def test_inventory_rescans_only_on_hotplug(sysfs):
+    sysfs('lo', operstate='unknown', flags='0x9')
+    sysfs('eth0', operstate='up')
+    sysfs('wlan0', phy='phy0')
+    probes = []
+    inventory = InterfaceInventory(sysfs.root, probe=lambda phy: probes.append(phy) or parse_interface_modes(IW_PHY))
+
+    assert inventory.interfaces() == ['wlan0']
+    assert inventory.ap_capable('wlan0') and not inventory.ap_capable('eth0')
+    for _ in range(5):
+        inventory.interfaces()
+        inventory.ap_capable('wlan0')
+    assert (inventory.scans, probes) == (1, ['phy0'])
+
+    # A dongle appears: one rescan, one probe of its phy
+    sysfs('wlan1', phy='phy1')
+    assert inventory.interfaces() == ['wlan0', 'wlan1']
+    assert inventory.ap_capable('wlan1')
+    assert (inventory.scans, probes) == (2, ['phy0', 'phy1'])
+
+
+def test_live_state_read_from_sysfs(sysfs):
+    sysfs('wlan0', phy='phy0', operstate='down', flags='0x1002', blocked='1')
+    inventory = InterfaceInventory(sysfs.root, probe=lambda phy: set())
+    state = inventory.describe('wlan0')
+    assert (state.operstate, state.is_up, state.rfkill_blocked, state.ap_capable) == ('down', False, True, False)
+    assert inventory.operstate('wlan9') == 'missing'
+
+
+def test_failed_probe_is_retried(sysfs):
+    sysfs('wlan0', phy='phy0')
+    answers = [None, {'AP'}]
+    inventory = InterfaceInventory(sysfs.root, probe=lambda phy: answers.pop(0))
+    assert not inventory.ap_capable('wlan0')
+    assert inventory.ap_capable('wlan0')
+    assert inventory.ap_capable('wlan0') and inventory.probes == 2
+
+
+def test_preflight_spawns_nothing_when_ready(sysfs):
+    sysfs('wlan0', phy='phy0', operstate='up', flags='0x1003')
+    inventory = InterfaceInventory(sysfs.root, probe=lambda phy: {'AP'})
+    with patch('hotspots.services.inventory', inventory), patch('hotspots.services.subprocess.run') as run:
+        HotspotControlService._activate_wireless_interfaces()
+        assert HotspotControlService._validate_interface_for_ap('wlan0')
+        assert HotspotControlService._detect_wireless_interfaces() == ['wlan0']
+    run.assert_not_called()
@@ -0,0 +1,158 @@
+# hotspots/tests/test_operations.py
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.utils import timezone
+from hotspots.models import Hotspot, OperationLease
+from hotspots.operations import acquire_lease, enqueue_operation, is_superseded, release_lease
+from hotspots.reconciler import Action, _execute
+from hotspots.tasks import control_hotspot_async
+
+
+@pytest.fixture
+def sent():
+    with patch.object(control_hotspot_async, 'apply_async') as apply_async:
+        yield apply_async
+
+
+def test_latest_request_supersedes_queued_ones(sent, admin_hotspot):
+    start = enqueue_operation(admin_hotspot, 'start')
+    stop = enqueue_operation(admin_hotspot, 'stop')
+    final = enqueue_operation(admin_hotspot, 'start')
+
+    assert len({start, stop, final}) == 3
+    assert Hotspot.objects.get(id=admin_hotspot.id).current_task_id == final
+    assert [is_superseded(admin_hotspot.id, task_id) for task_id in (start, stop, final)] == [True, True, False]
+    assert [call.kwargs['task_id'] for call in sent.call_args_list] == [start, stop, final]
+
+
+def test_repeated_request_joins_queued_operation(sent, admin_hotspot):
+    first = enqueue_operation(admin_hotspot, 'restart')
+    assert enqueue_operation(admin_hotspot, 'restart') == first
+    assert sent.call_count == 1
+
+    # Once it runs, a repeat is a new operation
+    assert acquire_lease(admin_hotspot.id, first)
+    assert enqueue_operation(admin_hotspot, 'restart') != first
+    release_lease(admin_hotspot.id, first)
+
+
+def test_lost_task_does_not_swallow_repeats(sent, admin_hotspot):
+    first = enqueue_operation(admin_hotspot, 'start')
+    # Never picked up by a worker
+    Hotspot.objects.filter(id=admin_hotspot.id).update(current_task_queued_at=timezone.now() - timedelta(hours=1))
+    assert enqueue_operation(admin_hotspot, 'start') != first
+    assert sent.call_count == 2
+
+
+def test_pending_state_is_read_from_the_database(sent, admin_hotspot):
+    first = enqueue_operation(admin_hotspot, 'start')
+    # What a worker process does when the task starts: no shared memory with this one
+    assert acquire_lease(admin_hotspot.id, first)
+    release_lease(admin_hotspot.id, first)
+    cache.clear()
+    assert enqueue_operation(admin_hotspot, 'start') != first
+
+
+def test_lease_excludes_other_operations(db):
+    assert acquire_lease(7, 'task-a')
+    assert not acquire_lease(7, 'task-b')
+    release_lease(7, 'task-b')
+    assert not acquire_lease(7, 'task-b')
+    release_lease(7, 'task-a')
+    assert acquire_lease(7, 'task-b')
+
+
+def test_lease_is_shared_and_expires(db):
+    assert acquire_lease(7, 'worker-1')
+    # Nothing is kept in process memory or the local cache
+    cache.clear()
+    assert not acquire_lease(7, 'worker-2')
+    assert OperationLease.objects.get(key='hotspot_op_lease_7').owner == 'worker-1'
+
+    # A killed worker's lease runs out
+    OperationLease.objects.filter(key='hotspot_op_lease_7').update(expires_at=timezone.now() - timedelta(seconds=1))
+    assert acquire_lease(7, 'worker-2')
+
+
+def test_superseded_task_does_nothing(admin_hotspot):
+    Hotspot.objects.filter(id=admin_hotspot.id).update(current_task_id='newer')
+    with patch('hotspots.tasks._control_hotspot') as run:
+        result = control_hotspot_async.apply((admin_hotspot.id, 'stop'), task_id='older').get()
+    assert result['superseded']
+    run.assert_not_called()
+    # The lease was never taken
+    assert acquire_lease(admin_hotspot.id, 'other')
+
+
+def test_stop_queued_during_start_still_runs(sent, admin_hotspot):
+    start = enqueue_operation(admin_hotspot, 'start')
+    queued = {}
+
+    def run_start(command, hotspot_id):
+        # The user stops the hotspot while its start is still running
+        queued['stop'] = enqueue_operation(Hotspot.objects.get(id=hotspot_id), 'stop')
+        return {'success': True}
+
+    with patch('hotspots.tasks.HotspotControlService') as service, \
+            patch('hotspots.tasks.serves_as_bss', return_value=False), \
+            patch('hotspots.tasks.wait_until_running', return_value=(True, {})):
+        service.return_value.prepare_config.return_value.action = 'none'
+        service.return_value.execute_hotspot_command.side_effect = run_start
+        assert control_hotspot_async.apply((admin_hotspot.id, 'start'), task_id=start).get()['success']
+
+    hotspot = Hotspot.objects.get(id=admin_hotspot.id)
+    assert hotspot.is_active
+    # Finishing the start left the queued stop in place
+    assert hotspot.current_task_id == queued['stop'] and hotspot.current_action == 'stop'
+    with patch('hotspots.tasks._control_hotspot', return_value={'success': True}) as run:
+        result = control_hotspot_async.apply((admin_hotspot.id, 'stop'), task_id=queued['stop']).get()
+    assert result == {'success': True}
+    run.assert_called_once()
+
+
+def test_busy_hotspot_retries_task(admin_hotspot):
+    Hotspot.objects.filter(id=admin_hotspot.id).update(current_task_id='queued')
+    acquire_lease(admin_hotspot.id, 'running')
+    with patch('hotspots.tasks._control_hotspot') as run, \
+            patch.object(control_hotspot_async, 'retry', side_effect=Retry()) as retry:
+        control_hotspot_async.apply((admin_hotspot.id, 'start'), task_id='queued')
+    retry.assert_called_once()
+    run.assert_not_called()
+
+    release_lease(admin_hotspot.id, 'running')
+    with patch('hotspots.tasks._control_hotspot', return_value={'success': True}) as run:
+        assert control_hotspot_async.apply((admin_hotspot.id, 'start'), task_id='queued').get() == {'success': True}
+    run.assert_called_once()
+    # Released again for the next operation
+    assert acquire_lease(admin_hotspot.id, 'next')
+
+
+def test_busy_hotspot_retries_are_capped_by_the_lease(admin_hotspot, settings):
+    settings.HOTSPOT_OPERATION_LEASE = 20
+    settings.HOTSPOT_OPERATION_RETRY_DELAY = 5
+    Hotspot.objects.filter(id=admin_hotspot.id).update(current_task_id='queued', current_task_queued_at=timezone.now())
+    acquire_lease(admin_hotspot.id, 'stuck')
+
+    with patch.object(control_hotspot_async, 'retry', side_effect=Retry()) as retry:
+        control_hotspot_async.apply((admin_hotspot.id, 'start'), task_id='queued', retries=3)
+    assert retry.call_args.kwargs['max_retries'] == 4
+
+    with patch('hotspots.tasks._control_hotspot') as run, \
+            patch.object(control_hotspot_async, 'retry') as retry:
+        result = control_hotspot_async.apply((admin_hotspot.id, 'start'), task_id='queued', retries=4).get()
+    assert not result['success'] and 'still busy after 4 retries' in result['error']
+    retry.assert_not_called()
+    run.assert_not_called()
+    # The given-up task no longer absorbs repeats of its action
+    assert Hotspot.objects.get(id=admin_hotspot.id).current_task_queued_at is None
+
+
+def test_reconciler_skips_hotspot_under_operation(admin_hotspot):
+    acquire_lease(admin_hotspot.id, 'task-a')
+    with patch('hotspots.reconciler.HotspotControlService') as service:
+        result = _execute(Action('start', admin_hotspot.id, None, [admin_hotspot]))
+    assert not result['success'] and 'in progress' in result['stderr']
+    service.assert_not_called()
@@ -0,0 +1,66 @@
+# hotspots/tests/test_processes.py
+import pytest
+from hotspots.processes import ProcessSnapshot
+
+
+def add_process(root, pid, comm, *args):
+    directory = root / str(pid)
+    directory.mkdir()
+    (directory / 'comm').write_text(f"{comm}\n")
+    (directory / 'cmdline').write_bytes(b'\0'.join(arg.encode() for arg in args) + b'\0')
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    add_process(tmp_path, 1, 'systemd', '/sbin/init')
+    add_process(tmp_path, 101, 'hostapd', '/usr/sbin/hostapd', '/etc/hostapd/hotspot_1.conf')
+    add_process(tmp_path, 102, 'dnsmasq', '/usr/sbin/dnsmasq', '--conf-file=/etc/dnsmasq.d/hotspot_1.conf')
+    add_process(tmp_path, 110, 'hostapd', '/usr/sbin/hostapd', '/etc/hostapd/hotspot_10.conf')
+    add_process(tmp_path, 200, 'dnsmasq', '/usr/sbin/dnsmasq', '--keep-in-foreground')
+    (tmp_path / 'self').mkdir()
+    return tmp_path
+
+
+def test_processes_are_indexed_by_hotspot_marker(proc_root):
+    snapshot = ProcessSnapshot(proc_root=str(proc_root), max_age=60)
+
+    assert snapshot.find(1).pid == 101
+    assert snapshot.find(1, 'dnsmasq').pid == 102
+    assert [info.pid for info in snapshot.processes(1)] == [101, 102]
+    # hotspot_1 must not match hotspot_10
+    assert [info.pid for info in snapshot.processes(10)] == [110]
+    assert not snapshot.is_running(10, 'dnsmasq')
+    assert snapshot.find(2) is None
+    assert sorted(info.pid for info in snapshot.processes()) == [101, 102, 110, 200]
+    assert snapshot.running_hotspots() == {1: {'hostapd', 'dnsmasq'}, 10: {'hostapd'}}
+    assert snapshot.scans == 1
+
+
+def test_snapshot_is_reused_until_stale_or_invalidated(proc_root):
+    snapshot = ProcessSnapshot(proc_root=str(proc_root), max_age=60)
+    assert snapshot.is_running(1)
+
+    for path in (proc_root / '101').iterdir():
+        path.unlink()
+    (proc_root / '101').rmdir()
+    assert snapshot.is_running(1)
+    assert snapshot.scans == 1
+
+    snapshot.invalidate()
+    assert not snapshot.is_running(1)
+    assert snapshot.any_running('dnsmasq')
+    assert snapshot.scans == 2
+
+
+def test_only_daemon_executables_count(tmp_path):
+    add_process(tmp_path, 5, 'hostapd_cli', '/usr/sbin/hostapd_cli', '-p', '/var/run/hostapd/hotspot_5')
+    add_process(tmp_path, 6, 'hostapd-mana', '/usr/bin/hostapd-mana', '/etc/hostapd/hotspot_5.conf')
+    add_process(tmp_path, 7, 'dnsmasq-helper', '/usr/lib/dnsmasq-helper', 'hotspot_5')
+    add_process(tmp_path, 8, 'hostapd_cli_wra', '/usr/local/bin/hostapd_cli_wrapper', 'hotspot_5')
+    snapshot = ProcessSnapshot(proc_root=str(tmp_path), max_age=60)
+    assert snapshot.processes() == []
+    assert not snapshot.is_running(5) and snapshot.processes(5) == []
+
+    add_process(tmp_path, 9, 'hostapd', '/usr/sbin/hostapd', '/etc/hostapd/hotspot_5.conf')
+    snapshot.invalidate()
+    assert [info.pid for info in snapshot.processes(5)] == [9]
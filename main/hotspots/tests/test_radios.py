@@ -0,0 +1,108 @@
+# hotspots/tests/test_radios.py
+import pytest
+from unittest.mock import patch
+from hotspots import radios
+from hotspots.fleet import collect_fleet_status
+from hotspots.models import Hotspot
+from hotspots.services import HotspotControlService
+from hotspots.systemd import FakeSystemdBus, FakeSystemdManager
+
+RUNNING, STOPPED = Hotspot.DesiredState.RUNNING, Hotspot.DesiredState.STOPPED
+
+
+@pytest.fixture
+def radio(settings, tmp_path, hotspot_factory):
+    settings.HOTSPOT_MULTI_BSS = True
+    settings.HOTSPOT_CONFIG_DIR = str(tmp_path)
+
+    def make(ssid, interface='wlan0', **kwargs):
+        return hotspot_factory(ssid, interface=interface, **kwargs)
+    return make
+
+
+@pytest.fixture
+def systemd(settings, tmp_path):
+    settings.SYSTEMD_UNIT_DIR = str(tmp_path / 'units')
+    bus = FakeSystemdBus(units={radios.radio_unit_name('wlan0'): 'inactive'})
+    manager = FakeSystemdManager(bus=bus)
+    with patch('hotspots.radios.get_systemd_manager', return_value=manager), \
+            patch('hotspots.rendering.get_systemd_manager', return_value=manager):
+        yield bus
+
+
+def test_render_radio_config(radio):
+    lobby = radio('Lobby', password='lobbypass1', channel=11, max_users=20)
+    guest = radio('Guest', password='', channel=6)
+    config = radios.render_radio_config('wlan0', [lobby, guest])
+
+    assert config.startswith('interface=wlan0\n')
+    assert 'channel=11\n' in config
+    primary, bss = config.split('bss=')
+    assert 'ssid=Lobby' in primary and 'wpa_passphrase=lobbypass1' in primary and 'max_num_sta=20' in primary
+    assert bss.startswith('wlan0_1\n')
+    assert 'ssid=Guest' in bss and 'wpa' not in bss
+
+
+def test_bss_interface_names_fit_ifnamsiz():
+    assert radios.bss_ifname('wlan0', 0) == 'wlan0'
+    assert radios.bss_ifname('wlx00c0ca123456', 12) == 'wlx00c0ca123_12'
+    assert len(radios.bss_ifname('wlx00c0ca123456', 12)) == radios.IFNAME_MAX
+
+
+def test_dnsmasq_and_addresses_per_bss(radio):
+    lobby, guest = radio('Lobby', is_active=False), radio('Guest', is_active=False)
+    dnsmasq = radios.render_radio_dnsmasq('wlan0', [lobby, guest])
+    # Subnets come from the allocator, in the order the hotspots first asked
+    assert 'dhcp-range=set:wlan0_1,10.128.1.10,10.128.1.254,12h' in dnsmasq
+    assert radios.render_radio_addresses('wlan0', [lobby, guest]) == (
+        'wlan0 10.128.0.1/24\nwlan0_1 10.128.1.1/24\n'
+    )
+
+
+def test_ssids_share_one_process(radio, systemd):
+    bus = systemd
+    lobby = radio('Lobby', desired_state=STOPPED)
+    guest = radio('Guest', desired_state=STOPPED)
+
+    result = radios.apply_radio('wlan0', add=lobby)
+    assert result['success'] and result['stdout'].startswith('Started')
+    Hotspot.objects.filter(id=lobby.id).update(desired_state=RUNNING)
+
+    # A second SSID reconfigures the running hostapd
+    result = radios.apply_radio('wlan0', add=guest)
+    assert result['stdout'].startswith('Reloaded')
+    Hotspot.objects.filter(id=guest.id).update(desired_state=RUNNING)
+    with open(radios.radio_paths('wlan0')['hostapd']) as f:
+        assert 'bss=wlan0_1\n' in f.read()
+
+    assert radios.apply_radio('wlan0', add=guest)['already_running']
+
+    radios.apply_radio('wlan0', remove=guest)
+    Hotspot.objects.filter(id=guest.id).update(desired_state=STOPPED)
+    result = radios.apply_radio('wlan0', remove=lobby)
+    assert result['stdout'].startswith('Stopped')
+
+    assert [member for member, _ in bus.calls if member.endswith('Unit') and member != 'GetUnit'] == [
+        'StartUnit', 'ReloadUnit', 'ReloadUnit', 'StopUnit'
+    ]
+
+
+def test_service_and_fleet_use_radio(radio, systemd):
+    bus = systemd
+    lobby = radio('Lobby')
+    radio('Guest')
+    other = radio('Elsewhere', interface='')
+    bus.units[radios.radio_unit_name('wlan0')].update(ActiveState='active')
+
+    with patch('hotspots.radios.serving_ssids', return_value={'Lobby'}), \
+            patch('hotspots.fleet.serving_ssids', return_value={'Lobby'}) as ssids, \
+            patch('hotspots.fleet.get_systemd_manager', return_value=FakeSystemdManager(bus=bus)):
+        assert HotspotControlService().is_hotspot_running(lobby.id)
+        statuses = {entry['ssid']: entry for entry in collect_fleet_status(Hotspot.objects.order_by('id'))}
+
+    assert statuses['Lobby']['is_running'] and not statuses['Guest']['is_running']
+    assert statuses['Guest']['unit_state'] == 'active'
+    assert not statuses['Elsewhere']['is_running']
+    # One control-socket query for the whole radio
+    ssids.assert_called_once_with('wlan0')
+    assert radios.unit_for(other) == f'hotspot_{other.id}.service'
@@ -0,0 +1,237 @@
+# hotspots/tests/test_radius_accounting.py
+import json
+from datetime import datetime, timezone
+import pytest
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import DataError, OperationalError
+from pyrad.client import Client
+from pyrad.dictionary import Dictionary
+from pyrad.packet import AccountingResponse
+
+from hotspots.models import Hotspot, Session
+from hotspots.radius.accounting import (
+    AccountingBuffer, STATUS_START, STATUS_INTERIM, STATUS_STOP, called_station_ssid, parse_accounting_packet
+)
+from hotspots.radius.server import DICTIONARY_PATH
+from hotspots.tests.test_radius_server import SECRET, ServerThread, make_server
+
+User = get_user_model()
+
+
+def make_record(status, session_id='sess-1', input_octets=0, output_octets=0, **extra):
+    record = {
+        'status': status,
+        'session_id': session_id,
+        'username': 'acct_user',
+        'framed_ip': '10.0.0.20',
+        'mac': 'AA:BB:CC:DD:EE:FF',
+        'called_station_id': '11-22-33-44-55-66:AcctNet',
+        'nas_ip': '127.0.0.1',
+        'nas_identifier': '',
+        'input_octets': input_octets,
+        'output_octets': output_octets,
+        'event_time': 1700000000,
+    }
+    record.update(extra)
+    return record
+
+
+@pytest.fixture
+def hotspot_user(location):
+    owner = User.objects.create_user(username='acct_owner', password='pass', user_type=2)
+    hotspot = Hotspot.objects.create(owner=owner, location=location, ssid='AcctNet', password='password123')
+    user = User.objects.create_user(username='acct_user', password='pass', user_type=3)
+    return hotspot, user
+
+
+@pytest.mark.django_db
+def test_updates_for_one_session_are_merged_into_one_row(tmp_path, hotspot_user, django_assert_max_num_queries):
+    hotspot, user = hotspot_user
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    buffer.add(make_record(STATUS_START))
+    for step in range(1, 6):
+        buffer.add(make_record(STATUS_INTERIM, input_octets=step * 1024 * 1024, output_octets=step * 1024 * 1024))
+    buffer.add(make_record(STATUS_START, session_id='sess-2'))
+    assert len(buffer) == 2
+
+    with django_assert_max_num_queries(8):
+        assert buffer.flush() == 2
+
+    session = Session.objects.get(acct_session_id='sess-1')
+    assert session.user == user
+    assert session.hotspot == hotspot
+    assert session.is_active
+    assert session.data_used == 10
+    assert session.mac_address == 'AA:BB:CC:DD:EE:FF'
+
+    buffer.add(make_record(STATUS_STOP, input_octets=6 * 1024 * 1024, output_octets=6 * 1024 * 1024))
+    buffer.flush()
+    buffer.close()
+    session.refresh_from_db()
+    assert not session.is_active
+    assert session.end_time is not None
+    assert session.data_used == 12
+    assert Session.objects.count() == 2
+    assert not (tmp_path / 'acct.spool.flushing').exists()
+
+
+@pytest.mark.django_db
+def test_spooled_records_are_recovered_after_crash(tmp_path, hotspot_user):
+    spool = tmp_path / 'acct.spool'
+    spool.write_text(
+        json.dumps(make_record(STATUS_START)) + '\n' +
+        'not json\n' +
+        json.dumps(make_record(STATUS_INTERIM, input_octets=3 * 1024 * 1024)) + '\n'
+    )
+    buffer = AccountingBuffer(spool_path=spool, batch_size=100, flush_interval=60)
+    assert buffer.recover() == 2
+    assert len(buffer) == 1
+    buffer.flush()
+    buffer.close()
+
+    assert Session.objects.get(acct_session_id='sess-1').data_used == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_accounting_requests_are_acknowledged_and_flushed(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    server = make_server(acct_port=0, accounting=buffer)
+
+    with ServerThread(server) as running:
+        client = Client(
+            server='127.0.0.1',
+            acctport=running.server.acct_address[1],
+            secret=SECRET,
+            dict=Dictionary(DICTIONARY_PATH),
+            retries=1,
+            timeout=10
+        )
+        for status in ('Start', 'Interim-Update'):
+            request = client.CreateAcctPacket(
+                User_Name='acct_user',
+                Acct_Status_Type=status,
+                Acct_Session_Id='radius-sess',
+                Calling_Station_Id='aa-bb-cc-dd-ee-ff',
+                Called_Station_Id='11-22-33-44-55-66:AcctNet',
+                Framed_IP_Address='10.0.0.30',
+                Acct_Input_Octets=2 * 1024 * 1024,
+            )
+            assert client.SendPacket(request).code == AccountingResponse
+        assert not Session.objects.filter(acct_session_id='radius-sess').exists()
+
+    # Stopping the server flushes whatever is still buffered
+    session = Session.objects.get(acct_session_id='radius-sess')
+    assert session.ip_address == '10.0.0.30'
+    assert session.mac_address == 'AA:BB:CC:DD:EE:FF'
+    assert session.data_used == 2
+    assert running.server.stats['accounted'] == 2
+
+
+def test_called_station_ssid_handles_bare_macs_and_colons():
+    assert called_station_ssid('11-22-33-44-55-66:AcctNet') == 'AcctNet'
+    assert called_station_ssid('11:22:33:44:55:66') is None
+    assert called_station_ssid('11:22:33:44:55:66:') is None
+    assert called_station_ssid('11:22:33:44:55:66:Acct:Net') == 'Acct:Net'
+    assert called_station_ssid('') is None
+
+
+@pytest.mark.django_db
+def test_bare_mac_called_station_id_resolves_through_nas_identifier(hotspot_user):
+    hotspot, _ = hotspot_user
+    records = [
+        make_record(STATUS_START, 'sess-mac', called_station_id='11:22:33:44:55:66'),
+        make_record(STATUS_START, 'sess-marker', called_station_id='11:22:33:44:55:66',
+                    nas_identifier=f'hotspot_{hotspot.id}'),
+    ]
+    assert AccountingBuffer._resolve_hotspots(records) == {('127.0.0.1', 'sess-marker'): hotspot.id}
+
+
+@pytest.mark.django_db
+def test_same_session_id_on_two_nases_stays_two_sessions(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    buffer.add(make_record(STATUS_START, '00000001', nas_ip='192.168.1.2'))
+    buffer.add(make_record(STATUS_START, '00000001', nas_ip='192.168.1.3'))
+    assert len(buffer) == 2
+    buffer.flush()
+
+    buffer.add(make_record(STATUS_INTERIM, '00000001', nas_ip='192.168.1.3', input_octets=5 * 1024 * 1024))
+    buffer.flush()
+    buffer.close()
+    sessions = dict(Session.objects.filter(acct_session_id='00000001').values_list('nas_ip_address', 'data_used'))
+    assert sessions == {'192.168.1.2': 0, '192.168.1.3': 5}
+
+
+@pytest.mark.django_db
+def test_session_starts_at_the_acct_start_event(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    buffer.add(make_record(STATUS_START, event_time=1700000000))
+    buffer.add(make_record(STATUS_INTERIM, event_time=1700000300))
+    # Interim-Update lost its Start until the NAS resent it
+    buffer.add(make_record(STATUS_INTERIM, session_id='sess-2', event_time=1700000300))
+    buffer.flush()
+    buffer.add(make_record(STATUS_START, session_id='sess-2', event_time=1700000100))
+    buffer.flush()
+    buffer.close()
+
+    started = {session.acct_session_id: session.start_time for session in Session.objects.all()}
+    assert started == {
+        'sess-1': datetime.fromtimestamp(1700000000, tz=timezone.utc),
+        'sess-2': datetime.fromtimestamp(1700000100, tz=timezone.utc),
+    }
+
+
+def test_event_time_falls_back_to_now_minus_delay():
+    packet = {'Acct-Status-Type': ['Start'], 'Acct-Session-Id': ['sess-1'], 'Acct-Delay-Time': [30]}
+    with patch('hotspots.radius.accounting.time.time', return_value=1700000030):
+        assert parse_accounting_packet(packet)['event_time'] == 1700000000
+    packet['Event-Timestamp'] = [1699999000]
+    assert parse_accounting_packet(packet)['event_time'] == 1699999000
+
+
+@pytest.mark.django_db
+def test_values_are_fitted_to_their_columns(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    buffer.add(make_record(STATUS_START, 'x' * 100, framed_ip='not-an-ip', input_octets=2 ** 70, event_time=10 ** 20))
+    assert buffer.flush() == 1
+    buffer.close()
+
+    session = Session.objects.get()
+    assert session.acct_session_id == 'x' * 64
+    assert session.ip_address == '0.0.0.0'
+    assert session.input_octets == 2 ** 63 - 1
+
+
+@pytest.mark.django_db
+def test_refused_record_is_dropped_without_blocking_the_batch(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    for session_id in ('good-1', 'bad', 'good-2'):
+        buffer.add(make_record(STATUS_START, session_id))
+    update_session = AccountingBuffer._update_session
+
+    def refuse_bad(session, record):
+        if record['session_id'] == 'bad':
+            raise DataError('value too long for type character varying(64)')
+        update_session(session, record)
+
+    with patch.object(AccountingBuffer, '_update_session', side_effect=refuse_bad):
+        assert buffer.flush() == 2
+    assert len(buffer) == 0
+    assert not (tmp_path / 'acct.spool.flushing').exists()
+    buffer.close()
+    assert set(Session.objects.values_list('acct_session_id', flat=True)) == {'good-1', 'good-2'}
+
+
+@pytest.mark.django_db
+def test_unreachable_database_keeps_the_batch(tmp_path, hotspot_user):
+    buffer = AccountingBuffer(spool_path=tmp_path / 'acct.spool', batch_size=100, flush_interval=60)
+    buffer.add(make_record(STATUS_START, 'sess-1'))
+    buffer.add(make_record(STATUS_START, 'sess-2'))
+
+    with patch.object(AccountingBuffer, '_apply', side_effect=OperationalError('server closed the connection')):
+        with pytest.raises(OperationalError):
+            buffer.flush()
+    assert len(buffer) == 2
+    assert buffer.flush() == 2
+    buffer.close()
+    assert Session.objects.count() == 2
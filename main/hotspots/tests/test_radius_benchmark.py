@@ -0,0 +1,88 @@
+# hotspots/tests/test_radius_benchmark.py
+import json
+import pytest
+from django.core.management import call_command
+from accounts.models import User
+from hotspots.models import Session
+from hotspots.management.commands.radius_benchmark import percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_reports_latency_against_embedded_server(tmp_path, settings):
+    settings.RADIUS_ACCOUNTING_SPOOL = str(tmp_path / 'acct.spool')
+    output = tmp_path / 'report.json'
+
+    call_command(
+        'radius_benchmark', '--users', '3', '--requests', '6', '--concurrency', '2',
+        '--embedded', '--accounting', '--output', str(output)
+    )
+
+    report = json.loads(output.read_text())
+    assert User.objects.filter(username__startswith='bench_user_').count() == 3
+    assert report['accepted'] == 6
+    assert report['reject_ratio'] == 0.0
+    assert report['latency_ms']['count'] == 6
+    assert report['latency_ms']['p50'] <= report['latency_ms']['p99']
+    assert report['accounting_latency_ms']['count'] == 12
+    assert report['server_stats']['accounted'] == 12
+    # Every session reached the database, on the seeded benchmark hotspot
+    sessions = Session.objects.filter(acct_session_id__startswith='bench-')
+    assert sessions.count() == 6
+    assert set(sessions.values_list('hotspot__ssid', 'is_active')) == {('radius_benchmark', False)}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bad_passwords_are_counted_as_rejects(tmp_path, settings):
+    settings.RADIUS_ACCOUNTING_SPOOL = str(tmp_path / 'acct.spool')
+    output = tmp_path / 'report.json'
+
+    call_command(
+        'radius_benchmark', '--users', '2', '--requests', '4', '--concurrency', '2',
+        '--bad-password-ratio', '1', '--embedded', '--output', str(output)
+    )
+
+    report = json.loads(output.read_text())
+    assert report['rejected'] == 4
+    assert report['reject_ratio'] == 1.0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_embedded_server_is_not_rate_limited_by_default(tmp_path, settings, reset_login_rate_limiter):
+    settings.RADIUS_ACCOUNTING_SPOOL = str(tmp_path / 'acct.spool')
+    reset_login_rate_limiter.limits['username'] = (1, 0.001)
+    output = tmp_path / 'report.json'
+
+    call_command(
+        'radius_benchmark', '--users', '1', '--requests', '4', '--concurrency', '1',
+        '--embedded', '--output', str(output)
+    )
+
+    report = json.loads(output.read_text())
+    assert report['accepted'] == 4
+    assert report['rate_limited'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throttled_replies_are_reported_apart_from_rejects(tmp_path, settings, reset_login_rate_limiter):
+    settings.RADIUS_ACCOUNTING_SPOOL = str(tmp_path / 'acct.spool')
+    reset_login_rate_limiter.limits['username'] = (1, 0.001)
+    output = tmp_path / 'report.json'
+
+    call_command(
+        'radius_benchmark', '--users', '1', '--requests', '4', '--concurrency', '1',
+        '--embedded', '--rate-limit', '--output', str(output)
+    )
+
+    report = json.loads(output.read_text())
+    assert report['accepted'] == 1
+    assert report['rate_limited'] == 3
+    assert report['rejected'] == 0
+    assert report['reject_ratio'] == 0.0
@@ -0,0 +1,129 @@
+# hotspots/tests/test_radius_disconnect.py
+import socket
+import asyncio
+import threading
+import pytest
+from django.utils import timezone
+from pyrad.dictionary import Dictionary
+from pyrad.packet import CoAPacket, DisconnectACK, DisconnectNAK
+
+from accounts.models import User
+from billing.models import Plan, Subscription
+from hotspots.models import Session
+from hotspots.radius.disconnect import (
+    ACKED, NAKED, NO_NAS, TIMEOUT, DisconnectDispatcher, disconnect_ineligible_sessions, ineligible_sessions
+)
+from hotspots.radius.nas import NasRegistry
+from hotspots.radius.server import DICTIONARY_PATH
+
+SECRET = b'nas-secret'
+
+
+class FakeNas:
+    """UDP endpoint answering Disconnect-Requests; ignores the first `drop` packets per user"""
+
+    def __init__(self, nak_users=(), silent_users=(), drop=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.nak_users = set(nak_users)
+        self.silent_users = set(silent_users)
+        self.drop = drop
+        self.received = []
+        self.dict = Dictionary(DICTIONARY_PATH)
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+
+    def serve(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            request = CoAPacket(packet=data, secret=SECRET, dict=self.dict)
+            assert request.VerifyCoARequest()
+            username = request['User-Name'][0]
+            self.received.append(username)
+            if username in self.silent_users or self.received.count(username) <= self.drop:
+                continue
+            reply = request.CreateReply()
+            reply.code = DisconnectNAK if username in self.nak_users else DisconnectACK
+            self.sock.sendto(reply.ReplyPacket(), addr)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self.thread.join(timeout=2)
+        self.sock.close()
+
+
+@pytest.fixture
+def plan():
+    return Plan.objects.create(name='Disconnect Plan', price=5, duration_days=30)
+
+
+def make_session(hotspot, username, plan=None, days=None, nas_ip='127.0.0.1'):
+    user = User.objects.create_user(username=username, password='pass12345', user_type=3)
+    if plan:
+        Subscription.objects.create(
+            user=user, plan=plan, end_date=timezone.now() + timezone.timedelta(days=days), is_active=True
+        )
+    return Session.objects.create(
+        user=user, hotspot=hotspot, ip_address='10.0.0.5', acct_session_id=f"acct-{username}",
+        nas_ip_address=nas_ip
+    )
+
+
+def make_dispatcher(nas, **kwargs):
+    return DisconnectDispatcher(
+        registry=NasRegistry({'127.0.0.1': SECRET.decode()}), port=nas.port, timeout=0.3, **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_ineligible_sessions_excludes_paying_users(admin_hotspot, plan):
+    paying = make_session(admin_hotspot, 'paying', plan, days=10)
+    expired = make_session(admin_hotspot, 'expired', plan, days=-1)
+    unpaid = make_session(admin_hotspot, 'unpaid')
+
+    assert set(ineligible_sessions()) == {expired, unpaid}
+    assert paying not in ineligible_sessions()
+
+
+@pytest.mark.django_db
+def test_dispatch_acks_naks_and_retries(admin_hotspot):
+    sessions = [make_session(admin_hotspot, name) for name in ('ack_user', 'nak_user', 'lost_user')]
+
+    with FakeNas(nak_users={'nak_user'}, silent_users={'lost_user'}, drop=1) as nas:
+        results = asyncio.run(make_dispatcher(nas, retries=2).dispatch(sessions))
+
+    assert results == {sessions[0].id: ACKED, sessions[1].id: NAKED, sessions[2].id: TIMEOUT}
+    # The first packet for each user was dropped, so every user was retried
+    assert nas.received.count('ack_user') == 2
+    assert nas.received.count('lost_user') == 3
+
+
+@pytest.mark.django_db
+def test_expired_subscription_sessions_are_disconnected_and_closed(admin_hotspot, plan):
+    paying = make_session(admin_hotspot, 'still_paying', plan, days=10)
+    lapsed = make_session(admin_hotspot, 'lapsed', plan, days=10)
+    Subscription.objects.filter(user=lapsed.user).update(end_date=timezone.now() - timezone.timedelta(hours=1))
+    offline = make_session(admin_hotspot, 'no_nas_user', nas_ip=None)
+
+    with FakeNas() as nas:
+        summary = disconnect_ineligible_sessions(dispatcher=make_dispatcher(nas, retries=0))
+
+    assert summary == {ACKED: 1, NO_NAS: 1}
+    assert nas.received == ['lapsed']
+    assert not Subscription.objects.get(user=lapsed.user).is_active
+    for session in (lapsed, offline):
+        session.refresh_from_db()
+        assert not session.is_active
+        assert session.end_time is not None
+    paying.refresh_from_db()
+    assert paying.is_active
+    assert not lapsed.user.has_active_subscription()
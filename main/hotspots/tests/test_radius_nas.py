@@ -0,0 +1,86 @@
+# hotspots/tests/test_radius_nas.py
+import pytest
+from django.utils import timezone
+from hotspots.models import Hotspot, NasClient
+from hotspots.radius.nas import NasRegistry, PrefixTrie
+
+
+def test_trie_prefers_the_longest_prefix():
+    trie = PrefixTrie()
+    trie.insert('10.0.0.0/8', 'corporate')
+    trie.insert('10.1.0.0/16', 'site')
+    trie.insert('10.1.2.3/32', 'ap')
+    trie.insert('2001:db8::/32', 'v6')
+
+    assert trie.longest_match('10.1.2.3') == 'ap'
+    assert trie.longest_match('10.1.2.4') == 'site'
+    assert trie.longest_match('10.200.0.1') == 'corporate'
+    assert trie.longest_match('192.168.0.1') is None
+    assert trie.longest_match('2001:db8::1') == 'v6'
+    assert len(trie) == 4
+
+
+def test_trie_handles_thousands_of_access_points():
+    trie = PrefixTrie()
+    for i in range(4096):
+        trie.insert(f"172.16.{i // 256}.{i % 256}/32", i)
+    trie.insert('172.16.0.0/12', 'fallback')
+
+    assert trie.longest_match('172.16.15.255') == 4095
+    assert trie.longest_match('172.31.0.1') == 'fallback'
+
+
+@pytest.mark.django_db
+def test_registry_merges_settings_and_nas_clients(settings, admin_hotspot):
+    settings.RADIUS_CLIENTS = {'192.168.0.0/16': 'campus'}
+    NasClient.objects.create(name='Lobby AP', network='192.168.1.0/24', secret='lobby', hotspot=admin_hotspot)
+    NasClient.objects.create(name='Retired AP', network='192.168.2.0/24', secret='old', is_active=False)
+
+    registry = NasRegistry()
+
+    assert registry.get_secret('192.168.1.40') == b'lobby'
+    assert registry.lookup('192.168.1.40').hotspot_id == admin_hotspot.id
+    assert registry.lookup('192.168.1.40').ssid == admin_hotspot.ssid
+    assert registry.get_secret('192.168.2.40') == b'campus'
+    assert registry.get_secret('10.0.0.1') is None
+    assert registry.get_secret('not-an-ip') is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_registry_reloads_on_nas_client_changes(settings):
+    settings.RADIUS_CLIENTS = {}
+    registry = NasRegistry()
+    assert registry.get_secret('10.9.0.1') is None
+
+    client = NasClient.objects.create(name='New AP', network='10.9.0.1/24', secret='fresh')
+    assert client.network == '10.9.0.0/24'
+    assert registry.get_secret('10.9.0.1') == b'fresh'
+
+    client.delete()
+    assert registry.get_secret('10.9.0.1') is None
+
+
+@pytest.mark.django_db
+def test_refresh_picks_up_renamed_hotspots(settings, admin_hotspot):
+    settings.RADIUS_CLIENTS = {}
+    NasClient.objects.create(name='Lobby AP', network='192.168.1.0/24', secret='lobby', hotspot=admin_hotspot)
+    registry = NasRegistry()
+
+    Hotspot.objects.filter(id=admin_hotspot.id).update(ssid='Renamed', updated_at=timezone.now())
+
+    assert registry.refresh()
+    assert registry.lookup('192.168.1.40').ssid == 'Renamed'
+
+
+@pytest.mark.django_db
+def test_refresh_only_reloads_when_rows_change(settings, django_assert_num_queries):
+    settings.RADIUS_CLIENTS = {}
+    registry = NasRegistry()
+
+    with django_assert_num_queries(1):
+        assert not registry.refresh()
+
+    # Simulate a change made by another process (no signal in this one)
+    NasClient.objects.bulk_create([NasClient(name='Remote AP', network='10.8.0.0/16', secret='remote')])
+    assert registry.refresh()
+    assert registry.get_secret('10.8.1.1') == b'remote'
@@ -0,0 +1,247 @@
+# hotspots/tests/test_radius_server.py
+import asyncio
+import threading
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.utils import timezone
+from pyrad.client import Client
+from pyrad.dictionary import Dictionary
+from pyrad.packet import AccessRequest, AccessAccept, AccessReject
+
+from billing.models import Plan, Subscription
+from accounts.rate_limit import LoginRateLimiter
+from hotspots.radius.server import RadiusServer, NasRegistry, DICTIONARY_PATH
+
+User = get_user_model()
+
+SECRET = b'testing123'
+
+
+class ServerThread:
+    """Run a RadiusServer on its own event loop for the duration of a test"""
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(self.server.start(), self.loop)
+        self.address = future.result(timeout=5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(timeout=30)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def send_access_request(port, username, password, secret=SECRET, called_station=None, timeout=30):
+    client = Client(
+        server='127.0.0.1',
+        authport=port,
+        secret=secret,
+        dict=Dictionary(DICTIONARY_PATH),
+        retries=1,
+        timeout=timeout
+    )
+    request = client.CreateAuthPacket(code=AccessRequest, User_Name=username)
+    request['User-Password'] = request.PwCrypt(password)
+    if called_station:
+        request['Called-Station-Id'] = called_station
+    return client.SendPacket(request)
+
+
+def make_server(**kwargs):
+    kwargs.setdefault('acct_port', False)
+    return RadiusServer(
+        host='127.0.0.1',
+        auth_port=0,
+        registry=NasRegistry({'127.0.0.1': SECRET.decode()}),
+        **kwargs
+    )
+
+
+def test_registry_resolves_hosts_and_networks():
+    registry = NasRegistry({'127.0.0.1': 'local', '192.168.1.0/24': 'aps'})
+    assert registry.get_secret('127.0.0.1') == b'local'
+    assert registry.get_secret('192.168.1.77') == b'aps'
+    assert registry.get_secret('10.0.0.1') is None
+
+
+def test_requests_are_answered_concurrently():
+    calls = []
+    release = threading.Event()
+
+    def slow_authenticate(username, password, ssid=None):
+        calls.append(username)
+        if len(calls) == 2:
+            release.set()
+        # Both requests must be in the pool at once for this to return
+        release.wait(timeout=5)
+        return AccessAccept if password == 'secret' else AccessReject
+
+    with ServerThread(make_server(authenticate=slow_authenticate, max_workers=4)) as running:
+        port = running.address[1]
+        results = {}
+        threads = [
+            threading.Thread(target=lambda u=u, p=p: results.update({u: send_access_request(port, u, p).code}))
+            for u, p in [('alice', 'secret'), ('bob', 'wrong')]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+    assert release.is_set()
+    assert results == {'alice': AccessAccept, 'bob': AccessReject}
+    assert running.server.stats['accepted'] == 1
+    assert running.server.stats['rejected'] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_access_request_uses_radius_authenticate():
+    user = User.objects.create_user(username='radius_user', password='radiuspass', user_type=3)
+    plan = Plan.objects.create(name='Radius Plan', price=5, duration_days=30)
+    Subscription.objects.create(
+        user=user,
+        plan=plan,
+        end_date=timezone.now() + timezone.timedelta(days=30),
+        is_active=True
+    )
+
+    with ServerThread(make_server()) as running:
+        port = running.address[1]
+        assert send_access_request(port, 'radius_user', 'radiuspass').code == AccessAccept
+        assert send_access_request(port, 'radius_user', 'badpass').code == AccessReject
+
+
+def test_database_errors_fall_back_to_snapshot():
+    def broken_authenticate(username, password, ssid=None):
+        raise DatabaseError('database is locked')
+
+    def snapshot(username, password, ssid=None):
+        return AccessAccept if password == 'secret' else AccessReject
+
+    with ServerThread(make_server(authenticate=broken_authenticate, fallback=snapshot)) as running:
+        port = running.address[1]
+        assert send_access_request(port, 'alice', 'secret').code == AccessAccept
+        assert send_access_request(port, 'alice', 'wrong').code == AccessReject
+    assert running.server.stats['fallbacks'] == 2
+
+
+def test_slow_database_falls_back_to_snapshot():
+    release = threading.Event()
+
+    def stuck_authenticate(username, password, ssid=None):
+        release.wait(timeout=5)
+        return AccessReject
+
+    server = make_server(authenticate=stuck_authenticate, fallback=lambda u, p, s=None: AccessAccept, db_timeout=0.2)
+    with ServerThread(server) as running:
+        assert send_access_request(running.address[1], 'alice', 'secret').code == AccessAccept
+        release.set()
+    assert running.server.stats['fallbacks'] == 1
+
+
+def test_fallback_answers_while_workers_are_stuck():
+    release = threading.Event()
+
+    def stuck_authenticate(username, password, ssid=None):
+        release.wait(timeout=30)
+        return AccessReject
+
+    server = make_server(authenticate=stuck_authenticate, fallback=lambda u, p, s=None: AccessAccept,
+                         db_timeout=0.2, max_workers=1)
+    with ServerThread(server) as running:
+        port = running.address[1]
+        # The only worker thread is still stuck in the first request's database call
+        assert send_access_request(port, 'alice', 'secret', timeout=3).code == AccessAccept
+        assert send_access_request(port, 'bob', 'secret', timeout=3).code == AccessAccept
+        release.set()
+    assert running.server.stats['fallbacks'] == 2
+
+
+def test_rate_limited_requests_skip_authentication(reset_login_rate_limiter):
+    reset_login_rate_limiter.limits['username'] = (1, 0.001)
+    calls = []
+
+    def counting_authenticate(username, password, ssid=None):
+        calls.append(username)
+        return AccessAccept
+
+    with ServerThread(make_server(authenticate=counting_authenticate)) as running:
+        port = running.address[1]
+        assert send_access_request(port, 'storm', 'secret').code == AccessAccept
+        assert send_access_request(port, 'storm', 'secret').code == AccessReject
+    assert calls == ['storm']
+    assert running.server.stats['rate_limited'] == 1
+
+
+def test_networked_rate_limit_check_runs_off_the_event_loop():
+    class RemoteBuckets:
+        """Stands in for RedisBuckets: records where each round-trip ran"""
+        blocking = True
+
+        def __init__(self):
+            self.threads = []
+
+        def consume(self, requests, now):
+            self.threads.append(threading.current_thread())
+            return [True] * len(requests)
+
+    buckets = RemoteBuckets()
+    server = make_server(authenticate=lambda u, p, s=None: AccessAccept, rate_limiter=LoginRateLimiter(backend=buckets))
+    with ServerThread(server) as running:
+        assert send_access_request(running.address[1], 'alice', 'secret').code == AccessAccept
+    assert buckets.threads and running.thread not in buckets.threads
+
+
+def test_hotspot_bucket_is_shared_with_the_http_endpoint(reset_login_rate_limiter):
+    reset_login_rate_limiter.limits['hotspot'] = (1, 0.001)
+    # What the authenticate endpoint consumes for a login on CafeNet
+    assert reset_login_rate_limiter.check(username='web', hotspot='CafeNet') is None
+
+    with ServerThread(make_server(authenticate=lambda u, p, s=None: AccessAccept)) as running:
+        port = running.address[1]
+        assert send_access_request(port, 'radio', 'secret', called_station='AA-BB-CC-DD-EE-FF:CafeNet').code == AccessReject
+        assert send_access_request(port, 'radio', 'secret', called_station='AA-BB-CC-DD-EE-FF:OtherNet').code == AccessAccept
+    assert running.server.stats['rate_limited'] == 1
+
+
+@pytest.mark.parametrize('called_station, expected', [
+    ('AA-BB-CC-DD-EE-FF:CafeNet', 'CafeNet'),
+    ('aa:bb:cc:dd:ee:ff', None),
+    ('aa:bb:cc:dd:ee:ff:Cafe:Upstairs', 'Cafe:Upstairs'),
+])
+def test_ssid_is_taken_from_called_station_id(called_station, expected):
+    seen = []
+
+    def recording_authenticate(username, password, ssid=None):
+        seen.append(ssid)
+        return AccessAccept
+
+    with ServerThread(make_server(authenticate=recording_authenticate)) as running:
+        assert send_access_request(running.address[1], 'alice', 'secret', called_station=called_station).code == AccessAccept
+    assert seen == [expected]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bare_mac_called_station_id_uses_the_nas_hotspot(location):
+    from hotspots.models import Hotspot, NasClient
+    owner = User.objects.create_user(username='nas_owner', password='pass', user_type=2)
+    hotspot = Hotspot.objects.create(owner=owner, location=location, ssid='LobbyNet', password='password123')
+    NasClient.objects.create(name='Lobby AP', network='127.0.0.1/32', secret=SECRET.decode(), hotspot=hotspot)
+    seen = []
+
+    def recording_authenticate(username, password, ssid=None):
+        seen.append(ssid)
+        return AccessAccept
+
+    server = RadiusServer(host='127.0.0.1', auth_port=0, acct_port=False, registry=NasRegistry(),
+                          authenticate=recording_authenticate)
+    with ServerThread(server) as running:
+        send_access_request(running.address[1], 'alice', 'secret', called_station='aa:bb:cc:dd:ee:ff')
+    assert seen == ['LobbyNet']
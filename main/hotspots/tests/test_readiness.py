@@ -0,0 +1,101 @@
+# hotspots/tests/test_readiness.py
+import os
+import socket
+import tempfile
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from hotspots import readiness
+from hotspots.readiness import hostapd_ping, is_ready, is_stopped, wait_for, wait_until_running, wait_until_stopped
+
+
+def state(**overrides):
+    base = {'unit_state': 'inactive', 'hostapd': False, 'dnsmasq': False, 'interface_state': None, 'ctrl_ping': None}
+    return {**base, **overrides}
+
+
+class FakeHostapd(threading.Thread):
+    """Answers PING on a unix datagram socket like hostapd's control interface"""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.settimeout(5)
+
+    def run(self):
+        try:
+            data, addr = self.sock.recvfrom(64)
+        except OSError:
+            return
+        self.sock.sendto(b'PONG\n' if data == b'PING' else b'UNKNOWN COMMAND\n', addr)
+
+
+def test_wait_for_returns_as_soon_as_condition_holds():
+    ready_at = time.monotonic() + 0.2
+    started = time.monotonic()
+    assert wait_for(lambda: time.monotonic() >= ready_at, timeout=5)
+    assert time.monotonic() - started < 1
+
+
+def test_wait_for_gives_up_at_the_deadline():
+    started = time.monotonic()
+    assert not wait_for(lambda: False, timeout=0.3)
+    assert 0.3 <= time.monotonic() - started < 1
+
+
+def test_wait_for_can_be_cancelled():
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    started = time.monotonic()
+    assert not wait_for(lambda: False, timeout=10, cancel=cancel)
+    assert time.monotonic() - started < 2
+
+
+def test_readiness_rules():
+    assert is_ready(state(unit_state='active'))
+    assert is_ready(state(hostapd=True, dnsmasq=True, interface_state='up', ctrl_ping=True))
+    assert not is_ready(state(hostapd=True, dnsmasq=False))
+    assert not is_ready(state(unit_state='active', interface_state='down'))
+    assert not is_ready(state(unit_state='active', ctrl_ping=False))
+    assert is_stopped(state())
+    assert not is_stopped(state(unit_state='deactivating'))
+    assert not is_stopped(state(dnsmasq=True))
+
+
+def test_hostapd_ping():
+    directory = tempfile.mkdtemp(dir='/tmp')
+    path = os.path.join(directory, 'wlan0')
+    assert hostapd_ping(path) is None
+
+    server = FakeHostapd(path)
+    server.start()
+    assert hostapd_ping(path) is True
+    server.join()
+    server.sock.close()
+    os.unlink(path)
+
+
+def test_wait_until_running_tracks_probes():
+    probes = iter([state(unit_state='activating'), state(unit_state='activating'), state(unit_state='active')])
+    with patch.object(readiness, 'probe', side_effect=lambda *args: next(probes)) as probe:
+        ready, last = wait_until_running(1, timeout=5)
+    assert ready and last['unit_state'] == 'active'
+    assert probe.call_count == 3
+
+
+def test_failed_unit_ends_the_wait():
+    with patch.object(readiness, 'probe', return_value=state(unit_state='failed')) as probe:
+        started = time.monotonic()
+        ready, last = wait_until_running(1, timeout=10)
+    assert not ready and last['unit_state'] == 'failed'
+    assert probe.call_count == 1
+    assert time.monotonic() - started < 1
+
+
+def test_wait_until_stopped():
+    probes = iter([state(hostapd=True), state()])
+    with patch.object(readiness, 'probe', side_effect=lambda *args: next(probes)):
+        stopped, _ = wait_until_stopped(1, timeout=5)
+    assert stopped
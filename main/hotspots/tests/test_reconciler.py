@@ -0,0 +1,153 @@
+# hotspots/tests/test_reconciler.py
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from django.core.cache import cache
+from hotspots.models import Hotspot
+from hotspots.operations import radio_lease, take_lease
+from hotspots.reconciler import RUN_KEY, Action, _execute, plan_actions, reconcile, request_reconcile
+
+RUNNING, STOPPED = Hotspot.DesiredState.RUNNING, Hotspot.DesiredState.STOPPED
+
+
+def observed(hotspots, running=(), unit_state='inactive'):
+    return [
+        {'id': hotspot.id, 'is_running': hotspot.ssid in running, 'unit_state': unit_state}
+        for hotspot in hotspots
+    ]
+
+
+def test_plan_only_touches_differences(hotspot_factory):
+    steady = hotspot_factory('Steady')
+    down = hotspot_factory('Down')
+    unwanted = hotspot_factory('Unwanted', desired_state=STOPPED)
+    idle = hotspot_factory('Idle', desired_state=STOPPED)
+    hotspots = [steady, down, unwanted, idle]
+
+    actions = plan_actions(hotspots, observed(hotspots, running={'Steady', 'Unwanted'}), orphans={999})
+    assert [(action.kind, action.hotspot_id) for action in actions] == [
+        ('start', down.id), ('stop', unwanted.id), ('stop', 999)
+    ]
+
+
+def test_plan_restarts_running_hotspot_with_outdated_config(hotspot_factory):
+    hotspot = hotspot_factory('Edited', config_hash='0' * 64)
+    actions = plan_actions([hotspot], observed([hotspot], running={'Edited'}))
+    assert [(action.kind, action.hotspot_id) for action in actions] == [('restart', hotspot.id)]
+
+    # Never rendered by the hashing renderer: adopted as it runs
+    hotspot.config_hash = ''
+    assert plan_actions([hotspot], observed([hotspot], running={'Edited'})) == []
+
+
+def test_plan_one_action_per_radio(hotspot_factory, settings):
+    settings.HOTSPOT_MULTI_BSS = True
+    lobby = hotspot_factory('Lobby', interface='wlan0')
+    guest = hotspot_factory('Guest', interface='wlan0')
+    gone = hotspot_factory('Gone', interface='wlan0', desired_state=STOPPED)
+    hotspots = [lobby, guest, gone]
+
+    actions = plan_actions(hotspots, observed(hotspots, unit_state='active'), radio_ssids={'wlan0': {'Lobby', 'Gone'}})
+    assert [(action.kind, action.interface, [h.ssid for h in action.hotspots]) for action in actions] == [
+        ('radio', 'wlan0', ['Lobby', 'Guest'])
+    ]
+
+
+def test_reconcile_bounds_concurrency(hotspot_factory):
+    hotspots = [hotspot_factory(f'Net{index}') for index in range(6)]
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def execute(action):
+        with lock:
+            in_flight.append(action)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(action)
+        return {'success': action.hotspot_id != hotspots[0].id}
+
+    with patch('hotspots.reconciler.collect_fleet_status', side_effect=[observed(hotspots), []]) as fleet, \
+            patch('hotspots.reconciler.process_snapshot') as snapshot, \
+            patch('hotspots.reconciler._execute', side_effect=execute):
+        snapshot.running_hotspots.return_value = {}
+        result = reconcile(Hotspot.objects.order_by('id'), max_workers=2)
+
+    assert max(peak) == 2
+    assert [entry['action'] for entry in result['actions']] == ['start'] * 6
+    assert result['failed'] == [result['actions'][0]]
+    # Acted-on hotspots are observed again and their flags corrected
+    assert fleet.call_args_list[1].kwargs == {'reconcile': True}
+    assert len(fleet.call_args_list[1].args[0]) == 6
+
+
+def test_converged_fleet_does_nothing(hotspot_factory):
+    hotspots = [hotspot_factory('Steady')]
+    with patch('hotspots.reconciler.collect_fleet_status', return_value=observed(hotspots, running={'Steady'})), \
+            patch('hotspots.reconciler.process_snapshot') as snapshot, \
+            patch('hotspots.reconciler._execute') as execute:
+        snapshot.running_hotspots.return_value = {hotspots[0].id: {'hostapd', 'dnsmasq'}}
+        assert reconcile() == {'checked': 1, 'actions': [], 'failed': []}
+    execute.assert_not_called()
+
+
+def test_runs_exclude_each_other(hotspot_factory):
+    hotspot_factory('Down')
+    assert take_lease(RUN_KEY, 'other-run', 60)
+    with patch('hotspots.reconciler.collect_fleet_status') as fleet, \
+            patch('hotspots.reconciler._execute') as execute:
+        assert reconcile()['skipped']
+    fleet.assert_not_called()
+    execute.assert_not_called()
+
+
+def test_radio_action_waits_for_radio_lease(hotspot_factory, settings):
+    settings.HOTSPOT_MULTI_BSS = True
+    lobby = hotspot_factory('Lobby', interface='wlan0')
+    with radio_lease('wlan0') as acquired, patch('hotspots.reconciler.apply_radio') as apply:
+        assert acquired
+        result = _execute(Action('radio', None, 'wlan0', [lobby]))
+    assert not result['success'] and 'in progress' in result['stderr']
+    apply.assert_not_called()
+
+    with patch('hotspots.reconciler.apply_radio', return_value={'success': True}) as apply:
+        assert _execute(Action('radio', None, 'wlan0', [lobby]))['success']
+    apply.assert_called_once()
+
+
+def test_requests_coalesce_into_one_run(db, settings, django_capture_on_commit_callbacks):
+    assert request_reconcile() is False
+    settings.HOTSPOT_RECONCILER_ENABLED = True
+    with patch('hotspots.tasks.reconcile_hotspots_task.delay') as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            assert request_reconcile() is True
+            assert request_reconcile() is False
+        assert delay.call_count == 1
+
+    # Pending is kept in the database, not in one process's cache
+    cache.clear()
+    assert request_reconcile() is False
+    with patch('hotspots.reconciler.collect_fleet_status', return_value=[]), \
+            patch('hotspots.reconciler.process_snapshot') as snapshot:
+        snapshot.running_hotspots.return_value = {}
+        reconcile([])
+    with patch('hotspots.tasks.reconcile_hotspots_task.delay'):
+        assert request_reconcile() is True
+
+
+def test_views_record_desired_state(db, settings, api_client, admin_user, reseller_hotspot):
+    settings.HOTSPOT_RECONCILER_ENABLED = True
+    api_client.force_authenticate(user=admin_user)
+    with patch('hotspots.signals.request_reconcile') as queued, \
+            patch('hotspots.views.enqueue_operation') as enqueue, \
+            patch('hotspots.views.HotspotControlService') as service:
+        response = api_client.post(f'/api/hotspots/{reseller_hotspot.id}/stop/')
+
+    assert response.status_code == 202
+    assert response.data['desired_state'] == STOPPED
+    assert Hotspot.objects.get(id=reseller_hotspot.id).desired_state == STOPPED
+    queued.assert_called_once_with()
+    enqueue.assert_not_called()
+    service.assert_not_called()
@@ -0,0 +1,68 @@
+# hotspots/tests/test_rendering.py
+import os
+import pytest
+from unittest.mock import patch
+from hotspots.models import Hotspot
+from hotspots.rendering import apply_config, config_digest
+from hotspots.services import HotspotControlService
+
+
+@pytest.fixture
+def dirs(settings, tmp_path):
+    settings.HOTSPOT_CONFIG_DIR = str(tmp_path / 'config')
+    settings.SYSTEMD_UNIT_DIR = str(tmp_path / 'units')
+    with patch('hotspots.rendering.get_systemd_manager') as manager:
+        manager.return_value.daemon_reload.return_value = True
+        yield tmp_path, manager.return_value
+
+
+def test_digest_covers_paths_and_content():
+    files = {'env': ('/a', 'SSID=x\n')}
+    assert config_digest(files) == config_digest(dict(files))
+    assert config_digest(files) != config_digest({'env': ('/a', 'SSID=y\n')})
+    assert config_digest(files) != config_digest({'env': ('/b', 'SSID=x\n')})
+
+
+def test_unchanged_hotspot_is_not_rewritten(dirs, reseller_hotspot):
+    tmp_path, manager = dirs
+    plan = HotspotControlService.prepare_config(reseller_hotspot)
+    assert plan.changed == ('env', 'unit') and plan.action == 'restart' and plan.needs_daemon_reload
+    assert manager.daemon_reload.call_count == 1
+    assert Hotspot.objects.get(id=reseller_hotspot.id).config_hash == plan.digest
+
+    env_path = HotspotControlService.env_file_path(reseller_hotspot)
+    with open(env_path) as f:
+        assert f'SSID={reseller_hotspot.ssid}' in f.read()
+
+    # Same fields: the stored hash short-circuits without reading the files
+    with patch('hotspots.rendering.write_atomic') as write, patch('hotspots.rendering._differs') as differs:
+        again = HotspotControlService.prepare_config(Hotspot.objects.get(id=reseller_hotspot.id))
+    assert again == (plan.digest, (), 'none')
+    write.assert_not_called()
+    differs.assert_not_called()
+    assert manager.daemon_reload.call_count == 1
+
+
+def test_only_changed_files_are_written(dirs, reseller_hotspot):
+    tmp_path, manager = dirs
+    HotspotControlService.prepare_config(reseller_hotspot)
+    reseller_hotspot.password = 'newpass123'
+    plan = HotspotControlService.prepare_config(reseller_hotspot)
+    assert plan.changed == ('env',) and plan.action == 'restart'
+    assert manager.daemon_reload.call_count == 1
+    # Atomic replace leaves no staging files behind
+    assert os.listdir(tmp_path / 'config') == [f'hotspot_{reseller_hotspot.id}.env']
+
+
+def test_deleted_file_is_restored(dirs, reseller_hotspot):
+    HotspotControlService.prepare_config(reseller_hotspot)
+    os.unlink(HotspotControlService.env_file_path(reseller_hotspot))
+    assert HotspotControlService.prepare_config(reseller_hotspot).changed == ('env',)
+
+
+def test_reloadable_files_need_reload_only(dirs, reseller_hotspot):
+    tmp_path, _ = dirs
+    path = str(tmp_path / 'config' / 'radio.conf')
+    apply_config({'hostapd': (path, 'ssid=a\n')}, [reseller_hotspot])
+    plan = apply_config({'hostapd': (path, 'ssid=b\n')}, [reseller_hotspot])
+    assert plan.action == 'reload' and not plan.needs_daemon_reload
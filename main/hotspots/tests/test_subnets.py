@@ -0,0 +1,70 @@
+# hotspots/tests/test_subnets.py
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hotspots.models import Hotspot, SubnetAllocation
+from hotspots.services import HotspotControlService
+from hotspots.subnets import SubnetPoolExhausted, allocate_subnet, hotspot_network, release_subnet
+
+
+@pytest.fixture
+def make(hotspot_factory, settings):
+    settings.HOTSPOT_SUBNET_POOLS = ['10.200.0.0/23', '172.20.0.0/24']
+    settings.HOTSPOT_SUBNET_PREFIX = 24
+    settings.HOTSPOT_SUBNET_EXCLUDE = []
+    return hotspot_factory
+
+
+def test_subnets_do_not_overlap_and_spill_into_next_pool(make):
+    networks = [allocate_subnet(make(f'Net{index}')).network for index in range(3)]
+    assert networks == ['10.200.0.0/24', '10.200.1.0/24', '172.20.0.0/24']
+    with pytest.raises(SubnetPoolExhausted):
+        allocate_subnet(make('OneTooMany'))
+
+
+def test_allocation_is_stable(make):
+    hotspot = make('Stable')
+    first = allocate_subnet(hotspot)
+    assert allocate_subnet(Hotspot.objects.get(id=hotspot.id)) == first
+    # Loaded together with the hotspot: rendering needs no extra query
+    loaded = Hotspot.objects.select_related('subnet').get(id=hotspot.id)
+    with CaptureQueriesContext(connection) as queries:
+        assert allocate_subnet(loaded) == first
+    assert len(queries) == 0
+
+
+def test_deleted_hotspot_subnet_is_reused_first(make):
+    first, second, third = (make(f'Net{index}') for index in range(3))
+    for hotspot in (first, second, third):
+        allocate_subnet(hotspot)
+    freed = second.subnet.network
+    second.delete()
+    release_subnet(third)
+
+    assert allocate_subnet(make('Newcomer')).network == freed
+    # Lowest free index first
+    assert SubnetAllocation.objects.filter(hotspot__isnull=True).count() == 1
+    assert SubnetAllocation.objects.count() == 3
+
+
+def test_excluded_networks_are_skipped(make, settings):
+    settings.HOTSPOT_SUBNET_EXCLUDE = ['10.200.0.0/24']
+    assert allocate_subnet(make('Clear')).network == '10.200.1.0/24'
+
+
+def test_small_subnets(make, settings):
+    settings.HOTSPOT_SUBNET_POOLS = ['10.40.0.0/24']
+    settings.HOTSPOT_SUBNET_PREFIX = 26
+    networks = [hotspot_network(make(f'Net{index}')) for index in range(4)]
+    assert [network['gateway'] for network in networks] == [
+        '10.40.0.1/26', '10.40.0.65/26', '10.40.0.129/26', '10.40.0.193/26'
+    ]
+    assert networks[1]['netmask'] == '255.255.255.192'
+    assert (networks[1]['dhcp_start'], networks[1]['dhcp_end']) == ('10.40.0.74', '10.40.0.126')
+
+
+def test_env_file_carries_allocated_range(make):
+    hotspot = make('Rendered')
+    env = HotspotControlService.render_env_file(hotspot)
+    assert 'AP_IP=10.200.0.1\n' in env and 'NETMASK=255.255.255.0\n' in env
+    assert 'DHCP_RANGE_START=10.200.0.10\nDHCP_RANGE_END=10.200.0.254\n' in env
@@ -0,0 +1,127 @@
+# hotspots/tests/test_systemd.py
+import subprocess
+import pytest
+from unittest.mock import patch
+from hotspots.processes import ProcessInfo
+from hotspots.services import HotspotControlService
+from hotspots.systemd import (
+    DBusSystemdManager, FakeSystemdBus, SubprocessSystemdManager, get_systemd_manager, reset_systemd_manager
+)
+
+
+class BrokenBus:
+    def call(self, *args, **kwargs):
+        raise ConnectionError('bus went away')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def bus():
+    return FakeSystemdBus(units={'hotspot_1.service': 'inactive', 'hotspot_2.service': 'active'})
+
+
+def test_start_stop_and_state_over_the_bus(bus):
+    manager = DBusSystemdManager(bus=bus)
+
+    assert manager.start('hotspot_1.service')
+    assert manager.active_state('hotspot_1.service') == 'active'
+    assert manager.reload('hotspot_1.service')
+    assert manager.stop('hotspot_1.service')
+    assert manager.active_state('hotspot_1.service') == 'inactive'
+    assert not manager.reload('hotspot_1.service')
+    assert manager.daemon_reload() and bus.daemon_reloads == 1
+    assert manager.stats == {'bus_calls': 6, 'fallbacks': 0}  # the refused reload is not counted
+
+
+def test_unknown_units(bus):
+    manager = DBusSystemdManager(bus=bus)
+    assert manager.active_state('hotspot_9.service') == 'inactive'
+    assert not manager.start('hotspot_9.service')
+
+
+def test_many_states_in_one_call(bus):
+    manager = DBusSystemdManager(bus=bus)
+    states = manager.active_states(['hotspot_1.service', 'hotspot_2.service', 'hotspot_3.service'])
+    assert states == {'hotspot_1.service': 'inactive', 'hotspot_2.service': 'active', 'hotspot_3.service': 'unknown'}
+    assert [member for member, _ in bus.calls] == ['ListUnitsByNames']
+
+
+def test_failed_start_is_visible(bus):
+    bus.start_states['hotspot_1.service'] = 'failed'
+    manager = DBusSystemdManager(bus=bus)
+    manager.start('hotspot_1.service')
+    assert manager.units(['hotspot_1.service'])['hotspot_1.service']['ActiveState'] == 'failed'
+
+
+def test_unreachable_bus_falls_back_to_systemctl():
+    manager = DBusSystemdManager(bus=BrokenBus())
+    done = subprocess.CompletedProcess(args=[], returncode=0, stdout='active\n', stderr='')
+    with patch('hotspots.systemd.subprocess.run', return_value=done) as run:
+        assert manager.active_state('hotspot_1.service') == 'active'
+        assert manager.stop('hotspot_1.service')
+
+    assert run.call_args_list[0].args[0] == ['sudo', 'systemctl', 'is-active', 'hotspot_1.service']
+    assert run.call_args_list[1].args[0] == ['sudo', 'systemctl', 'stop', 'hotspot_1.service']
+    assert manager.stats['fallbacks'] == 2
+
+
+def test_missing_jeepney_is_detected_once():
+    manager = DBusSystemdManager()
+    done = subprocess.CompletedProcess(args=[], returncode=0, stdout='active\n', stderr='')
+    with patch('hotspots.systemd.JeepneySystemBus', side_effect=ImportError('No module named jeepney')) as bus, \
+            patch('hotspots.systemd.subprocess.run', return_value=done), \
+            patch('hotspots.systemd.logger') as log:
+        for _ in range(3):
+            assert manager.active_state('hotspot_1.service') == 'active'
+    assert bus.call_count == 1
+    assert log.warning.call_count == 1
+    assert manager.stats['fallbacks'] == 3
+
+
+def test_subprocess_manager_reads_many_units_with_one_show():
+    output = "Id=hotspot_1.service\nActiveState=active\n\nId=hotspot_2.service\nActiveState=failed\n"
+    shown = subprocess.CompletedProcess(args=[], returncode=0, stdout=output, stderr='')
+    with patch('hotspots.systemd.subprocess.run', return_value=shown) as run:
+        states = SubprocessSystemdManager().active_states(['hotspot_1.service', 'hotspot_2.service'])
+    assert states == {'hotspot_1.service': 'active', 'hotspot_2.service': 'failed'}
+    assert run.call_count == 1
+
+
+def test_dbus_manager_is_the_default(settings):
+    del settings.SYSTEMD_MANAGER_BACKEND
+    reset_systemd_manager()
+    manager = get_systemd_manager()
+    assert isinstance(manager, DBusSystemdManager)
+    # Hosts without a system bus still go through systemctl
+    assert isinstance(manager.fallback, SubprocessSystemdManager)
+
+
+@pytest.mark.django_db
+def test_service_uses_configured_manager(settings):
+    settings.SYSTEMD_MANAGER_BACKEND = 'hotspots.systemd.FakeSystemdManager'
+    reset_systemd_manager()
+    manager = get_systemd_manager()
+    manager._bus.add_unit('hotspot_5.service', 'active')
+
+    with patch('hotspots.services.subprocess.run') as run:
+        assert HotspotControlService().is_hotspot_running(5)
+        HotspotControlService()._force_stop_hotspot(5)
+        assert not HotspotControlService().is_hotspot_running(5)
+    assert not any('systemctl' in call.args[0] for call in run.call_args_list)
+
+
+@pytest.mark.django_db
+def test_force_stop_kills_only_the_hotspots_own_daemons(settings):
+    settings.SYSTEMD_MANAGER_BACKEND = 'hotspots.systemd.FakeSystemdManager'
+    reset_systemd_manager()
+    own = [ProcessInfo(41, 'hostapd', ['hostapd', '/etc/hostapd-prod/hotspot_5.hostapd.conf'])]
+
+    with patch('hotspots.services.subprocess.run') as run, \
+            patch('hotspots.services.process_snapshot.processes', return_value=own) as processes:
+        HotspotControlService()._force_stop_hotspot(5)
+    processes.assert_called_with(5)
+    commands = [call.args[0] for call in run.call_args_list]
+    assert commands == [['sudo', 'kill', '-9', '41']]
+    assert not any('pkill' in command for command in commands)
@@ -1,9 +1,14 @@
 # hotspots/test_views.py
 
 import pytest
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from hotspots.models import HotspotLocation, Hotspot, Session
+from hotspots.services import HotspotControlService
+
+User = get_user_model()
 
 
 @pytest.mark.django_db
@@ -70,6 +75,36 @@ class TestHotspotViews:
         response = api_client.put(url, {"ssid": ""})  # Missing fields
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+    def test_running_hotspot_keeps_its_ssid(self, admin_user, api_client, reseller_hotspot):
+        stopped = Hotspot.objects.create(
+            owner=admin_user, location=reseller_hotspot.location, ssid='Spare',
+            is_active=False, desired_state=Hotspot.DesiredState.STOPPED
+        )
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.patch(f'/api/hotspots/{stopped.id}/', {"ssid": reseller_hotspot.ssid})
+        assert response.status_code == status.HTTP_200_OK
+        response = api_client.patch(f'/api/hotspots/{stopped.id}/', {"desired_state": "running"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ssid' in response.data
+
+    def test_start_refuses_ssid_of_running_hotspot(self, admin_user, api_client, location):
+        first, second = (
+            Hotspot.objects.create(
+                owner=owner, location=location, ssid='SharedNet',
+                is_active=False, desired_state=Hotspot.DesiredState.STOPPED
+            )
+            for owner in [admin_user, User.objects.create_user('other', password='otherpass1')]
+        )
+        api_client.force_authenticate(user=admin_user)
+        with patch.object(HotspotControlService, 'is_hotspot_running', return_value=True):
+            assert api_client.post(f'/api/hotspots/{first.id}/start/').status_code == status.HTTP_200_OK
+        with patch.object(HotspotControlService, 'execute_hotspot_command') as execute:
+            response = api_client.post(f'/api/hotspots/{second.id}/start/')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        execute.assert_not_called()
+        second.refresh_from_db()
+        assert second.desired_state == Hotspot.DesiredState.STOPPED
+
     def test_delete_hotspot_as_admin(self, admin_user, api_client, reseller_hotspot):
         api_client.force_authenticate(user=admin_user)
         url = f'/api/hotspots/{reseller_hotspot.id}/'
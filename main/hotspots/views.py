@@ -12,6 +12,7 @@ from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.conf import settings
 from django.core.management import call_command
 
 from .models import HotspotLocation, Hotspot, Session
@@ -26,12 +27,37 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.viewsets import ViewSet
-from django.contrib.auth import authenticate
+from hotspots.authorization import (
+    FORBIDDEN, GRANTED, INVALID_CREDENTIALS, UNKNOWN_HOTSPOT, authorize, authorize_many
+)
+from accounts.rate_limit import get_login_rate_limiter
+from hotspots.operations import enqueue_operation
 from hotspots.tasks import control_hotspot_async
+from hotspots.fleet import collect_fleet_status
+from hotspots.reconciler import reconciler_enabled
 # print("Environment variables:", dict(os.environ))
 
 logger = logging.getLogger(__name__)
 
+# Per-item result of a batch login, by authorization decision
+BATCH_OUTCOMES = {
+    GRANTED: {"code": 200, "status": "access_granted"},
+    UNKNOWN_HOTSPOT: {"code": 404, "status": "access_denied", "error": "Hotspot not found or inactive"},
+    INVALID_CREDENTIALS: {"code": 401, "status": "access_denied", "error": "Invalid credentials"},
+    FORBIDDEN: {"code": 403, "status": "access_denied", "error": "User not authorized for this hotspot"},
+}
+
+
+def login_fields_error(username, password, hotspot_ssid, mac_address):
+    """Why a login attempt's fields are unusable, or None; JSON lists and objects are refused here"""
+    if not all([username, password, hotspot_ssid]):
+        return "Missing required fields (username, password, hotspot_ssid)"
+    if not all(isinstance(value, str) for value in (username, password, hotspot_ssid)):
+        return "username, password and hotspot_ssid must be strings"
+    if mac_address is not None and not isinstance(mac_address, str):
+        return "mac_address must be a string"
+    return None
+
 class HotspotAuthViewSet(ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -42,48 +68,45 @@ class HotspotAuthViewSet(ViewSet):
         {
             "username": "...",
             "password": "...",
-            "hotspot_ssid": "..."
+            "hotspot_ssid": "...",
+            "mac_address": "..."  (optional, used for rate limiting)
         }
         """
         username = request.data.get('username')
         password = request.data.get('password')
         hotspot_ssid = request.data.get('hotspot_ssid')
+        mac_address = request.data.get('mac_address')
 
         # Validate required fields
-        if not all([username, password, hotspot_ssid]):
+        error = login_fields_error(username, password, hotspot_ssid, mac_address)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Checked before any query or password hash so retry storms stay cheap
+        limited = get_login_rate_limiter().check(
+            username=username,
+            mac=mac_address,
+            hotspot=hotspot_ssid
+        )
+        if limited:
             return Response(
-                {"error": "Missing required fields (username, password, hotspot_ssid)"},
-                status=status.HTTP_400_BAD_REQUEST
+                {"error": f"Too many login attempts for this {limited}, try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
             )
 
-        try:
-            hotspot = Hotspot.objects.get(ssid=hotspot_ssid, is_active=True)
-        except Hotspot.DoesNotExist:
+        # One query resolves user, hotspot and owner; see hotspots.authorization
+        result = authorize(username, password, hotspot_ssid)
+        if result.status == UNKNOWN_HOTSPOT:
             return Response(
                 {"error": "Hotspot not found or inactive"},
                 status=status.HTTP_404_NOT_FOUND
             )
-
-        user = authenticate(username=username, password=password)
-        if not user or not user.is_active:
+        if result.status == INVALID_CREDENTIALS:
             return Response(
                 {"error": "Invalid credentials"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
-
-        # Debug logging (optional)
-        print(f"User: {user} (type={user.user_type})")
-        print(f"Hotspot owner: {hotspot.owner} (type={hotspot.owner.user_type})")
-        print(f"Hotspot owner.parent_reseller: {getattr(hotspot.owner, 'parent_reseller', None)}")
-        print(f"User.parent_reseller: {getattr(user, 'parent_reseller', None)}")
-
-        # Authorization check
-        if not (
-            user.is_superuser or
-            user.user_type == 1 or  # Admin
-            (user.user_type == 2 and hotspot.owner == user) or  # Reseller owns hotspot
-            (user.user_type == 3 and hotspot.owner == user.parent_reseller)  # Customer's reseller owns hotspot
-        ):
+        if result.status == FORBIDDEN:
             return Response(
                 {"error": "User not authorized for this hotspot"},
                 status=status.HTTP_403_FORBIDDEN
@@ -92,10 +115,65 @@ class HotspotAuthViewSet(ViewSet):
         return Response({
             "status": "access_granted",
             "message": "Authentication successful",
-            "hotspot": hotspot.ssid,
-            "user": user.username
+            "hotspot": hotspot_ssid,
+            "user": result.user.username
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='authenticate/batch')
+    def authenticate_batch(self, request):
+        """
+        POST /hotspot-auth/authenticate/batch/
+        {
+            "requests": [
+                {"username": "...", "password": "...", "hotspot_ssid": "...", "mac_address": "..."},
+                ...
+            ]
+        }
+
+        Every item gets the decision authenticate/ would give it, in order:
+        {"results": [{"username", "hotspot_ssid", "code": <HTTP status>, "status", "error"?}]}
+        """
+        items = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(items, list):
+            return Response(
+                {"error": "Expected a list of login attempts in 'requests'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_size = getattr(settings, 'HOTSPOT_AUTH_BATCH_MAX_SIZE', 500)
+        if len(items) > max_size:
+            return Response(
+                {"error": f"At most {max_size} login attempts per batch"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limiter = get_login_rate_limiter()
+        results = []
+        to_check = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            username = item.get('username')
+            password = item.get('password')
+            hotspot_ssid = item.get('hotspot_ssid')
+            result = {"username": username, "hotspot_ssid": hotspot_ssid}
+            results.append(result)
+            mac_address = item.get('mac_address')
+            error = login_fields_error(username, password, hotspot_ssid, mac_address)
+            if error:
+                result.update(code=400, status="access_denied", error=error)
+                continue
+            limited = limiter.check(username=username, mac=mac_address, hotspot=hotspot_ssid)
+            if limited:
+                result.update(code=429, status="access_denied",
+                              error=f"Too many login attempts for this {limited}, try again later")
+                continue
+            to_check.append((result, (username, password, hotspot_ssid)))
+
+        decisions = authorize_many([attempt for _, attempt in to_check])
+        for (result, _), decision in zip(to_check, decisions):
+            result.update(BATCH_OUTCOMES[decision.status])
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
 class HotspotLocationViewSet(viewsets.ModelViewSet):
     serializer_class = HotspotLocationSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -213,20 +291,37 @@ class HotspotViewSet(viewsets.ModelViewSet):
             if not (request.user.is_superuser):
                 raise PermissionDenied("Only super-admins can update critical fields")
 
-        self.perform_update(serializer)
-        return Response({"message": "Hotspot updated successfully", "data": serializer.data})
+        config_change = self.perform_update(serializer)
+        response = {"message": "Hotspot updated successfully", "data": serializer.data}
+        if config_change:
+            response["config_change"] = config_change
+        return Response(response)
+
+    def perform_update(self, serializer):
+        """Save, then apply hostapd-relevant changes to the running hotspot"""
+        previous = {
+            field: getattr(serializer.instance, field) for field in HotspotControlService.CONFIG_FIELDS
+        }
+        hotspot = serializer.save()
+        config_change = HotspotControlService().apply_config_change(hotspot, previous)
+        if config_change['method'] == 'restart' and not reconciler_enabled():
+            # With the reconciler the save queued a run, which restarts it for its stale config
+            config_change['task_id'] = enqueue_operation(hotspot, 'restart')
+        return config_change if config_change['changed'] else None
     
     def perform_create(self, serializer):
         try:
             hotspot = serializer.save(owner=self.request.user)
             print(f"Hotspot created: {hotspot}")
+            if reconciler_enabled():
+                # Created with desired_state running; the save queued a reconcile run
+                return
             
             # Generate config and start hotspot
-            task = control_hotspot_async.delay(hotspot.id, 'start')
-            hotspot.task_id = task.id
-            print(f"Hotspot task id: {task.id}")
             hotspot.is_active = False  # Will be updated by async task
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
+            task_id = enqueue_operation(hotspot, 'start')
+            print(f"Hotspot task id: {task_id}")
             
         except IntegrityError as e:
             raise serializers.ValidationError(
@@ -240,18 +335,46 @@ class HotspotViewSet(viewsets.ModelViewSet):
             )
             
     def perform_destroy(self, instance):
+        if reconciler_enabled():
+            # The reconciler stops daemons left without a hotspot row
+            instance.delete()
+            return
         # Stop the hotspot asynchronously before deletion
         try:
-            control_hotspot_async.delay(instance.id, 'stop')
+            enqueue_operation(instance, 'stop')
         except Exception as e:
             raise serializers.ValidationError(
                 f"Failed to stop hotspot: {str(e)}"
             )
         instance.delete()
 
+    def _ssid_conflict(self, hotspot):
+        return Response({
+            'success': False,
+            'status': 409,
+            'error': f'A running hotspot already uses SSID {hotspot.ssid}'
+        }, status=status.HTTP_409_CONFLICT)
+
+    def _desire(self, hotspot, desired):
+        """Record desired_state and leave the rest to the reconciler"""
+        if not hotspot.set_desired_state(desired):
+            return self._ssid_conflict(hotspot)
+        return Response({
+            'success': True,
+            'status': 202,
+            'message': f'Hotspot {hotspot.ssid} will be {desired}',
+            'desired_state': desired,
+            'is_active': hotspot.is_active
+        }, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         hotspot = self.get_object()
+        if reconciler_enabled():
+            return self._desire(hotspot, Hotspot.DesiredState.RUNNING)
+        # Nothing goes on air while another hotspot wants the SSID
+        if not hotspot.set_desired_state(Hotspot.DesiredState.RUNNING):
+            return self._ssid_conflict(hotspot)
         try:
             service = HotspotControlService()
             
@@ -272,7 +395,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
             # Handle timeout case where service actually started
             if result.get('timed_out') and service.is_hotspot_running(hotspot.id):
                 hotspot.is_active = True
-                hotspot.save()
+                hotspot.save(update_fields=['is_active', 'updated_at'])
                 return Response({
                     'success': True,
                     'status': 200,
@@ -298,7 +421,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
             
             # Update hotspot status
             hotspot.is_active = True
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
             
             return Response({
                 'success': True,
@@ -331,6 +454,9 @@ class HotspotViewSet(viewsets.ModelViewSet):
     def stop(self, request, pk=None):
         """Enhanced stop command with multiple fallback methods"""
         hotspot = self.get_object()
+        if reconciler_enabled():
+            return self._desire(hotspot, Hotspot.DesiredState.STOPPED)
+        hotspot.set_desired_state(Hotspot.DesiredState.STOPPED)
         try:
             service = HotspotControlService()
             
@@ -363,7 +489,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
             
             # Update hotspot status
             hotspot.is_active = False
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
             
             return Response({
                 'success': True,
@@ -388,7 +514,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
                 'still_running': current_status,
                 'service_status': service.get_service_status(hotspot.id) if 'service' in locals() else 'N/A',
                 'troubleshooting': [
-                    f"Try manual force stop: sudo systemctl stop hotspot_{hotspot.id}.service && sudo pkill -f 'hostapd|dnsmasq'",
+                    f"Try manual force stop: sudo systemctl stop hotspot_{hotspot.id}.service && sudo pkill -f 'hotspot_{hotspot.id}\\.'",
                     f"Reset interface: sudo ip link set {hotspot.interface} down",
                     f"Check logs: sudo journalctl -u hotspot_{hotspot.id}.service -n 100 --no-pager"
                 ]
@@ -399,13 +525,11 @@ class HotspotViewSet(viewsets.ModelViewSet):
         """Restart a specific hotspot"""
         hotspot = self.get_object()
         try:
-            task = control_hotspot_async.delay(hotspot.id, 'restart')
-            hotspot.current_task_id = task.id
-            hotspot.save()
+            task_id = enqueue_operation(hotspot, 'restart')
             return Response({
                 'status': 'restarting',
                 'message': f'Hotspot {hotspot.ssid} is being restarted',
-                'task_id': task.id
+                'task_id': task_id
             })
         except Exception as e:
             return Response({
@@ -445,7 +569,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
             # Update hotspot status if task completed
             if result.get('success') and 'is_running' in result:
                 hotspot.is_active = result['is_running']
-                hotspot.save()
+                hotspot.save(update_fields=['is_active', 'updated_at'])
         
         return Response(response_data)
 
@@ -460,7 +584,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
         # Sync with DB status
         if hotspot.is_active != is_running:
             hotspot.is_active = is_running
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
         
         return Response({
             'is_running': is_running,
@@ -470,6 +594,28 @@ class HotspotViewSet(viewsets.ModelViewSet):
             'last_status_check': timezone.now()
         })
 
+    @action(detail=False, methods=['get'], url_path='status', url_name='fleet-status')
+    def fleet_status(self, request):
+        """Operational status of every hotspot this user can manage, checked in one batch"""
+        user = request.user
+        hotspots = Hotspot.objects.all()
+        # Same visibility as get_object()
+        if not user.is_superuser:
+            if user.user_type == 1:  # Admin
+                hotspots = hotspots.filter(owner__user_type=2)
+            elif user.user_type == 2:  # Reseller
+                hotspots = hotspots.filter(owner=user)
+            else:
+                hotspots = hotspots.none()
+
+        statuses = collect_fleet_status(hotspots.order_by('id'))
+        return Response({
+            'hotspots': statuses,
+            'running': sum(1 for entry in statuses if entry['is_running']),
+            'total': len(statuses),
+            'last_status_check': timezone.now()
+        })
+
     @action(detail=True, methods=['get'])
     def verify(self, request, pk=None):
         """Force verification of hotspot status"""
@@ -479,7 +625,7 @@ class HotspotViewSet(viewsets.ModelViewSet):
         
         if was_running != actual_status:
             hotspot.is_active = actual_status
-            hotspot.save()
+            hotspot.save(update_fields=['is_active', 'updated_at'])
             message = f"Status corrected from {was_running} to {actual_status}"
         else:
             message = "Status consistent"
@@ -31,6 +31,128 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-auth-snapshot': {
+        'task': 'accounts.export_auth_snapshot',
+        'schedule': 60.0,
+    },
+    'rebuild-auth-snapshot': {
+        'task': 'accounts.export_auth_snapshot',
+        'schedule': 3600.0,
+        'kwargs': {'full': True},
+    },
+    'disconnect-ineligible-sessions': {
+        'task': 'hotspots.disconnect_ineligible_sessions',
+        'schedule': 60.0,
+    },
+    'reconcile-hotspots': {
+        'task': 'hotspots.reconcile',
+        'schedule': 30.0,
+    },
+}
+
+# RADIUS Configuration (python manage.py radius_server)
+RADIUS_HOST = '0.0.0.0'
+RADIUS_AUTH_PORT = 1812
+RADIUS_CLIENTS = {  # NAS address or network -> shared secret; more clients live in NasClient
+    '127.0.0.1': 'testing123',
+}
+RADIUS_NAS_RELOAD_INTERVAL = 5  # Seconds between checks for NasClient changes
+RADIUS_DISCONNECT_PORT = 3799  # RFC 5176 Disconnect/CoA port on the NAS
+RADIUS_DISCONNECT_TIMEOUT = 3  # Seconds to wait for each Disconnect reply
+RADIUS_DISCONNECT_RETRIES = 2
+RADIUS_DISCONNECT_CONCURRENCY = 64  # Disconnect-Requests in flight at once
+RADIUS_MAX_WORKERS = 16  # Threads for blocking DB and password hashing work
+RADIUS_FALLBACK_WORKERS = 4  # Threads answering from the auth snapshot when the database is slow
+RADIUS_MAX_PENDING = 1024  # Requests in flight before new packets are dropped
+RADIUS_ACCT_PORT = 1813
+RADIUS_ACCOUNTING_SPOOL = os.path.join(BASE_DIR, 'tmp', 'radius-accounting.spool')
+RADIUS_ACCOUNTING_BATCH_SIZE = 500  # Buffered sessions that trigger a flush to the database
+RADIUS_ACCOUNTING_FLUSH_INTERVAL = 5  # Seconds between flushes of a partial batch
+RADIUS_DB_TIMEOUT = 2.0  # Seconds before an Access-Request is answered from the auth snapshot
+
+# Shared by the web, Celery and radius_server processes, so a signal's cache.delete in one
+# reaches entries cached by the others; a per-process LocMemCache fails the accounts.W001 and
+# hotspots.W001 checks
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# Seconds a user's subscription/credit eligibility stays cached (accounts/eligibility.py)
+ELIGIBILITY_CACHE_TTL = 300
+
+# Seconds an SSID -> (hotspot, owner) lookup stays cached (hotspots/authorization.py)
+HOTSPOT_SSID_CACHE_TTL = 300
+
+# How hotspot units are managed (hotspots/systemd.py): DBusSystemdManager keeps one
+# system bus connection (needs jeepney and a polkit rule) and falls back to sudo systemctl
+# on hosts without a system bus; SubprocessSystemdManager always shells out;
+# FakeSystemdManager needs no systemd at all
+SYSTEMD_MANAGER_BACKEND = 'hotspots.systemd.DBusSystemdManager'
+SYSTEMD_DBUS_TIMEOUT = 10  # Seconds to wait for a systemd reply
+
+# Readiness waits after hotspot start/stop (hotspots/readiness.py)
+HOTSPOT_START_TIMEOUT = 45  # Seconds for unit, interface and hostapd to come up
+HOTSPOT_STOP_TIMEOUT = 10
+HOSTAPD_CTRL_DIR = '/var/run/hostapd'
+HOSTAPD_CTRL_TIMEOUT = 2  # Seconds to wait for a control-socket reply (hotspots/hostapd.py)
+HOSTAPD_SCRIPT_CONFIG_DIR = '/etc/hostapd-prod'  # Where the start script writes hotspot_<id>.hostapd.conf
+
+# Serve every hotspot on one interface from a single hostapd with bss= sections (hotspots/radios.py)
+HOTSPOT_MULTI_BSS = False
+
+# Rendered hotspot config (hotspots/rendering.py); files are only rewritten when their hash changes
+HOTSPOT_CONFIG_DIR = os.path.join(BASE_DIR, 'tmp', 'hostapd-prod')
+SYSTEMD_UNIT_DIR = '/etc/systemd/system'
+
+# Converge hotspots to Hotspot.desired_state instead of one Celery task per API call (hotspots/reconciler.py)
+HOTSPOT_RECONCILER_ENABLED = False
+HOTSPOT_RECONCILE_WORKERS = 4  # Start/stop/reload actions in flight at once
+HOTSPOT_RECONCILE_PENDING_TTL = 30  # Seconds a queued on-change run absorbs further requests
+HOTSPOT_RECONCILE_LEASE = 600  # Seconds before a crashed run stops excluding the next one
+# One control operation per hotspot at a time; later requests supersede queued ones (hotspots/operations.py)
+HOTSPOT_OPERATION_LEASE = 310  # Seconds before a crashed worker's lease expires (> task time_limit)
+HOTSPOT_OPERATION_RETRY_DELAY = 5  # Seconds a task waits before retrying a busy hotspot; it gives up after one lease
+# Batch start/stop/restart (hotspot_control --all/--ids, hotspots/executor.py)
+HOTSPOT_FLEET_CONCURRENCY = 8  # systemctl commands in flight at once on this host
+HOTSPOT_FLEET_COMMAND_TIMEOUT = 60  # Seconds before a command is killed
+# Hotspot subnets and DHCP ranges are allocated from these supernets (hotspots/subnets.py)
+HOTSPOT_SUBNET_POOLS = ['10.128.0.0/9']  # Tried in order; 32768 /24s
+HOTSPOT_SUBNET_PREFIX = 24  # 24 or 26; a pool keeps the size it was first carved with
+HOTSPOT_SUBNET_EXCLUDE = []  # Networks already in use on site, e.g. ['10.128.0.0/16']
+
+# Seconds one /proc scan serves hotspot process lookups (hotspots/processes.py)
+PROCESS_SNAPSHOT_MAX_AGE = 1.0
+
+# Batch login endpoint (POST /api/hotspot-auth/authenticate/batch/)
+HOTSPOT_AUTH_BATCH_MAX_SIZE = 500
+HOTSPOT_AUTH_BATCH_WORKERS = 8  # Password checks in flight per batch
+
+# Verified-credential cache for RADIUS re-authentication (accounts/credential_cache.py)
+CREDENTIAL_CACHE_TTL = 0  # Seconds; 0 disables the cache (opt-in)
+CREDENTIAL_CACHE_MAX_SIZE = 10000
+
+# Where login password hashes are checked (accounts/password_verifier.py)
+PASSWORD_VERIFIER_BACKEND = 'accounts.password_verifier.ProcessPoolPasswordVerifier'
+PASSWORD_VERIFIER_WORKERS = 2  # Per process: every web, Celery and RADIUS process has its own pool
+AUTHENTICATION_BACKENDS = ['accounts.backends.VerifierModelBackend']
+
+# Login rate limiting before password hashing (accounts/rate_limit.py)
+LOGIN_RATE_LIMIT_ENABLED = True
+LOGIN_RATE_LIMITS = {  # scope: (burst, tokens refilled per second)
+    'username': (20, 0.5),
+    'mac': (20, 0.5),
+    'hotspot': (500, 100),
+}
+LOGIN_RATE_LIMIT_REDIS_URL = None  # e.g. 'redis://localhost:6379/1' to share buckets between hosts
+LOGIN_RATE_LIMIT_SHM_PATH = None  # None uses /dev/shm/wifi-login-buckets
+
+# Authorization snapshot for DB-less lookups (accounts/auth_snapshot.py, python manage.py export_auth_snapshot)
+AUTH_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'tmp', 'auth-snapshot.json')
+AUTH_SNAPSHOT_OVERLAP = 60  # Seconds each incremental run re-reads before the last one
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get("DJANGO_DEBUG", "true") == "true"
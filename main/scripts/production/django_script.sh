@@ -9,9 +9,12 @@ LOG_FILE="/var/log/prod_ap.log"
 ACTION="${1:-start}"  # Default to 'start' if no action provided
 HOTSPOT_ID="${2:-}"   # Optional hotspot ID
 
-# Interface detection
-DETECTED_INTERFACE=$(iw dev | awk '$1=="Interface"{print $2}' | head -1)
-[ -z "$DETECTED_INTERFACE" ] && DETECTED_INTERFACE="wlo1"
+# Per-hotspot files: the hotspot_<id> in their paths is how this hotspot's daemons are found,
+# so stopping it never touches other hotspots or multi-BSS radios
+CONF_ID="${HOTSPOT_ID:-default}"
+HOSTAPD_CONF="/etc/hostapd-prod/hotspot_${CONF_ID}.hostapd.conf"
+DNSMASQ_CONF="/etc/hostapd-prod/hotspot_${CONF_ID}.dnsmasq.conf"
+DNSMASQ_PID="/run/dnsmasq-hotspot_${CONF_ID}.pid"
 
 # Systemd-Specific wireless reset handling
 SYSTEMD_RUNNING=0
@@ -31,7 +34,8 @@ log "🔧 Starting hotspot control with action: $ACTION, hotspot ID: ${HOTSPOT_I
 load_environment() {
     local config_id="$1"
     local default_env="/etc/hostapd-prod.env"
-    local hotspot_env="/tmp/hostapd-prod/hotspot_${config_id}.env"
+    # The unit's EnvironmentFile names itself, so the base config cannot mask it
+    local hotspot_env="${HOTSPOT_ENV_FILE:-/tmp/hostapd-prod/hotspot_${config_id}.env}"
     
     # Always load default config first
     if [ -f "$default_env" ]; then
@@ -46,7 +50,7 @@ load_environment() {
         log "🔄 Loading hotspot-specific overrides from $hotspot_env"
         source "$hotspot_env"
         
-        # Auto-generate network params if not specified
+        # Django renders the allocated subnet; these defaults only cover hand-written env files
         export AP_IP="${AP_IP:-192.168.${config_id}.1}"
         export DHCP_RANGE_START="${DHCP_RANGE_START:-192.168.${config_id}.10}"
         export DHCP_RANGE_END="${DHCP_RANGE_END:-192.168.${config_id}.100}"
@@ -64,7 +68,8 @@ load_environment() {
 detect_interface() {
     # Use configured interface if specified
     if [ -n "${INTERFACE:-}" ]; then
-        if iw dev "$INTERFACE" info >/dev/null 2>&1; then
+        # Set by the hotspot env file; sysfs says whether it still exists
+        if [ -e "/sys/class/net/$INTERFACE/phy80211" ]; then
             echo "$INTERFACE"
             return 0
         fi
@@ -74,9 +79,9 @@ detect_interface() {
     # 2. Automatic detection
     local interfaces=()
     # Modern Linux (phy80211)
-    if [ -d /sys/class/net ]; then
-        interfaces+=($(ls /sys/class/net | grep -E 'wlan[0-9]+|wlo[0-9]+|wlp[0-9]+s[0-9]+'))
-    fi
+    for dev in /sys/class/net/*/phy80211; do
+        [ -e "$dev" ] && interfaces+=("$(basename "$(dirname "$dev")")")
+    done
     
     # Fallback to iw
     if [ ${#interfaces[@]} -eq 0 ]; then
@@ -94,13 +99,20 @@ detect_interface() {
     return 1
 }
 
+stop_dnsmasq() {
+    if [ -f "$DNSMASQ_PID" ]; then
+        sudo kill "$(cat "$DNSMASQ_PID")" 2>/dev/null || true
+        sudo rm -f "$DNSMASQ_PID"
+    fi
+}
+
 # Clean up
 cleanup() {
     log "🧹 Cleaning up services..."
     
-    # Stop services
-    sudo pkill hostapd 2>/dev/null || true
-    sudo pkill dnsmasq 2>/dev/null || true
+    # Stop this hotspot's services only
+    sudo pkill -f "hostapd.*${HOSTAPD_CONF}" 2>/dev/null || true
+    stop_dnsmasq
     
     # Restore iptables
     sudo iptables -t nat -D POSTROUTING -o "$WIRED_IFACE" -j MASQUERADE 2>/dev/null || true
@@ -233,9 +245,11 @@ case "$ACTION" in
         ;;
 esac
 
-# Main interface detection
+# Main interface detection (already chosen above for start/restart)
 log "🔍 Activating wireless interface..."
-INTERFACE=$(iw dev | awk '$1=="Interface"{print $2}' | head -n1)
+if [[ -z "${INTERFACE:-}" ]]; then
+    INTERFACE=$(iw dev | awk '$1=="Interface"{print $2}' | head -n1)
+fi
 if [[ -z "$INTERFACE" ]]; then
     # Try alternative detection methods
     INTERFACE=$(ls /sys/class/net | grep -E 'wlo|wlan|wlp' | head -n1)
@@ -328,10 +342,6 @@ for var in "${REQUIRED_VARS[@]}"; do
     fi
 done
 
-# Configuration files
-HOSTAPD_CONF="/etc/hostapd-prod/hostapd.conf"
-DNSMASQ_CONF="/etc/hostapd-prod/dnsmasq.conf"
-
 # NetworkManager handling
 if systemctl is-active --quiet NetworkManager; then
     log "🔧 Disabling NetworkManager control of $INTERFACE..."
@@ -399,6 +409,7 @@ cat <<EOF > "$HOSTAPD_CONF"
 # Basic configuration
 interface=$INTERFACE
 driver=nl80211
+ctrl_interface=/var/run/hostapd
 ssid=$SSID
 country_code=KE
 hw_mode=g
@@ -415,7 +426,7 @@ auth_algs=1
 # Performance settings
 beacon_int=100
 dtim_period=2
-max_num_sta=8
+max_num_sta=${MAX_USERS:-8}
 
 # Disable advanced features for maximum compatibility
 ieee80211n=0
@@ -440,8 +451,8 @@ if ! command -v dnsmasq >/dev/null; then
     log "❌ dnsmasq not installed!"
     exit 1
 fi
-sudo pkill dnsmasq || true
-sudo dnsmasq -C "$DNSMASQ_CONF" --log-facility="$LOG_FILE"
+stop_dnsmasq
+sudo dnsmasq -C "$DNSMASQ_CONF" --pid-file="$DNSMASQ_PID" --log-facility="$LOG_FILE"
 
 # Enable NAT
 log "🔁 Enabling NAT..."
@@ -0,0 +1,53 @@
+#!/bin/bash
+# Addresses and DHCP for the BSS interfaces of one multi-BSS hostapd radio.
+# Run by hotspot_radio_<interface>.service (see hotspots/radios.py):
+#   radio_script.sh up <interface>    after hostapd started or reloaded
+#   radio_script.sh down <interface>  after hostapd stopped
+set -euo pipefail
+
+ACTION="${1:-}"
+INTERFACE="${2:-}"
+RADIO_DIR="${RADIO_DIR:-$(dirname "$0")/../../tmp/hostapd-prod}"
+ADDRESSES="$RADIO_DIR/radio_${INTERFACE}.addresses"
+DNSMASQ_CONF="$RADIO_DIR/radio_${INTERFACE}.dnsmasq.conf"
+DNSMASQ_PID="/run/dnsmasq-radio-${INTERFACE}.pid"
+LOG_FILE="/var/log/prod_ap.log"
+
+log() {
+    echo "[$(date '+%Y-%m-%d %H:%M:%S')] radio $INTERFACE: $*" | tee -a "$LOG_FILE"
+}
+
+stop_dnsmasq() {
+    if [ -f "$DNSMASQ_PID" ]; then
+        kill "$(cat "$DNSMASQ_PID")" 2>/dev/null || true
+        rm -f "$DNSMASQ_PID"
+    fi
+}
+
+case "$ACTION" in
+    up)
+        while read -r ifname address; do
+            # hostapd creates the BSS interfaces itself; give a reload a moment
+            for _ in $(seq 1 50); do
+                [ -d "/sys/class/net/$ifname" ] && break
+                sleep 0.1
+            done
+            ip addr replace "$address" dev "$ifname"
+            ip link set "$ifname" up
+            log "✅ $ifname at $address"
+        done < "$ADDRESSES"
+        # dnsmasq reads dhcp-range only at startup
+        stop_dnsmasq
+        dnsmasq -C "$DNSMASQ_CONF" --pid-file="$DNSMASQ_PID" --log-facility="$LOG_FILE"
+        log "🚀 dnsmasq serving $(wc -l < "$ADDRESSES") BSS"
+        ;;
+    down)
+        stop_dnsmasq
+        ip addr flush dev "$INTERFACE" 2>/dev/null || true
+        log "🛑 radio stopped"
+        ;;
+    *)
+        echo "Usage: $0 {up|down} <interface>"
+        exit 1
+        ;;
+esac